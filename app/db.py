@@ -1,15 +1,46 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import uuid4
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy import event, text
 from .config import get_settings
 
 settings = get_settings()
 
+
+def async_url(url: str) -> str:
+    return url.replace("postgresql+psycopg", "postgresql+asyncpg")
+
+
+def engine_options(transaction_pooling: bool) -> Dict[str, Any]:
+    """
+    Extra create_async_engine arguments for running behind PgBouncer in
+    transaction mode, where consecutive transactions of one client may land
+    on different server connections.
+    """
+    if not transaction_pooling:
+        return {}
+    return {
+        # PgBouncer does the pooling; a pool here would only pin its clients
+        "poolclass": NullPool,
+        "connect_args": {
+            # Neither asyncpg nor SQLAlchemy may reuse a prepared statement,
+            # and the unnamed ones they still prepare must not clash by name
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        },
+    }
+
+
 # Async engine using asyncpg
 engine = create_async_engine(
-    settings.DATABASE_URL.replace("postgresql+psycopg", "postgresql+asyncpg"),
+    async_url(settings.DATABASE_URL),
     echo=True,  # logs SQL queries, you can disable in prod
     future=True,
+    **engine_options(settings.PGBOUNCER_TRANSACTION_MODE),
 )
 
 # Async session
@@ -19,8 +50,20 @@ AsyncSessionLocal = sessionmaker(
     class_=AsyncSession,
 )
 
+# Milliseconds, set per request by app.services.admission for its route class
+statement_timeout_ms: ContextVar[Optional[int]] = ContextVar("statement_timeout_ms", default=None)
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session: Session, transaction, connection) -> None:
+    timeout = session.info.get("statement_timeout")
+    if timeout:
+        # SET LOCAL ends with the transaction, so pooled connections stay clean;
+        # get_db keeps no other per-connection state (see PGBOUNCER_TRANSACTION_MODE)
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
 async def get_db():
     async with AsyncSessionLocal() as session:
+        session.info["statement_timeout"] = statement_timeout_ms.get()
         yield session
 
 async def ping_db() -> None:
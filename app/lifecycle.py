@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import signal
+import threading
+import time
+from contextlib import AsyncExitStack
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.db import engine
+from app.routers.invoices import invoice_detail_query, invoice_include, invoice_list_query
+from app.routers.sales_orders import order_detail_query, order_include, order_list_query
+from app.services.document_numbers import document_date
+from app.services.loaders import Loaders
+
+logger = logging.getLogger(__name__)
+
+# Before any year partition, so warm-up list queries only probe the (normally
+# empty) DEFAULT partition and return nothing
+_NOWHERE = date(1900, 1, 1)
+
+
+class Lifecycle:
+    """Readiness and in-flight request count for /health and shutdown"""
+
+    def __init__(self):
+        self.ready = False
+        self.warm = False
+        self.draining = False
+        self.in_flight = 0
+
+    def start_draining(self) -> None:
+        """Report not ready from now on, so the load balancer stops routing here"""
+        self.ready = False
+        self.draining = True
+
+
+lifecycle = Lifecycle()
+
+
+async def _warm_connection(conn: AsyncConnection) -> None:
+    """
+    Run the hot statements once, matching nothing, so SQLAlchemy's compiled
+    cache holds them and asyncpg has prepared them on this connection.
+    """
+    async with AsyncSession(bind=conn) as db:
+        for include in (order_include(None), ()):
+            await db.execute(order_list_query(_NOWHERE, _NOWHERE, include))
+            await db.execute(order_detail_query(-1, _NOWHERE, include))
+        for include in (invoice_include(None), ()):
+            await db.execute(invoice_list_query(_NOWHERE, _NOWHERE, include))
+            await db.execute(invoice_detail_query(-1, _NOWHERE, include))
+        await document_date(db, "sales_order", -1)
+        loaders = Loaders(db)
+        await asyncio.gather(
+            loaders.products.load(-1), loaders.customers.load(-1), loaders.sales_persons.load(-1)
+        )
+        await db.rollback()
+
+
+async def warm_up() -> None:
+    """
+    Open pool_size connections at once (connect, auth and asyncpg's type
+    introspection happen here rather than in the first requests) and warm
+    each of them. Ready is reported afterwards even if this failed, since
+    requests would then fail the same way.
+    """
+    started = time.perf_counter()
+    try:
+        # NullPool (PGBOUNCER_TRANSACTION_MODE) keeps nothing to warm but the cache
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        async with AsyncExitStack() as stack:
+            connections = await asyncio.gather(*(
+                stack.enter_async_context(engine.connect()) for _ in range(size)
+            ))
+            await asyncio.gather(*(_warm_connection(conn) for conn in connections))
+        lifecycle.warm = True
+        logger.info("warm-up: %d connections in %.2fs", size, time.perf_counter() - started)
+    except Exception:
+        logger.exception("warm-up failed, serving cold")
+    finally:
+        lifecycle.ready = True
+
+
+def delay_exit_on_sigterm(delay: float) -> None:
+    """
+    Flip /health to draining as soon as SIGTERM arrives and hand the signal to
+    the server only ``delay`` seconds later.
+
+    uvicorn stops accepting connections the moment it sees SIGTERM and runs
+    the lifespan shutdown only after its own graceful period
+    (--timeout-graceful-shutdown) has let the open requests finish, so
+    readiness has to change before uvicorn is told. A second SIGTERM is
+    passed on at once. Must be called from the lifespan startup, after the
+    server has installed its signal handlers.
+    """
+    if delay <= 0 or threading.current_thread() is not threading.main_thread():
+        return
+    server_handler = signal.getsignal(signal.SIGTERM)
+    if not callable(server_handler):
+        # Not running under a server that handles SIGTERM (benchmarks, scripts)
+        return
+    loop = asyncio.get_running_loop()
+
+    def handle_sigterm(sig, frame) -> None:
+        if lifecycle.draining:
+            server_handler(sig, frame)
+            return
+        lifecycle.start_draining()
+        logger.info("shutdown: not ready, stopping in %.0fs", delay)
+        # Signal handlers may interrupt the loop itself; schedule through the self-pipe
+        loop.call_soon_threadsafe(loop.call_later, delay, server_handler, sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+class InFlightMiddleware:
+    """
+    Counts requests from their first byte until the last body message has
+    been sent (not when the response headers go out), for /health.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if not finished:
+                finished = True
+                lifecycle.in_flight -= 1
+
+        async def send_counted(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        lifecycle.in_flight += 1
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            # Failed or disconnected before the response completed
+            finish()
@@ -1,10 +1,64 @@
-from fastapi import FastAPI
-from .db import ping_db
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from .db import engine, ping_db
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import sales_orders, customers, products, sales_persons, invoices, shipments
+from .routers import sales_orders, customers, products, sales_persons, invoices, shipments, reports, events, sync
+from .services.customer_index import follow_customer_changes
+from .services.change_feed import change_feed
+from .config import get_settings
+from .worker import run_worker
+from .services.audit import asserted_user_id, audit_buffer, current_user_id
+from .services import admission, coalesce, profiling
+from .lifecycle import InFlightMiddleware, delay_exit_on_sigterm, lifecycle, warm_up
 
-app = FastAPI(title="Sales API", version="0.1.0")
+logger = logging.getLogger(__name__)
+
+_background_tasks: set[asyncio.Task] = set()
+
+_worker_stop = asyncio.Event()
+
+def _run_in_background(coro, name: str) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception():
+            logger.error("%s failed", name, exc_info=t.exception())
+
+    task.add_done_callback(_done)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    # SIGTERM turns /health to 503 first; uvicorn then stops accepting and lets
+    # open requests finish (--timeout-graceful-shutdown) before the code below runs
+    delay_exit_on_sigterm(settings.SHUTDOWN_READINESS_DELAY_SECONDS)
+    # /health stays 503 until the pool and statement caches are warm
+    _run_in_background(warm_up(), "Warm-up")
+    # Built in the background, then kept current from every worker's writes;
+    # /customers/search falls back to SQL until ready
+    _run_in_background(follow_customer_changes(_worker_stop), "Customer index")
+    if settings.AUDIT_DURABILITY == "async":
+        _run_in_background(audit_buffer.run(_worker_stop), "Audit flusher")
+    # Set OUTBOX_IN_PROCESS=false when running python -m app.worker separately
+    if settings.OUTBOX_IN_PROCESS:
+        _run_in_background(run_worker(_worker_stop), "Outbox worker")
+
+    yield
+
+    lifecycle.start_draining()
+    await change_feed.close()
+    # The outbox worker finishes its batch, the audit flusher writes what it holds
+    _worker_stop.set()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    await engine.dispose()
+
+app = FastAPI(title="Sales API", version="0.1.0", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",  # Vite dev server
@@ -13,21 +67,55 @@ origins = [
     # You can add production domain later e.g. "https://yourdomain.com"
 ]
 
+# Added first so CORS wraps it and browsers can read the 503s it sends
+app.add_middleware(admission.AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],  # allow all HTTP methods
     allow_headers=["*"],  # allow all headers
+    # Versions the browser client sends back in If-Match
+    expose_headers=["ETag", "X-Sales-Order-ETag"],
 )
 
+# Counts requests still running, reported by /health
+app.add_middleware(InFlightMiddleware)
+
+@app.middleware("http")
+async def bind_current_user(request: Request, call_next):
+    # No authentication in the app itself: only a trusted gateway may name
+    # the acting user for created_by and the audit log (TRUSTED_PROXIES)
+    client_host = request.client.host if request.client else None
+    token = current_user_id.set(asserted_user_id(client_host, request.headers.get("X-User-Id")))
+    try:
+        return await call_next(request)
+    finally:
+        current_user_id.reset(token)
+
+# Added last, so it is the outermost of ours and a profile also covers
+# admission queueing and every middleware above
+app.add_middleware(profiling.ProfilingMiddleware)
+
 @app.get("/")
 def read_root():
     return {"msg": "Hello World"}
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # Readiness: false while warming up and again once shutdown starts draining
+    if not lifecycle.ready:
+        return JSONResponse(status_code=503, content={"status": "draining" if lifecycle.draining else "starting"})
+    return {"status": "ok", "warm": lifecycle.warm, "inFlight": lifecycle.in_flight}
+
+@app.get("/__coalescing")
+def coalescing_metrics():
+    return coalesce.snapshot()
+
+@app.get("/__admission")
+def admission_metrics():
+    return admission.snapshot()
 
 @app.get("/__dbcheck")
 async def dbcheck():
@@ -42,5 +130,8 @@ app.include_router(products.router, prefix="/api/v1")
 app.include_router(sales_persons.router, prefix="/api/v1")
 app.include_router(invoices.router, prefix="/api/v1")
 app.include_router(shipments.router, prefix="/api/v1")
+app.include_router(reports.router, prefix="/api/v1")
+app.include_router(events.router, prefix="/api/v1")
+app.include_router(sync.router, prefix="/api/v1")
 
 # uvicorn app.main:app --reload
\ No newline at end of file
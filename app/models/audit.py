@@ -0,0 +1,33 @@
+from sqlalchemy import String, Integer, BigInteger, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from . import Base
+
+
+# ----------------------
+# AUDIT LOG MODEL
+# ----------------------
+class AuditLog(Base):
+    """
+    Field-level change history captured from ORM flushes (app/services/audit.py).
+
+    changes maps each column to [old, new]; old is null for inserts and new
+    is null for deletes.
+
+    user_id is not authenticated by this app: it is the X-User-Id asserted
+    by a gateway listed in TRUSTED_PROXIES, and null for requests from
+    anywhere else. It is only as trustworthy as that gateway.
+    """
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        Index("ix_audit_log_entity", "entity", "entity_id", "changed_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(64), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    action: Mapped[str] = mapped_column(String(8), nullable=False)
+    changes: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    changed_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, Text, DateTime, Date
+from sqlalchemy import String, Integer, Text, DateTime, Date, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from . import Base
@@ -6,12 +6,18 @@ from . import Base
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (
+        # Trigram indexes back the /customers/search SQL fallback
+        Index("ix_customers_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_customers_contact_person_trgm", "contact_person", postgresql_using="gin", postgresql_ops={"contact_person": "gin_trgm_ops"}),
+        Index("ix_customers_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     contact_person: Mapped[str | None] = mapped_column(String, nullable=True)
     email: Mapped[str | None] = mapped_column(String, unique=True, nullable=True)
-    phone: Mapped[str | None] = mapped_column(String, nullable=True)
+    phone: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
     address: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     customer_since: Mapped[Date] = mapped_column(
@@ -0,0 +1,41 @@
+from sqlalchemy import String, Integer, Date, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from . import Base
+
+
+# ----------------------
+# DOCUMENT NUMBER REGISTRY MODEL
+# ----------------------
+class DocumentNumber(Base):
+    """
+    Every order and invoice number in use. sales_orders and invoices are
+    partitioned by date, so they cannot have a unique constraint on the
+    number alone; triggers on both (migration d2f7a9c4e816) add, move and
+    remove their numbers here, and this primary key rejects duplicates.
+    Each entry also records its document's id and date, so a lookup by id can
+    find the one partition holding the row (app.services.document_numbers).
+    """
+    __tablename__ = "document_numbers"
+    __table_args__ = (
+        UniqueConstraint("entity", "entity_id"),
+    )
+
+    number: Mapped[str] = mapped_column(String, primary_key=True)
+    entity: Mapped[str] = mapped_column(String, nullable=False)  # "sales_order" | "invoice"
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    date: Mapped[Date] = mapped_column(Date, nullable=False)
+
+
+# ----------------------
+# DOCUMENT NUMBER COUNTER MODEL
+# ----------------------
+class DocumentNumberCounter(Base):
+    """
+    Last number handed out per prefix ("SO-2026", "INV-2026"). Incremented in
+    the document's own transaction, so numbers have no gaps and concurrent
+    writers wait for each other instead of both taking max + 1.
+    """
+    __tablename__ = "document_number_counters"
+
+    prefix: Mapped[str] = mapped_column(String, primary_key=True)
+    last_value: Mapped[int] = mapped_column(Integer, nullable=False)
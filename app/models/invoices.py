@@ -7,6 +7,8 @@ from sqlalchemy import (
     DateTime,
     Date,
     Enum,
+    Index,
+    ForeignKeyConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -30,12 +32,22 @@ class InvoiceStatus(str, enum.Enum):
 # ----------------------
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_customer_id_date", "customer_id", "date", "id"),
+        Index("ix_invoices_updated_at", "updated_at", "id"),
+        ForeignKeyConstraint(["sales_order_id", "order_date"], ["sales_orders.id", "sales_orders.date"]),
+        # Range-partitioned by date (migration 1a6d3f5b7c92); invoice_number is
+        # kept globally unique by app.models.document_numbers
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    invoice_number: Mapped[str] = mapped_column(String, unique=True, nullable=False)
-    sales_order_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("sales_orders.id"), nullable=True)
+    invoice_number: Mapped[str] = mapped_column(String, nullable=False)
+    sales_order_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    # The order's date, completing the key into partitioned sales_orders
+    order_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
     customer_id: Mapped[int] = mapped_column(Integer, ForeignKey("customers.id"), nullable=False)
-    date: Mapped[Date] = mapped_column(Date, server_default=func.now())
+    date: Mapped[Date] = mapped_column(Date, primary_key=True, server_default=func.now())
     due_date: Mapped[Date] = mapped_column(Date, nullable=False)
     
     status: Mapped[InvoiceStatus] = mapped_column(
@@ -51,6 +63,10 @@ class Invoice(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
     created_by: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Bumped on every write; ORM updates fail with StaleDataError on a mismatch
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     sales_order: Mapped["SalesOrder"] = relationship("SalesOrder", back_populates="invoices")
@@ -66,10 +82,18 @@ class Invoice(Base):
 # ----------------------
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
+    __table_args__ = (
+        # invoices and so_items are partitioned, so their keys include the date
+        ForeignKeyConstraint(["invoice_id", "invoice_date"], ["invoices.id", "invoices.date"]),
+        ForeignKeyConstraint(["so_item_id", "order_date"], ["so_items.id", "so_items.order_date"]),
+        Index("ix_invoice_items_so_item_id_order_date", "so_item_id", "order_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id"), nullable=False)
-    so_item_id: Mapped[int] = mapped_column(Integer, ForeignKey("so_items.id"), nullable=False)
+    invoice_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    invoice_date: Mapped[Date] = mapped_column(Date, nullable=False)
+    so_item_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    order_date: Mapped[Date] = mapped_column(Date, nullable=False)
     quantity_invoiced: Mapped[int] = mapped_column(Integer, nullable=False)
 
     # Relationships
@@ -82,9 +106,17 @@ class InvoiceItem(Base):
 # ----------------------
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_customer_id_date", "customer_id", "payment_date", "id"),
+        # invoices is partitioned, so its key includes the date
+        ForeignKeyConstraint(["invoice_id", "invoice_date"], ["invoices.id", "invoices.date"]),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    invoice_id: Mapped[int] = mapped_column(Integer, ForeignKey("invoices.id"), nullable=False)
+    invoice_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    invoice_date: Mapped[Date] = mapped_column(Date, nullable=False)
+    # Denormalised from the invoice so a customer's payments can be range-scanned
+    customer_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("customers.id"), nullable=True)
     payment_date: Mapped[Date] = mapped_column(Date, nullable=False)
     amount: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
     method: Mapped[str] = mapped_column(String, nullable=False)
@@ -0,0 +1,36 @@
+from sqlalchemy import String, Integer, BigInteger, DateTime, Text, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from . import Base
+
+
+# ----------------------
+# OUTBOX MODEL
+# ----------------------
+class OutboxEvent(Base):
+    """
+    Side effect recorded in the same transaction as the write that caused it
+    and carried out after commit by app.worker.
+
+    status is pending | done | dead; a pending event is claimed by pushing
+    available_at forward, so an event whose worker died is picked up again
+    once that lease runs out.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_pending", "available_at", "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    topic: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    available_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    processed_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,10 +1,24 @@
-from sqlalchemy import String, Integer, Numeric, Text, ForeignKey
+from sqlalchemy import String, Integer, Numeric, Text, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from . import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Search indexes (see app/services/product_search.py): GiST trigram for
+        # similarity, substring and nearest-first scans, byte-ordered lower() for
+        # short prefixes, GIN full-text on the description
+        Index("ix_products_name_trgm_gist", "name", postgresql_using="gist", postgresql_ops={"name": "gist_trgm_ops"}),
+        Index("ix_products_sku_trgm_gist", "sku", postgresql_using="gist", postgresql_ops={"sku": "gist_trgm_ops"}),
+        Index("ix_products_name_prefix", text('(lower(name)) COLLATE "C"')),
+        Index("ix_products_sku_prefix", text('(lower(sku)) COLLATE "C"')),
+        Index(
+            "ix_products_description_tsv",
+            text("to_tsvector('english'::regconfig, COALESCE(description, ''))"),
+            postgresql_using="gin",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
@@ -12,6 +26,8 @@ class Product(Base):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     category_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("categories.id"), nullable=True)
     quantity: Mapped[int] = mapped_column(Integer, default=0)
+    # Units committed to open sales orders but not yet shipped
+    reserved_quantity: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     cost_price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
     selling_price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=True)
@@ -20,4 +36,5 @@ class Product(Base):
     # Relationships
     category: Mapped["Category"] = relationship("Category", back_populates="products")
     so_items: Mapped[list["SOItem"]] = relationship("SOItem", back_populates="product")
-    qo_items: Mapped[list["QOItem"]] = relationship("QOItem", back_populates="product")
\ No newline at end of file
+    qo_items: Mapped[list["QOItem"]] = relationship("QOItem", back_populates="product")
+    po_items: Mapped[list["POItem"]] = relationship("POItem", back_populates="product")
@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,
     Date,
     Enum,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -35,6 +36,9 @@ class POPaymentStatus(str, enum.Enum):
 # ----------------------
 class PurchaseOrder(Base):
     __tablename__ = "purchase_orders"
+    __table_args__ = (
+        Index("ix_purchase_orders_updated_at", "updated_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     po_number: Mapped[str] = mapped_column(String, unique=True, nullable=False)
@@ -66,6 +70,10 @@ class PurchaseOrder(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
     created_by: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Bumped on every write; ORM updates fail with StaleDataError on a mismatch
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     supplier: Mapped["Supplier"] = relationship("Supplier", back_populates="purchase_orders")
@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,
     Date,
     Enum,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -29,6 +30,9 @@ class QuotationStatus(str, enum.Enum):
 # ----------------------
 class Quotation(Base):
     __tablename__ = "quotations"
+    __table_args__ = (
+        Index("ix_quotations_updated_at", "updated_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     quotation_number: Mapped[str] = mapped_column(String, unique=True, nullable=False)
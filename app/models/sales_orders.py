@@ -7,6 +7,9 @@ from sqlalchemy import (
     DateTime,
     Date,
     Enum,
+    Index,
+    ForeignKeyConstraint,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -40,15 +43,27 @@ class ShipmentStatus(str, enum.Enum):
 # ----------------------
 class SalesOrder(Base):
     __tablename__ = "sales_orders"
+    __table_args__ = (
+        Index("ix_sales_orders_customer_id_date", "customer_id", "date", "id"),
+        Index("ix_sales_orders_updated_at", "updated_at", "id"),
+        Index(
+            "ix_sales_orders_deleted_at", "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        # Range-partitioned by date (migration 1a6d3f5b7c92); the partition key
+        # has to be part of every unique constraint, including the primary key.
+        # order_number is kept globally unique by app.models.document_numbers.
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    order_number: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    order_number: Mapped[str] = mapped_column(String, nullable=False)
 
     quotation_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("quotations.id"), nullable=True)
     customer_id: Mapped[int] = mapped_column(Integer, ForeignKey("customers.id"), nullable=False)
     sales_person_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("sales_persons.id"), nullable=True)
 
-    date: Mapped[Date] = mapped_column(Date, server_default=func.now())
+    date: Mapped[Date] = mapped_column(Date, primary_key=True, server_default=func.now())
 
     invoice_status: Mapped[SOInvoiceStatus] = mapped_column(
         Enum(SOInvoiceStatus, name="so_invoice_status_enum"),
@@ -70,14 +85,32 @@ class SalesOrder(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
     created_by: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Set by DELETE; the row is purged in batches by app.services.order_deletion
+    deleted_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Bumped on every write, including invoices and shipments created against
+    # the order (not by the derived status recompute); ORM updates fail with
+    # StaleDataError on a mismatch
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     items: Mapped[list["SOItem"]] = relationship("SOItem", back_populates="sales_order", cascade="all, delete-orphan", passive_deletes=True)
     customer: Mapped["Customer"] = relationship("Customer", back_populates="orders")
     quotation: Mapped["Quotation"] = relationship("Quotation", back_populates="sales_orders")
-    shipments: Mapped[list["Shipment"]] = relationship("Shipment", back_populates="sales_order", cascade="all, delete-orphan", passive_deletes=True)
+    shipments: Mapped[list["Shipment"]] = relationship(
+        "Shipment",
+        back_populates="sales_order",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
     sales_person: Mapped["SalesPerson"] = relationship("SalesPerson", back_populates="orders")
-    invoices: Mapped[list["Invoice"]] = relationship("Invoice", back_populates="sales_order", cascade="all, delete-orphan", passive_deletes=True)
+    invoices: Mapped[list["Invoice"]] = relationship(
+        "Invoice",
+        back_populates="sales_order",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
 
 # ----------------------
@@ -85,10 +118,24 @@ class SalesOrder(Base):
 # ----------------------
 class SOItem(Base):
     __tablename__ = "so_items"
+    __table_args__ = (
+        # Items carry their order's date so they live in the matching partition
+        # and the composite FK lets the planner prune on parent/child joins.
+        ForeignKeyConstraint(
+            ["sales_order_id", "order_date"],
+            ["sales_orders.id", "sales_orders.date"],
+            ondelete="CASCADE",
+        ),
+        {"postgresql_partition_by": "RANGE (order_date)"},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    sales_order_id: Mapped[int] = mapped_column(Integer, ForeignKey("sales_orders.id"), nullable=False)
+    sales_order_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    order_date: Mapped[Date] = mapped_column(Date, primary_key=True)
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"), nullable=False)
+    # The product's category when the order was written; sales rollups add and
+    # subtract the line under this one even if the product is recategorized
+    category_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("categories.id"), nullable=True)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     tax_rate: Mapped[Numeric] = mapped_column(Numeric(5, 4), nullable=False)  # e.g., 0.1200 for 12%
     price: Mapped[Numeric] = mapped_column(Numeric(10, 2), nullable=False)
@@ -0,0 +1,50 @@
+from sqlalchemy import String, Integer, BigInteger, Numeric, Date, Index, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from . import Base
+
+
+# ----------------------
+# SALES ROLLUP MODEL
+# ----------------------
+class SalesRollupDaily(Base):
+    """
+    Pre-aggregated sales per day and dimension, maintained in the sales order
+    write transaction (see app/services/sales_rollups.py).
+
+    dimension is one of customer | sales_person | product | category;
+    dimension_id 0 stands for "none" (e.g. an uncategorised product).
+    """
+    __tablename__ = "sales_rollup_daily"
+    __table_args__ = (
+        Index("ix_sales_rollup_daily_dimension_day", "dimension", "day"),
+    )
+
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    dimension: Mapped[str] = mapped_column(String(16), primary_key=True)
+    dimension_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    quantity: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    revenue: Mapped[Numeric] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    tax: Mapped[Numeric] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+
+
+# ----------------------
+# SALES PERSON COUNTERS MODEL
+# ----------------------
+class SalesPersonCounter(Base):
+    """
+    Per-sales-person activity counters kept at day, month and year grain
+    (grain 'd' / 'm' / 'y', period_start = first day of the period), so any
+    date range is answered from a bounded number of rows.
+    """
+    __tablename__ = "sales_person_counters"
+
+    grain: Mapped[str] = mapped_column(String(1), primary_key=True)
+    period_start: Mapped[Date] = mapped_column(Date, primary_key=True)
+    sales_person_id: Mapped[int] = mapped_column(Integer, ForeignKey("sales_persons.id"), primary_key=True)
+
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    order_revenue: Mapped[Numeric] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    invoiced_amount: Mapped[Numeric] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    collected_amount: Mapped[Numeric] = mapped_column(Numeric(14, 2), nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, DateTime, Date, ForeignKey
+from sqlalchemy import String, Integer, DateTime, Date, ForeignKey, ForeignKeyConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from . import Base
@@ -6,24 +6,35 @@ from . import Base
 
 class Shipment(Base):
     __tablename__ = "shipments"
+    __table_args__ = (
+        # sales_orders is partitioned, so its key includes the date
+        ForeignKeyConstraint(["sales_order_id", "order_date"], ["sales_orders.id", "sales_orders.date"]),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    sales_order_id: Mapped[int] = mapped_column(Integer, ForeignKey("sales_orders.id"), nullable=False)
+    sales_order_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    order_date: Mapped[Date] = mapped_column(Date, nullable=False)
     carrier: Mapped[str] = mapped_column(String, nullable=True)
     date_delivered: Mapped[Date | None] = mapped_column(Date, nullable=True)
     tracker: Mapped[str | None] = mapped_column(String, nullable=True)
 
     # Relationships
     sales_order: Mapped["SalesOrder"] = relationship("SalesOrder", back_populates="shipments")
-    shipment_items: Mapped[list["ShipmentItem"]] = relationship("ShipmentItem", back_populates="shipment")
+    shipment_items: Mapped[list["ShipmentItem"]] = relationship("ShipmentItem", back_populates="shipment", passive_deletes=True)
 
 
 class ShipmentItem(Base):
     __tablename__ = "shipment_items"
+    __table_args__ = (
+        # so_items is partitioned, so its key includes the order's date
+        ForeignKeyConstraint(["so_item_id", "order_date"], ["so_items.id", "so_items.order_date"]),
+        Index("ix_shipment_items_so_item_id_order_date", "so_item_id", "order_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    shipment_id: Mapped[int] = mapped_column(Integer, ForeignKey("shipments.id"), nullable=False)
-    so_item_id: Mapped[int] = mapped_column(Integer, ForeignKey("so_items.id"), nullable=False)
+    shipment_id: Mapped[int] = mapped_column(Integer, ForeignKey("shipments.id", ondelete="CASCADE"), nullable=False, index=True)
+    so_item_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    order_date: Mapped[Date] = mapped_column(Date, nullable=False)
     quantity_shipped: Mapped[int] = mapped_column(Integer, nullable=False)
 
     # Relationships
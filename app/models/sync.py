@@ -0,0 +1,23 @@
+from sqlalchemy import String, Integer, BigInteger, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from . import Base
+
+
+# ----------------------
+# SYNC TOMBSTONES MODEL
+# ----------------------
+class SyncTombstone(Base):
+    """
+    Record of a deleted document, served by GET /sync so offline clients can
+    drop their copy. Kept for SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_deleted_at", "deleted_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
-from typing import List
+from sqlalchemy import or_
+from typing import List, Literal, Optional
+from app.config import get_settings
 from app.db import get_db
 from app.models.customers import Customer as CustomerModel
-from app.schemas.schemas import Customer as CustomerSchema
+from app.schemas.schemas import (
+    Customer as CustomerSchema,
+    CustomerCreate,
+    CustomerSearchResult,
+    CustomerImportResult,
+    CustomerStatement,
+    StatementEntry,
+)
+from app.services.coalesce import coalesced
+from app.services.customer_index import customer_index, publish_customer_changes, refresh_customers
+from app.services.customer_import import MATCH_KEYS, import_customers
+from app.services.customer_statement import fetch_statement_page
+from app.services.product_search import escape_like
+from app.services.streaming import ImportFormatError, detect_format
 
 router = APIRouter(tags=["customers"])
 
 @router.get("/customers", response_model=List[CustomerSchema])
+@coalesced()
 async def list_customers(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(CustomerModel).order_by(CustomerModel.id))
     customers = result.scalars().all()
@@ -22,4 +39,124 @@ async def list_customers(db: AsyncSession = Depends(get_db)):
             contact_person=customer.contact_person
         )
         for customer in customers
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/customers/search", response_model=List[CustomerSearchResult])
+async def search_customers(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    if customer_index.ready:
+        return [
+            CustomerSearchResult(id=customer_id, name=name, email=email)
+            for customer_id, name, email in customer_index.search(q, limit)
+        ]
+
+    # Index still warming up: the same matches as the index (a prefix of the
+    # whole value or of any word in it; emails also by local part) with ILIKE
+    # served by the trigram indexes
+    term = escape_like(q.strip())
+    conditions = []
+    for column in (CustomerModel.name, CustomerModel.contact_person):
+        conditions.append(column.ilike(f"{term}%"))
+        if " " not in term:
+            conditions.append(column.ilike(f"% {term}%"))
+    conditions.append(CustomerModel.email.ilike(f"{term}%"))
+    result = await db.execute(
+        select(CustomerModel.id, CustomerModel.name, CustomerModel.email)
+        .where(or_(*conditions))
+        .order_by(CustomerModel.name)
+        .limit(limit)
+    )
+    return [
+        CustomerSearchResult(id=row.id, name=row.name, email=row.email)
+        for row in result.all()
+    ]
+
+@router.post("/customers", response_model=CustomerSchema, status_code=status.HTTP_201_CREATED)
+async def create_customer(request: CustomerCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        async with db.begin():
+            customer = CustomerModel(
+                name=request.name,
+                contact_person=request.contact_person,
+                email=request.email,
+                phone=request.phone,
+                address=request.address,
+            )
+            db.add(customer)
+            await db.flush()
+            await publish_customer_changes(db, [customer.id])
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="A customer with this email already exists")
+
+    customer_index.upsert(customer.id, customer.name, customer.contact_person, customer.email)
+
+    return CustomerSchema(
+        id=customer.id,
+        name=customer.name,
+        email=customer.email,
+        phone=customer.phone,
+        address=customer.address,
+        contact_person=customer.contact_person
+    )
+
+@router.post("/customers/import", response_model=CustomerImportResult)
+async def import_customers_endpoint(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    match_on: Optional[Literal["name", "phone", "none"]] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk upsert customers keyed on email from a streamed CSV or NDJSON body"""
+    format = format or detect_format(request.headers.get("content-type", ""))
+    match_on = match_on or get_settings().CUSTOMER_IMPORT_MATCH_KEY
+    if match_on not in MATCH_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unsupported match key: {match_on}")
+
+    try:
+        async with db.begin():
+            summary, rows = await import_customers(db, request.stream(), format, match_on)
+            changed = [row["customer_id"] for row in rows if row["outcome"] in ("inserted", "updated")]
+            await publish_customer_changes(db, changed)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Other workers catch up from the notifications; this one at once
+    await refresh_customers(changed)
+
+    return CustomerImportResult(summary=summary, rows=rows)
+
+@router.get("/customers/{customer_id}/statement", response_model=CustomerStatement)
+async def get_customer_statement(
+    customer_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    """Chronological ledger of orders, invoices and payments with a running balance"""
+    result = await db.execute(select(CustomerModel.id).where(CustomerModel.id == customer_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    try:
+        entries, next_cursor = await fetch_statement_page(db, customer_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return CustomerStatement(
+        customerId=customer_id,
+        entries=[
+            StatementEntry(
+                type=entry["type"],
+                id=entry["id"],
+                number=entry["number"],
+                date=entry["date"],
+                amount=float(entry["amount"]),
+                balance=float(entry["balance"]),
+            )
+            for entry in entries
+        ],
+        nextCursor=next_cursor,
+    )
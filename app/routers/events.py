@@ -0,0 +1,58 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.lifecycle import lifecycle
+from app.services.change_feed import CLOSED, ENTITIES, Subscriber, change_feed
+
+router = APIRouter(tags=["events"])
+
+# Comment lines keep proxies from closing idle streams and let us notice
+# clients that went away, and a shutdown that has started draining
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    entities: Optional[str] = Query(None, description="Comma-separated: sales_order,invoice,shipment"),
+    sales_order_id: Optional[int] = Query(None, alias="salesOrderId"),
+    customer_id: Optional[int] = Query(None, alias="customerId"),
+):
+    wanted = set(entities.split(",")) if entities else set(ENTITIES)
+    unknown = wanted - set(ENTITIES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown entities: {', '.join(sorted(unknown))}")
+
+    subscriber = Subscriber(entities=wanted, sales_order_id=sales_order_id, customer_id=customer_id)
+    change_feed.subscribe(subscriber)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            # uvicorn waits for open responses before shutting down; ending the
+            # stream once draining starts lets the client reconnect elsewhere
+            while not lifecycle.draining:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+
+                if event is CLOSED:
+                    break
+                if event["entity"] == "resync":
+                    # Events were dropped: the client should refetch what it shows
+                    subscriber.overflowed = False
+                yield f"event: {event['entity']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            change_feed.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy import func
-from typing import List
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime
+from decimal import Decimal
 from pydantic import BaseModel
 from app.db import get_db
-from app.models.invoices import Invoice as InvoiceModel, InvoiceItem as InvoiceItemModel, InvoiceStatus
-from app.models.sales_orders import SalesOrder as SalesOrderModel, SOItem, SOInvoiceStatus
+from app.models.invoices import Invoice as InvoiceModel, InvoiceItem as InvoiceItemModel, InvoiceStatus, Payment as PaymentModel
+from app.models.sales_orders import SalesOrder as SalesOrderModel, SOItem
 from app.schemas.schemas import LineItem, InvoiceSchema
+from app.services import change_feed, sales_person_counters
+from app.services.document_numbers import document_date, next_document_number
+from app.services.order_status import schedule_status_recompute
+from app.services.partitions import default_list_window
+from app.services.includes import Include, include_param
+from app.services.loaders import Loaders, get_loaders
+from app.services.versioning import SALES_ORDER_ETAG_HEADER, check_if_match, claim_version, etag
 
 router = APIRouter(tags=["invoices"])
 
@@ -28,73 +36,131 @@ class InvoicedQuantityResponse(BaseModel):
     soItemId: str
     quantity: int
 
+class CreatePaymentRequest(BaseModel):
+    date: str
+    amount: float
+    method: str
+    reference: str | None = None
+
+class PaymentResponse(BaseModel):
+    id: int
+    invoiceId: int
+    date: str
+    amount: float
+    method: str
+    reference: Optional[str]
+    invoiceStatus: str
+
 async def generate_invoice_number(db: AsyncSession) -> str:
-    """Generate sequential invoice number like INV-2025-001"""
-    current_year = datetime.now().year
-    
-    result = await db.execute(
-        select(InvoiceModel.invoice_number)
-        .where(InvoiceModel.invoice_number.like(f"INV-{current_year}-%"))
-        .order_by(InvoiceModel.invoice_number.desc())
-        .limit(1)
+    """Next sequential invoice number like INV-2025-001 (document_number_counters)"""
+    return await next_document_number(db, "INV")
+
+
+INVOICE_RELATIONS = ("items", "customer", "salesOrder")
+
+# Without ?include= the responses keep their long-standing shape
+invoice_include = include_param(INVOICE_RELATIONS, default=("items", "customer"))
+
+
+def invoice_load_options(include: Include) -> list:
+    options = []
+    if "items" in include:
+        options.append(selectinload(InvoiceModel.invoice_items).selectinload(InvoiceItemModel.so_item))
+    if "salesOrder" in include:
+        options.append(selectinload(InvoiceModel.sales_order))
+    return options
+
+
+def invoice_list_query(date_from: Optional[date], date_to: Optional[date], include: Include):
+    # Date bounds prune invoice partitions outside the range
+    query = select(InvoiceModel)
+    if date_from:
+        query = query.where(InvoiceModel.date >= date_from)
+    if date_to:
+        query = query.where(InvoiceModel.date <= date_to)
+    return query.options(*invoice_load_options(include)).order_by(InvoiceModel.created_at.desc())
+
+
+def invoice_detail_query(invoice_id: int, invoice_date: date, include: Include):
+    # The date (from document_date) prunes to the invoice's partition
+    return (
+        select(InvoiceModel)
+        .options(*invoice_load_options(include))
+        .where(InvoiceModel.id == invoice_id, InvoiceModel.date == invoice_date)
     )
-    last_invoice = result.scalar_one_or_none()
-    
-    if last_invoice:
-        try:
-            last_num = int(last_invoice.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    
-    return f"INV-{current_year}-{new_num:03d}"
 
-@router.get("/invoices", response_model=List[InvoiceSchema])
-async def list_invoices(db: AsyncSession = Depends(get_db)):
+
+async def invoice_totals(db: AsyncSession, invoices) -> Dict[int, Tuple[float, float]]:
+    """(subtotal, tax) per invoice summed in SQL, for responses without items"""
+    if not invoices:
+        return {}
+    amount = InvoiceItemModel.quantity_invoiced * SOItem.price
     result = await db.execute(
-        select(InvoiceModel)
-        .options(
-            selectinload(InvoiceModel.invoice_items)
-            .selectinload(InvoiceItemModel.so_item)
-            .selectinload(SOItem.product),
-            selectinload(InvoiceModel.customer),
-            selectinload(InvoiceModel.sales_person),
-            selectinload(InvoiceModel.sales_order)
-        )
-        .order_by(InvoiceModel.created_at.desc())
+        select(InvoiceItemModel.invoice_id, func.sum(amount), func.sum(amount * SOItem.tax_rate))
+        .join(SOItem, SOItem.id == InvoiceItemModel.so_item_id)
+        .where(InvoiceItemModel.invoice_id.in_([invoice.id for invoice in invoices]))
+        .group_by(InvoiceItemModel.invoice_id)
     )
-    invoices = result.scalars().unique().all()
-    
+    return {invoice_id: (float(subtotal), float(tax)) for invoice_id, subtotal, tax in result.all()}
+
+
+async def build_invoice_responses(
+    db: AsyncSession, loaders: Loaders, invoices, include: Include
+) -> List[InvoiceSchema]:
+    """List/detail responses carrying only the relations named in include"""
+    products = customers = {}
+    if "items" in include:
+        products = await loaders.products.load_many(
+            inv_item.so_item.product_id for invoice in invoices for inv_item in invoice.invoice_items
+        )
+        totals = {}
+    else:
+        totals = await invoice_totals(db, invoices)
+    if "customer" in include:
+        customers = await loaders.customers.load_many(invoice.customer_id for invoice in invoices)
+
     response = []
     for invoice in invoices:
-        subtotal = 0.0
-        tax = 0.0
-        items = []
-        for inv_item in invoice.invoice_items:
-            so_item = inv_item.so_item
-            item_total = float(inv_item.quantity_invoiced * so_item.price)
-            item_tax = item_total * float(so_item.tax_rate)
-            subtotal += item_total
-            tax += item_tax
+        fields = {}
+        if "items" in include:
+            subtotal = 0.0
+            tax = 0.0
+            items = []
+            for inv_item in invoice.invoice_items:
+                so_item = inv_item.so_item
+                item_total = float(inv_item.quantity_invoiced * so_item.price)
+                item_tax = item_total * float(so_item.tax_rate)
+                subtotal += item_total
+                tax += item_tax
+                product = products.get(so_item.product_id)
 
-            items.append(
-                LineItem(
-                    id=str(inv_item.id),
-                    productId=str(so_item.product_id),
-                    productName=so_item.product.name if so_item.product else "Unknown",
-                    description=so_item.product.description if so_item.product else None,
-                    quantity=inv_item.quantity_invoiced,
-                    unitCost=float(so_item.product.cost_price) if so_item.product else 0.0,
-                    unitPrice=float(so_item.price),
-                    total=item_total,
-                    taxRate=float(so_item.tax_rate),
-                    shippedQuantity=0
+                items.append(
+                    LineItem(
+                        id=str(inv_item.id),
+                        productId=str(so_item.product_id),
+                        productName=product.name if product else "Unknown",
+                        description=product.description if product else None,
+                        quantity=inv_item.quantity_invoiced,
+                        unitCost=float(product.cost_price) if product else 0.0,
+                        unitPrice=float(so_item.price),
+                        total=item_total,
+                        taxRate=float(so_item.tax_rate),
+                        shippedQuantity=0
+                    )
                 )
-            )
+            fields["items"] = items
+        else:
+            subtotal, tax = totals.get(invoice.id, (0.0, 0.0))
 
-        total = subtotal + tax
+        if "customer" in include:
+            customer = customers.get(invoice.customer_id)
+            fields.update(
+                customerName=customer.name if customer else "Unknown",
+                customerEmail=customer.email if customer else None,
+                customerAddress=customer.address if customer else None,
+            )
+        if "salesOrder" in include:
+            fields["salesOrderNumber"] = invoice.sales_order.order_number if invoice.sales_order else None
 
         response.append(
             InvoiceSchema(
@@ -102,32 +168,74 @@ async def list_invoices(db: AsyncSession = Depends(get_db)):
                 invoiceNumber=invoice.invoice_number,
                 salesOrderId=invoice.sales_order_id,
                 customerId=invoice.customer_id,
-                customerName=invoice.customer.name if invoice.customer else "Unknown",
-                customerEmail=invoice.customer.email if invoice.customer else None,
-                customerAddress=invoice.customer.address if invoice.customer else None,
                 date=invoice.date.isoformat(),
                 dueDate=invoice.due_date.isoformat(),
                 subtotal=subtotal,
                 tax=tax,
-                total=total,
+                total=subtotal + tax,
                 status=invoice.status.value,
                 notes=invoice.notes,
                 createdAt=invoice.created_at.isoformat(),
                 updatedAt=invoice.updated_at.isoformat(),
-                items=items
+                version=invoice.version,
+                **fields,
             )
         )
-    
     return response
 
+
+@router.get("/invoices", response_model=List[InvoiceSchema], response_model_exclude_unset=True)
+async def list_invoices(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    include: Include = Depends(invoice_include),
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    # Unbounded lists would scan every partition; default to the current year
+    if date_from is None and date_to is None:
+        date_from, date_to = default_list_window()
+    result = await db.execute(invoice_list_query(date_from, date_to, include))
+    invoices = result.scalars().unique().all()
+    return await build_invoice_responses(db, loaders, invoices, include)
+
+
+@router.get("/invoices/{invoice_id}", response_model=InvoiceSchema, response_model_exclude_unset=True)
+async def get_invoice(
+    invoice_id: int,
+    response: Response,
+    include: Include = Depends(invoice_include),
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    invoice = None
+    invoice_date = await document_date(db, "invoice", invoice_id)
+    if invoice_date is not None:
+        result = await db.execute(invoice_detail_query(invoice_id, invoice_date, include))
+        invoice = result.scalar_one_or_none()
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+
+    # Payments take this back in If-Match
+    response.headers["ETag"] = etag(invoice.version)
+    [invoice_response] = await build_invoice_responses(db, loaders, [invoice], include)
+    return invoice_response
+
 @router.get("/sales-orders/{order_id}/invoiced-quantities", response_model=List[InvoicedQuantityResponse])
 async def get_invoiced_quantities(order_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(SalesOrderModel)
-        .options(selectinload(SalesOrderModel.items))
-        .where(SalesOrderModel.id == order_id)
-    )
-    sales_order = result.scalar_one_or_none()
+    sales_order = None
+    order_date = await document_date(db, "sales_order", order_id)
+    if order_date is not None:
+        result = await db.execute(
+            select(SalesOrderModel)
+            .options(selectinload(SalesOrderModel.items))
+            .where(
+                SalesOrderModel.id == order_id,
+                SalesOrderModel.date == order_date,
+                SalesOrderModel.deleted_at.is_(None),
+            )
+        )
+        sales_order = result.scalar_one_or_none()
     if not sales_order:
         raise HTTPException(status_code=404, detail="Sales order not found")
 
@@ -145,24 +253,45 @@ async def get_invoiced_quantities(order_id: int, db: AsyncSession = Depends(get_
 @router.post("/invoices", response_model=InvoiceSchema)
 async def create_invoice(
     request: CreateInvoiceRequest,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
 ):
     try:
         async with db.begin():
+            order_date = await document_date(db, "sales_order", request.salesOrderId)
+            if order_date is None:
+                raise HTTPException(status_code=404, detail="Sales order not found")
             result = await db.execute(
                 select(SalesOrderModel)
                 .options(selectinload(SalesOrderModel.items))
-                .where(SalesOrderModel.id == request.salesOrderId)
+                .where(
+                    SalesOrderModel.id == request.salesOrderId,
+                    SalesOrderModel.date == order_date,
+                    SalesOrderModel.deleted_at.is_(None),
+                )
             )
             sales_order = result.scalar_one_or_none()
             if not sales_order:
                 raise HTTPException(status_code=404, detail="Sales order not found")
+            # If-Match names the sales order version the client invoiced against.
+            # Checked and bumped under the order's row lock, which also keeps a
+            # concurrent invoice from reading the remaining quantities below
+            # until this one has committed.
+            order_version = await claim_version(
+                db, SalesOrderModel, if_match,
+                SalesOrderModel.id == sales_order.id,
+                SalesOrderModel.date == sales_order.date,
+                SalesOrderModel.deleted_at.is_(None),
+            )
 
             invoice_number = await generate_invoice_number(db)
 
             invoice = InvoiceModel(
                 invoice_number=invoice_number,
                 sales_order_id=request.salesOrderId,
+                order_date=sales_order.date,
                 customer_id=sales_order.customer_id,
                 date=datetime.fromisoformat(request.date).date(),
                 due_date=datetime.fromisoformat(request.dueDate).date(),
@@ -176,7 +305,8 @@ async def create_invoice(
             for item_data in request.items:
                 result = await db.execute(
                     select(SOItem)
-                    .where(SOItem.id == item_data.soItemId)
+                    # order_date lets Postgres prune to the order's partition
+                    .where(SOItem.id == item_data.soItemId, SOItem.order_date == sales_order.date)
                 )
                 so_item = result.scalar_one_or_none()
                 if not so_item or so_item.sales_order_id != sales_order.id:
@@ -192,43 +322,29 @@ async def create_invoice(
 
                 invoice_item = InvoiceItemModel(
                     invoice_id=invoice.id,
+                    invoice_date=invoice.date,
                     so_item_id=item_data.soItemId,
+                    order_date=sales_order.date,
                     quantity_invoiced=item_data.quantity
                 )
                 db.add(invoice_item)
 
-            fully_invoiced = True
-            has_partial = False
-            for so_item in sales_order.items:
-                result = await db.execute(
-                    select(func.sum(InvoiceItemModel.quantity_invoiced))
-                    .where(InvoiceItemModel.so_item_id == so_item.id)
-                )
-                total_invoiced = result.scalar() or 0
-                if total_invoiced < so_item.quantity:
-                    fully_invoiced = False
-                if total_invoiced > 0:
-                    has_partial = True
-
-            if fully_invoiced:
-                sales_order.invoice_status = SOInvoiceStatus.invoiced
-            elif has_partial:
-                sales_order.invoice_status = SOInvoiceStatus.partial
-            else:
-                sales_order.invoice_status = SOInvoiceStatus.not_invoiced
+            await db.flush()
+            await sales_person_counters.add_invoice(db, invoice.id)
+            await change_feed.publish(db, "invoice", [invoice.id])
+            # The order's invoice status is recomputed after commit (app.worker)
+            await schedule_status_recompute(db, sales_order.id)
 
         result = await db.execute(
             select(InvoiceModel)
-            .options(
-                selectinload(InvoiceModel.invoice_items)
-                .selectinload(InvoiceItemModel.so_item)
-                .selectinload(SOItem.product),
-                selectinload(InvoiceModel.customer),
-                selectinload(InvoiceModel.sales_person)
-            )
-            .where(InvoiceModel.id == invoice.id)
+            .options(selectinload(InvoiceModel.invoice_items).selectinload(InvoiceItemModel.so_item))
+            .where(InvoiceModel.id == invoice.id, InvoiceModel.date == invoice.date)
         )
         created_invoice = result.scalar_one()
+        products = await loaders.products.load_many(
+            inv_item.so_item.product_id for inv_item in created_invoice.invoice_items
+        )
+        customer = await loaders.customers.load(created_invoice.customer_id)
 
         subtotal = 0.0
         tax = 0.0
@@ -239,15 +355,16 @@ async def create_invoice(
             item_tax = item_total * float(so_item.tax_rate)
             subtotal += item_total
             tax += item_tax
+            product = products.get(so_item.product_id)
 
             items.append(
                 LineItem(
                     id=str(inv_item.id),
                     productId=str(so_item.product_id),
-                    productName=so_item.product.name if so_item.product else "Unknown",
-                    description=so_item.product.description if so_item.product else None,
+                    productName=product.name if product else "Unknown",
+                    description=product.description if product else None,
                     quantity=inv_item.quantity_invoiced,
-                    unitCost=float(so_item.product.cost_price) if so_item.product else 0.0,
+                    unitCost=float(product.cost_price) if product else 0.0,
                     unitPrice=float(so_item.price),
                     total=item_total,
                     taxRate=float(so_item.tax_rate),
@@ -257,14 +374,16 @@ async def create_invoice(
 
         total = subtotal + tax
 
+        # The order's new version, for the client's next If-Match on it
+        response.headers[SALES_ORDER_ETAG_HEADER] = etag(order_version)
         return InvoiceSchema(
             id=created_invoice.id,
             invoiceNumber=created_invoice.invoice_number,
             salesOrderId=created_invoice.sales_order_id,
             customerId=created_invoice.customer_id,
-            customerName=created_invoice.customer.name if created_invoice.customer else "Unknown",
-            customerEmail=created_invoice.customer.email if created_invoice.customer else None,
-            customerAddress=created_invoice.customer.address if created_invoice.customer else None,
+            customerName=customer.name if customer else "Unknown",
+            customerEmail=customer.email if customer else None,
+            customerAddress=customer.address if customer else None,
             date=created_invoice.date.isoformat(),
             dueDate=created_invoice.due_date.isoformat(),
             subtotal=subtotal,
@@ -274,11 +393,88 @@ async def create_invoice(
             notes=created_invoice.notes,
             createdAt=created_invoice.created_at.isoformat(),
             updatedAt=created_invoice.updated_at.isoformat(),
-            items=items
+            items=items,
+            version=created_invoice.version
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Failed to create invoice: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/invoices/{invoice_id}/payments", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
+async def create_payment(
+    invoice_id: int,
+    request: CreatePaymentRequest,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        async with db.begin():
+            invoice_date = await document_date(db, "invoice", invoice_id)
+            if invoice_date is None:
+                raise HTTPException(status_code=404, detail="Invoice not found")
+            result = await db.execute(
+                select(InvoiceModel)
+                .where(InvoiceModel.id == invoice_id, InvoiceModel.date == invoice_date)
+                .with_for_update()
+            )
+            invoice = result.scalar_one_or_none()
+            if not invoice:
+                raise HTTPException(status_code=404, detail="Invoice not found")
+            check_if_match(if_match, invoice.version)
+
+            payment = PaymentModel(
+                invoice_id=invoice.id,
+                invoice_date=invoice.date,
+                customer_id=invoice.customer_id,
+                payment_date=datetime.fromisoformat(request.date).date(),
+                amount=Decimal(str(request.amount)),
+                method=request.method,
+                reference=request.reference
+            )
+            db.add(payment)
+            await db.flush()
+
+            result = await db.execute(
+                select(func.sum(InvoiceItemModel.quantity_invoiced * SOItem.price * (1 + SOItem.tax_rate)))
+                .join(SOItem, SOItem.id == InvoiceItemModel.so_item_id)
+                .where(InvoiceItemModel.invoice_id == invoice.id)
+            )
+            invoice_total = result.scalar() or 0
+            result = await db.execute(
+                select(func.sum(PaymentModel.amount)).where(PaymentModel.invoice_id == invoice.id)
+            )
+            paid = result.scalar() or 0
+
+            invoice.status = InvoiceStatus.paid if paid >= round(invoice_total, 2) else InvoiceStatus.partial
+            # The status may stay as it was; touching the row still bumps the
+            # version and puts the invoice, with its new payment, in /sync
+            invoice.updated_at = func.now()
+
+            await db.flush()
+            await sales_person_counters.add_payment(db, payment.id)
+            await change_feed.publish(db, "invoice", [invoice.id])
+            if invoice.sales_order_id:
+                await schedule_status_recompute(db, invoice.sales_order_id)
+
+        return PaymentResponse(
+            id=payment.id,
+            invoiceId=invoice.id,
+            date=payment.payment_date.isoformat(),
+            amount=float(payment.amount),
+            method=payment.method,
+            reference=payment.reference,
+            invoiceStatus=invoice.status.value
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to record payment: {str(e)}"
+        )
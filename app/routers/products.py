@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Literal, Optional
 from app.db import get_db
 from app.models.products import Product as ProductModel
-from app.schemas.schemas import ProductBase as ProductSchema
+from app.schemas.schemas import ProductBase as ProductSchema, ProductAvailability, ProductImportResult
+from app.services.coalesce import coalesced
+from app.services.product_search import build_product_search_query
+from app.services.product_import import import_products
+from app.services.streaming import ImportFormatError, detect_format
 
 router = APIRouter(tags=["products"])
 
 @router.get("/products", response_model=List[ProductSchema])
+@coalesced()
 async def list_products(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(ProductModel).order_by(ProductModel.id))
     products = result.scalars().all()
@@ -20,10 +25,70 @@ async def list_products(db: AsyncSession = Depends(get_db)):
             description=product.description,
             category_id=product.category_id,
             quantity=product.quantity,
+            reserved_quantity=product.reserved_quantity,
             # tax_rate=float(product.tax_rate),
             cost_price=float(product.cost_price),
             selling_price=float(product.selling_price),
             image=product.image
         )
         for product in products
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/products/search", response_model=List[ProductSchema])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(build_product_search_query(q, limit))
+    return [
+        ProductSchema(
+            id=product.id,
+            name=product.name,
+            sku=product.sku,
+            description=product.description,
+            category_id=product.category_id,
+            quantity=product.quantity,
+            reserved_quantity=product.reserved_quantity,
+            cost_price=float(product.cost_price),
+            selling_price=float(product.selling_price) if product.selling_price is not None else 0.0,
+            image=product.image
+        )
+        for product, _rank in result.all()
+    ]
+
+@router.get("/products/{product_id}/availability", response_model=ProductAvailability)
+async def get_product_availability(product_id: int, db: AsyncSession = Depends(get_db)):
+    # Single-row read: reservations are maintained on order writes, no so_items scan
+    result = await db.execute(
+        select(ProductModel.quantity, ProductModel.reserved_quantity)
+        .where(ProductModel.id == product_id)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    return ProductAvailability(
+        product_id=product_id,
+        quantity=row.quantity,
+        reserved_quantity=row.reserved_quantity,
+        available_quantity=row.quantity - row.reserved_quantity,
+    )
+
+@router.post("/products/import", response_model=ProductImportResult)
+async def import_products_endpoint(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk upsert products keyed on SKU from a streamed CSV or NDJSON body"""
+    if format is None:
+        format = detect_format(request.headers.get("content-type", ""))
+
+    try:
+        async with db.begin():
+            summary = await import_products(db, request.stream(), format)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ProductImportResult(**summary)
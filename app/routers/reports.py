@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, literal_column
+from typing import List, Literal, Optional
+from datetime import date
+from app.db import get_db
+from app.models.sales_rollups import SalesRollupDaily as Rollup
+from app.models.customers import Customer
+from app.models.sales_persons import SalesPerson
+from app.models.products import Product
+from app.models.categories import Category
+from app.schemas.schemas import SalesReportRow
+
+router = APIRouter(tags=["reports"])
+
+# group_by -> (rollup dimension, table providing labels)
+LABEL_SOURCES = {
+    "customer": Customer,
+    "sales_person": SalesPerson,
+    "product": Product,
+    "category": Category,
+}
+
+
+@router.get("/reports/sales", response_model=List[SalesReportRow])
+async def sales_report(
+    group_by: Literal["month", "customer", "sales_person", "product", "category"] = "month",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Sales totals served from the daily rollup table, so the cost depends on
+    the number of days and groups in range rather than on raw line items.
+    """
+    # Every order has exactly one customer, so monthly totals sum customer rows
+    dimension = "customer" if group_by == "month" else group_by
+
+    if group_by == "month":
+        key = func.to_char(func.date_trunc("month", Rollup.day), "YYYY-MM")
+    else:
+        key = Rollup.dimension_id
+
+    query = (
+        select(
+            key.label("key"),
+            func.sum(Rollup.order_count).label("order_count"),
+            func.sum(Rollup.quantity).label("quantity"),
+            func.sum(Rollup.revenue).label("revenue"),
+            func.sum(Rollup.tax).label("tax"),
+        )
+        .where(Rollup.dimension == dimension)
+        .group_by(literal_column("1"))
+    )
+    if date_from:
+        query = query.where(Rollup.day >= date_from)
+    if date_to:
+        query = query.where(Rollup.day <= date_to)
+
+    if group_by == "month":
+        query = query.order_by(literal_column("1"))
+        label_source = None
+    else:
+        query = query.order_by(func.sum(Rollup.revenue).desc()).limit(limit)
+        label_source = LABEL_SOURCES[group_by]
+
+    totals = (await db.execute(query)).all()
+
+    labels = {}
+    if label_source is not None:
+        ids = [row.key for row in totals if row.key]
+        if ids:
+            result = await db.execute(
+                select(label_source.id, label_source.name).where(label_source.id.in_(ids))
+            )
+            labels = dict(result.all())
+
+    return [
+        SalesReportRow(
+            key=str(row.key),
+            label=row.key if group_by == "month" else labels.get(row.key),
+            orderCount=row.order_count,
+            quantity=row.quantity,
+            revenue=float(row.revenue),
+            tax=float(row.tax),
+            total=float(row.revenue + row.tax),
+        )
+        for row in totals
+    ]
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import func
-from typing import List
-from datetime import datetime
+from sqlalchemy import func, tuple_
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime
 from pydantic import BaseModel
 from app.db import get_db
 from app.models.sales_orders import SalesOrder as SalesOrderModel, SOItem
@@ -16,6 +16,17 @@ from app.models.sales_persons import SalesPerson
 from app.models.quotations import Quotation
 from app.models.invoices import Invoice
 from app.models.categories import Category
+from app.services.inventory import aggregate_quantities, reserve_stock
+from app.services.sales_rollups import add_order_to_rollups
+from app.services import change_feed, sales_person_counters
+from app.services.archive import fetch_archived_order
+from app.services.document_numbers import document_date, next_document_number
+from app.services.order_deletion import soft_delete_orders, purge_in_background
+from app.services.partitions import default_list_window
+from app.services.versioning import check_if_match, etag, parse_if_match
+from app.services.coalesce import coalesced
+from app.services.includes import Include, include_param
+from app.services.loaders import Loaders, get_loaders
 
 
 
@@ -23,35 +34,15 @@ router = APIRouter(tags=["sales-orders"])
 
 
 async def generate_order_number(db: AsyncSession) -> str:
-    """Generate sequential order number like SO-2025-001"""
-    current_year = datetime.now().year
-    
-    # Find the highest order number for current year
-    result = await db.execute(
-        select(SalesOrderModel.order_number)
-        .where(SalesOrderModel.order_number.like(f"SO-{current_year}-%"))
-        .order_by(SalesOrderModel.order_number.desc())
-        .limit(1)
-    )
-    last_order = result.scalar_one_or_none()
-    
-    if last_order:
-        # Extract number and increment (e.g., "SO-2025-001" -> 2)
-        try:
-            last_num = int(last_order.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    
-    return f"SO-{current_year}-{new_num:03d}"  # Zero-padded 3 digits
+    """Next sequential order number like SO-2025-001 (document_number_counters)"""
+    return await next_document_number(db, "SO")
 
 
 @router.post("/sales-orders", response_model=SalesOrderSchema)
 async def create_sales_order(
     request: CreateSalesOrderRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
 ):
     try:
         async with db.begin():
@@ -70,27 +61,41 @@ async def create_sales_order(
             db.add(sales_order)
             await db.flush()
 
+            # Also reused for the response below
+            ordered_products = await loaders.products.load_many(item.product_id for item in request.items)
             for item_data in request.items:
+                product = ordered_products.get(item_data.product_id)
                 so_item = SOItem(
                     sales_order_id=sales_order.id,
+                    order_date=sales_order.date,
                     product_id=item_data.product_id,
+                    category_id=product.category_id if product else None,
                     quantity=item_data.quantity,
                     price=item_data.price,
                     tax_rate=item_data.tax_rate
                 )
                 db.add(so_item)
 
+            await reserve_stock(
+                db,
+                aggregate_quantities((item.product_id, item.quantity) for item in request.items),
+            )
+
+            await db.flush()
+            await add_order_to_rollups(db, sales_order.id)
+            await sales_person_counters.add_order(db, sales_order.id)
+            await change_feed.publish(db, "sales_order", [sales_order.id])
+
         # 🔑 re-query with eager load to get relationships
         result = await db.execute(
             select(SalesOrderModel)
-            .options(
-                selectinload(SalesOrderModel.customer),
-                selectinload(SalesOrderModel.sales_person),
-                selectinload(SalesOrderModel.items).selectinload(SOItem.product)
-            )
-            .where(SalesOrderModel.id == sales_order.id)
+            .options(selectinload(SalesOrderModel.items))
+            .where(SalesOrderModel.id == sales_order.id, SalesOrderModel.date == sales_order.date)
         )
         created_order = result.scalar_one()
+        products = await loaders.products.load_many(item.product_id for item in created_order.items)
+        customer = await loaders.customers.load(created_order.customer_id)
+        sales_person = await loaders.sales_persons.load(created_order.sales_person_id)
 
         # Build response
         subtotal, tax, items = 0.0, 0.0, []
@@ -99,15 +104,16 @@ async def create_sales_order(
             item_tax = item_total * float(item.tax_rate)
             subtotal += item_total
             tax += item_tax
+            product = products.get(item.product_id)
 
             items.append(
                 LineItem(
                     id=str(item.id),
                     productId=str(item.product_id),
-                    productName=item.product.name if item.product else "Unknown",
-                    description=item.product.description if item.product else None,
+                    productName=product.name if product else "Unknown",
+                    description=product.description if product else None,
                     quantity=item.quantity,
-                    unitCost=float(item.product.cost_price) if item.product else 0.0,
+                    unitCost=float(product.cost_price) if product else 0.0,
                     unitPrice=float(item.price),
                     total=item_total,
                     taxRate=float(item.tax_rate),
@@ -122,12 +128,12 @@ async def create_sales_order(
             orderNumber=created_order.order_number,
             quotationId=created_order.quotation_id,
             customerId=created_order.customer_id,
-            customerName=created_order.customer.name if created_order.customer else "Unknown",
-            customerContactPerson=created_order.customer.contact_person if created_order.customer else None,
-            customerEmail=created_order.customer.email if created_order.customer else None,
-            customerAddress=created_order.customer.address if created_order.customer else None,
+            customerName=customer.name if customer else "Unknown",
+            customerContactPerson=customer.contact_person if customer else None,
+            customerEmail=customer.email if customer else None,
+            customerAddress=customer.address if customer else None,
             salesPersonId=created_order.sales_person_id,
-            salesPersonName=created_order.sales_person.name if created_order.sales_person else None,
+            salesPersonName=sales_person.name if sales_person else None,
             date=created_order.date.isoformat(),
             deliveryDate=None,
             subtotal=subtotal,
@@ -140,6 +146,7 @@ async def create_sales_order(
             createdAt=created_order.created_at.isoformat(),
             updatedAt=created_order.updated_at.isoformat(),
             items=items,
+            version=created_order.version,
         )
 
     except Exception as e:
@@ -151,182 +158,244 @@ async def create_sales_order(
 
 
 
-@router.get("/sales-orders", response_model=List[SalesOrderSchema])
-async def list_sales_orders(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
+ORDER_RELATIONS = ("items", "shipments", "customer", "salesPerson", "quotation")
+
+# Without ?include= the responses keep their long-standing shape
+order_include = include_param(ORDER_RELATIONS, default=("items", "shipments", "customer", "salesPerson"))
+
+
+def order_load_options(include: Include) -> list:
+    options = []
+    if "items" in include:
+        options.append(selectinload(SalesOrderModel.items))
+    if "shipments" in include:
+        options.append(selectinload(SalesOrderModel.shipments).selectinload(Shipment.shipment_items))
+    if "quotation" in include:
+        options.append(selectinload(SalesOrderModel.quotation))
+    return options
+
+
+def order_list_query(date_from: Optional[date], date_to: Optional[date], include: Include):
+    # Date bounds prune sales_orders/so_items partitions outside the range
+    query = select(SalesOrderModel).where(SalesOrderModel.deleted_at.is_(None))
+    if date_from:
+        query = query.where(SalesOrderModel.date >= date_from)
+    if date_to:
+        query = query.where(SalesOrderModel.date <= date_to)
+    return query.options(*order_load_options(include)).order_by(SalesOrderModel.created_at.desc())
+
+
+def order_detail_query(order_id: int, order_date: date, include: Include):
+    # The date (from document_date) prunes to the order's partition
+    return (
         select(SalesOrderModel)
-        .options(
-            selectinload(SalesOrderModel.items).selectinload(SOItem.product),
-            selectinload(SalesOrderModel.customer),
-            selectinload(SalesOrderModel.shipments).selectinload(Shipment.shipment_items),
-            selectinload(SalesOrderModel.sales_person),
-            selectinload(SalesOrderModel.quotation)
+        .options(*order_load_options(include))
+        .where(
+            SalesOrderModel.id == order_id,
+            SalesOrderModel.date == order_date,
+            SalesOrderModel.deleted_at.is_(None),
         )
-        .order_by(SalesOrderModel.created_at.desc())
     )
-    orders = result.scalars().unique().all()
-    
-    # Transform the data to match the desired response format
+
+
+async def order_totals(db: AsyncSession, orders) -> Dict[int, Tuple[float, float]]:
+    """(subtotal, tax) per order summed in SQL, for responses without items"""
+    if not orders:
+        return {}
+    amount = SOItem.quantity * SOItem.price
+    result = await db.execute(
+        select(SOItem.sales_order_id, func.sum(amount), func.sum(amount * SOItem.tax_rate))
+        # order_date lets Postgres prune to the orders' partitions
+        .where(tuple_(SOItem.sales_order_id, SOItem.order_date).in_([(order.id, order.date) for order in orders]))
+        .group_by(SOItem.sales_order_id)
+    )
+    return {order_id: (float(subtotal), float(tax)) for order_id, subtotal, tax in result.all()}
+
+
+async def build_order_responses(
+    db: AsyncSession, loaders: Loaders, orders, include: Include
+) -> List[SalesOrderSchema]:
+    """List/detail responses carrying only the relations named in include"""
+    products = customers = sales_persons = {}
+    if "items" in include:
+        products = await loaders.products.load_many(item.product_id for order in orders for item in order.items)
+        totals = {}
+    else:
+        totals = await order_totals(db, orders)
+    if "customer" in include:
+        customers = await loaders.customers.load_many(order.customer_id for order in orders)
+    if "salesPerson" in include:
+        sales_persons = await loaders.sales_persons.load_many(order.sales_person_id for order in orders)
+
     response = []
     for order in orders:
-        # Calculate totals from line items
-        subtotal = 0.0
-        tax = 0.0
-        
-        for item in order.items:
-            item_total = float(item.quantity * item.price)
-            item_tax = item_total * float(item.tax_rate)
-            subtotal += item_total
-            tax += item_tax
-        
-        total = subtotal + tax
-        tax_rate = tax / subtotal if subtotal > 0 else 0.0
-        
-        # Get delivery date from the first shipment if available
-        delivery_date = None
-        if order.shipments:
-            delivery_date = order.shipments[0].date_delivered
-        
-        # Prepare line items
-        items = []
-        for item in order.items:
-            # Calculate shipped quantity from shipment_items
-            shipped_quantity = 0
-            for shipment in order.shipments:
-                for shipment_item in shipment.shipment_items:
-                    if shipment_item.so_item_id == item.id:
-                        shipped_quantity += shipment_item.quantity_shipped
-            
-            item_total = float(item.quantity * item.price)
-            item_tax = item_total * float(item.tax_rate)
-            
-            items.append(
-                LineItem(
+        fields = {}
+        if "items" in include:
+            # Calculate totals from line items
+            subtotal = 0.0
+            tax = 0.0
+            items = []
+            for item in order.items:
+                item_total = float(item.quantity * item.price)
+                item_tax = item_total * float(item.tax_rate)
+                subtotal += item_total
+                tax += item_tax
+                product = products.get(item.product_id)
+
+                line = dict(
                     id=str(item.id),  # Keep as string for line items
                     productId=str(item.product_id),
-                    productName=item.product.name if item.product else "Unknown",
-                    description=item.product.description if item.product else None,
+                    productName=product.name if product else "Unknown",
+                    description=product.description if product else None,
                     quantity=item.quantity,
-                    unitCost=float(item.product.cost_price) if item.product else 0.0,
+                    unitCost=float(product.cost_price) if product else 0.0,
                     unitPrice=float(item.price),
                     total=item_total,
                     taxRate=float(item.tax_rate),
-                    shippedQuantity=shipped_quantity
                 )
+                if "shipments" in include:
+                    # Calculate shipped quantity from shipment_items
+                    line["shippedQuantity"] = sum(
+                        shipment_item.quantity_shipped
+                        for shipment in order.shipments
+                        for shipment_item in shipment.shipment_items
+                        if shipment_item.so_item_id == item.id
+                    )
+                items.append(LineItem(**line))
+            fields["items"] = items
+        else:
+            subtotal, tax = totals.get(order.id, (0.0, 0.0))
+
+        if "shipments" in include:
+            # Get delivery date from the first shipment if available
+            delivery_date = order.shipments[0].date_delivered if order.shipments else None
+            fields["deliveryDate"] = delivery_date.isoformat() if delivery_date else None
+        if "customer" in include:
+            customer = customers.get(order.customer_id)
+            fields.update(
+                customerName=customer.name if customer else "Unknown",
+                customerContactPerson=customer.contact_person if customer else None,
+                customerEmail=customer.email if customer else None,
+                customerAddress=customer.address if customer else None,
             )
-        
+        if "salesPerson" in include:
+            sales_person = sales_persons.get(order.sales_person_id)
+            fields["salesPersonName"] = sales_person.name if sales_person else None
+        if "quotation" in include:
+            fields["quotationNumber"] = order.quotation.quotation_number if order.quotation else None
+
         response.append(
             SalesOrderSchema(
                 id=order.id,  # Keep as integer
                 orderNumber=order.order_number,
                 quotationId=order.quotation_id,
                 customerId=order.customer_id,
-                customerName=order.customer.name if order.customer else "Unknown",
-                customerContactPerson=order.customer.contact_person if order.customer else None,
-                customerEmail=order.customer.email if order.customer else None,
-                customerAddress=order.customer.address if order.customer else None,
-                salesPersonId=order.sales_person.id,
-                salesPersonName=order.sales_person.name if order.sales_person else None,
+                salesPersonId=order.sales_person_id,
                 date=order.date.isoformat(),
-                deliveryDate=delivery_date.isoformat() if delivery_date else None,
                 subtotal=subtotal,
                 tax=tax,
-                total=total,
+                total=subtotal + tax,
                 invoiceStatus=order.invoice_status.value,
                 paymentStatus=order.payment_status.value,
                 shipmentStatus=order.shipment_status.value,
                 notes=order.notes,
                 createdAt=order.created_at.isoformat(),
                 updatedAt=order.updated_at.isoformat(),
-                items=items
+                version=order.version,
+                **fields,
             )
         )
-    
     return response
 
 
-@router.get("/sales-orders/{order_id}", response_model=SalesOrderSchema)
-async def get_sales_order(order_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(SalesOrderModel)
-        .options(
-            selectinload(SalesOrderModel.items).selectinload(SOItem.product),
-            selectinload(SalesOrderModel.customer),
-            selectinload(SalesOrderModel.shipments),
-            selectinload(SalesOrderModel.sales_person)
-        )
-        .where(SalesOrderModel.id == order_id)
-    )
-    order = result.scalar_one_or_none()
+@router.get("/sales-orders", response_model=List[SalesOrderSchema], response_model_exclude_unset=True)
+@coalesced(exclude_unset=True)
+async def list_sales_orders(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    include: Include = Depends(order_include),
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    # Unbounded lists would scan every partition; default to the current year
+    if date_from is None and date_to is None:
+        date_from, date_to = default_list_window()
+    result = await db.execute(order_list_query(date_from, date_to, include))
+    orders = result.scalars().unique().all()
+    return await build_order_responses(db, loaders, orders, include)
+
+
+@router.get("/sales-orders/{order_id}", response_model=SalesOrderSchema, response_model_exclude_unset=True)
+async def get_sales_order(
+    order_id: int,
+    response: Response,
+    include: Include = Depends(order_include),
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    order = None
+    order_date = await document_date(db, "sales_order", order_id)
+    if order_date is not None:
+        result = await db.execute(order_detail_query(order_id, order_date, include))
+        order = result.scalar_one_or_none()
     
     if not order:
-        raise HTTPException(status_code=404, detail="Sales order not found")
-    
-    # Calculate totals from line items (same logic as list endpoint)
+        # Closed orders are moved out of the hot tables by app.services.archive
+        archived = await fetch_archived_order(db, order_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Sales order not found")
+        return archived_order_response(archived)
+
+    response.headers["ETag"] = etag(order.version)
+    [order_response] = await build_order_responses(db, loaders, [order], include)
+    return order_response
+
+
+def archived_order_response(archived: dict) -> SalesOrderSchema:
+    """Build the detail response from rows returned by fetch_archived_order"""
+    order = archived["order"]
     subtotal = 0.0
     tax = 0.0
-    
-    for item in order.items:
-        item_total = float(item.quantity * item.price)
-        item_tax = item_total * float(item.tax_rate)
-        subtotal += item_total
-        tax += item_tax
-    
-    total = subtotal + tax
-    tax_rate = tax / subtotal if subtotal > 0 else 0.0
-    
-    # Get delivery date from the first shipment if available
-    delivery_date = None
-    if order.shipments:
-        delivery_date = order.shipments[0].date_delivered
-    
-    # Prepare line items
     items = []
-    for item in order.items:
-        # Calculate shipped quantity from shipment_items
-        shipped_quantity = 0
-        for shipment in order.shipments:
-            for shipment_item in shipment.shipment_items:
-                if shipment_item.so_item_id == item.id:
-                    shipped_quantity += shipment_item.quantity_shipped
-        
+    for item in archived["items"]:
         item_total = float(item.quantity * item.price)
-        item_tax = item_total * float(item.tax_rate)
-        
+        subtotal += item_total
+        tax += item_total * float(item.tax_rate)
         items.append(
             LineItem(
                 id=str(item.id),
                 productId=str(item.product_id),
-                productName=item.product.name if item.product else "Unknown",
-                description=item.product.description if item.product else None,
+                productName=item.product_name or "Unknown",
+                description=item.product_description,
                 quantity=item.quantity,
-                unitCost=float(item.product.cost_price) if item.product else 0.0,
+                unitCost=float(item.product_cost_price or 0),
                 unitPrice=float(item.price),
                 total=item_total,
                 taxRate=float(item.tax_rate),
-                shippedQuantity=shipped_quantity
+                shippedQuantity=item.shipped_quantity
             )
         )
 
+    delivery_date = archived["date_delivered"]
     return SalesOrderSchema(
-        id=order.id,  # Keep as integer
+        id=order.id,
         orderNumber=order.order_number,
         quotationId=order.quotation_id,
         customerId=order.customer_id,
-        customerName=order.customer.name,
-        customerContactPerson=order.customer.contact_person if order.customer else None,
-        customerEmail=order.customer.email if order.customer else None,
-        customerAddress=order.customer.address if order.customer else None,
-        salesPersonId=order.sales_person.id,            
-        salesPersonName=order.sales_person.name,
+        customerName=order.customer_name,
+        customerContactPerson=order.customer_contact_person,
+        customerEmail=order.customer_email,
+        customerAddress=order.customer_address,
+        salesPersonId=order.sales_person_id,
+        salesPersonName=order.sales_person_name,
         date=order.date.isoformat(),
         deliveryDate=delivery_date.isoformat() if delivery_date else None,
         subtotal=subtotal,
         tax=tax,
-        total=total,
-        invoiceStatus=order.invoice_status.value,
-        paymentStatus=order.payment_status.value,
-        shipmentStatus=order.shipment_status.value,
+        total=subtotal + tax,
+        invoiceStatus=order.invoice_status,
+        paymentStatus=order.payment_status,
+        shipmentStatus=order.shipment_status,
         notes=order.notes,
         createdAt=order.created_at.isoformat(),
         updatedAt=order.updated_at.isoformat(),
@@ -334,18 +403,58 @@ async def get_sales_order(order_id: int, db: AsyncSession = Depends(get_db)):
     )
 
 
+class BulkDeleteRequest(BaseModel):
+    ids: List[int]
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: List[int]
+    notFound: List[int]
+
+
 @router.delete("/sales-orders/{order_id}", status_code=status.HTTP_200_OK)
-async def delete_sales_order(order_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_sales_order(
+    order_id: int,
+    background_tasks: BackgroundTasks,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    # Only flags the order; its rows are purged in batches after the response
     async with db.begin():
-        result = await db.execute(
-            select(SalesOrderModel).where(SalesOrderModel.id == order_id)
-        )
-        order = result.scalar_one_or_none()
+        deleted = await soft_delete_orders(db, [order_id], parse_if_match(if_match))
+        if not deleted:
+            result = await db.execute(
+                select(SalesOrderModel.version)
+                .where(SalesOrderModel.id == order_id, SalesOrderModel.deleted_at.is_(None))
+            )
+            version = result.scalar_one_or_none()
+            if version is None:
+                raise HTTPException(status_code=404, detail="Sales order not found")
+            check_if_match(if_match, version)
+
+    background_tasks.add_task(purge_in_background)
+    return {"message": "Sales order deleted successfully"}
 
-        if not order:
-            raise HTTPException(status_code=404, detail="Sales order not found")
 
-        # Just delete sales order, Postgres cascades the rest
-        await db.delete(order)
+@router.post("/sales-orders/bulk-delete", response_model=BulkDeleteResponse)
+async def bulk_delete_sales_orders(
+    request: BulkDeleteRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
+    order_ids = sorted(set(request.ids))
+    try:
+        async with db.begin():
+            deleted = await soft_delete_orders(db, order_ids)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to delete sales orders: {str(e)}"
+        )
 
-    return {"message": "Sales order deleted successfully"}
\ No newline at end of file
+    if deleted:
+        background_tasks.add_task(purge_in_background)
+    return BulkDeleteResponse(
+        deleted=sorted(deleted),
+        notFound=sorted(set(order_ids) - set(deleted)),
+    )
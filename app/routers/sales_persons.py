@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import and_, func, or_
 from typing import List
+from datetime import date
 from app.db import get_db
 from app.models.sales_persons import SalesPerson as SalesPersonModel
-from app.schemas.schemas import SalesPerson as SalesPersonSchema
+from app.models.sales_rollups import SalesPersonCounter
+from app.schemas.schemas import SalesPerson as SalesPersonSchema, SalesPersonLeaderboardRow
+from app.services.sales_person_counters import split_period
 
 
 router = APIRouter(tags=["salespersons"])
@@ -19,4 +23,51 @@ async def list_sales_persons(db: AsyncSession = Depends(get_db)):
             name=sales_person.name,
         )
         for sales_person in sales_persons
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/salespersons/leaderboard", response_model=List[SalesPersonLeaderboardRow])
+async def sales_person_leaderboard(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_db),
+):
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    # A handful of day/month/year counter rows per person, whatever the range
+    periods = or_(*[
+        and_(
+            SalesPersonCounter.grain == grain,
+            SalesPersonCounter.period_start.between(first, last),
+        )
+        for grain, first, last in split_period(date_from, date_to)
+    ])
+    totals = (
+        select(
+            SalesPersonCounter.sales_person_id,
+            func.sum(SalesPersonCounter.order_count).label("order_count"),
+            func.sum(SalesPersonCounter.order_revenue).label("revenue"),
+            func.sum(SalesPersonCounter.invoiced_amount).label("invoiced"),
+            func.sum(SalesPersonCounter.collected_amount).label("collected"),
+        )
+        .where(periods)
+        .group_by(SalesPersonCounter.sales_person_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(SalesPersonModel.id, SalesPersonModel.name, totals)
+        .outerjoin(totals, totals.c.sales_person_id == SalesPersonModel.id)
+        .order_by(func.coalesce(totals.c.revenue, 0).desc(), SalesPersonModel.name)
+    )
+
+    return [
+        SalesPersonLeaderboardRow(
+            salesPersonId=row.id,
+            salesPersonName=row.name,
+            orderCount=row.order_count or 0,
+            revenue=float(row.revenue or 0),
+            invoiced=float(row.invoiced or 0),
+            collected=float(row.collected or 0),
+        )
+        for row in result.all()
+    ]
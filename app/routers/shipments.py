@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from app.db import get_db
-from app.models.sales_orders import SalesOrder as SalesOrderModel, SOItem, ShipmentStatus
+from app.models.sales_orders import SalesOrder as SalesOrderModel, SOItem
 from app.models.shipments import Shipment as ShipmentModel, ShipmentItem as ShipmentItemModel
+from app.services.inventory import aggregate_quantities, ship_stock
+from app.services import change_feed
+from app.services.document_numbers import document_date
+from app.services.order_status import schedule_status_recompute
+from app.services.versioning import SALES_ORDER_ETAG_HEADER, claim_version, etag
 
 router = APIRouter(tags=["shipments"])
 
@@ -29,12 +34,19 @@ class ShippedQuantityResponse(BaseModel):
 
 @router.get("/sales-orders/{order_id}/shipped-quantities", response_model=List[ShippedQuantityResponse])
 async def get_shipped_quantities(order_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(SalesOrderModel)
-        .options(selectinload(SalesOrderModel.items))
-        .where(SalesOrderModel.id == order_id)
-    )
-    sales_order = result.scalar_one_or_none()
+    sales_order = None
+    order_date = await document_date(db, "sales_order", order_id)
+    if order_date is not None:
+        result = await db.execute(
+            select(SalesOrderModel)
+            .options(selectinload(SalesOrderModel.items))
+            .where(
+                SalesOrderModel.id == order_id,
+                SalesOrderModel.date == order_date,
+                SalesOrderModel.deleted_at.is_(None),
+            )
+        )
+        sales_order = result.scalar_one_or_none()
     if not sales_order:
         raise HTTPException(status_code=404, detail="Sales order not found")
 
@@ -52,21 +64,41 @@ async def get_shipped_quantities(order_id: int, db: AsyncSession = Depends(get_d
 @router.post("/shipments", status_code=status.HTTP_201_CREATED)
 async def create_shipment(
     request: CreateShipmentRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     try:
         async with db.begin():
+            order_date = await document_date(db, "sales_order", request.salesOrderId)
+            if order_date is None:
+                raise HTTPException(status_code=404, detail="Sales order not found")
             result = await db.execute(
                 select(SalesOrderModel)
                 .options(selectinload(SalesOrderModel.items))
-                .where(SalesOrderModel.id == request.salesOrderId)
+                .where(
+                    SalesOrderModel.id == request.salesOrderId,
+                    SalesOrderModel.date == order_date,
+                    SalesOrderModel.deleted_at.is_(None),
+                )
             )
             sales_order = result.scalar_one_or_none()
             if not sales_order:
                 raise HTTPException(status_code=404, detail="Sales order not found")
+            # If-Match names the sales order version the client shipped against.
+            # Checked and bumped under the order's row lock, which also keeps a
+            # concurrent shipment from reading the remaining quantities below
+            # until this one has committed.
+            order_version = await claim_version(
+                db, SalesOrderModel, if_match,
+                SalesOrderModel.id == sales_order.id,
+                SalesOrderModel.date == sales_order.date,
+                SalesOrderModel.deleted_at.is_(None),
+            )
 
             shipment = ShipmentModel(
                 sales_order_id=request.salesOrderId,
+                order_date=sales_order.date,
                 carrier=request.carrier,
                 date_delivered=datetime.fromisoformat(request.date).date() if request.date else None,
                 tracker=request.tracker
@@ -74,10 +106,12 @@ async def create_shipment(
             db.add(shipment)
             await db.flush()
 
+            shipped_lines = []
             for item_data in request.items:
                 result = await db.execute(
                     select(SOItem)
-                    .where(SOItem.id == item_data.soItemId)
+                    # order_date lets Postgres prune to the order's partition
+                    .where(SOItem.id == item_data.soItemId, SOItem.order_date == sales_order.date)
                 )
                 so_item = result.scalar_one_or_none()
                 if not so_item or so_item.sales_order_id != sales_order.id:
@@ -94,32 +128,26 @@ async def create_shipment(
                 shipment_item = ShipmentItemModel(
                     shipment_id=shipment.id,
                     so_item_id=item_data.soItemId,
+                    order_date=sales_order.date,
                     quantity_shipped=item_data.quantity
                 )
                 db.add(shipment_item)
+                shipped_lines.append((so_item.product_id, item_data.quantity))
 
-            fully_shipped = True
-            has_partial = False
-            for so_item in sales_order.items:
-                result = await db.execute(
-                    select(func.sum(ShipmentItemModel.quantity_shipped))
-                    .where(ShipmentItemModel.so_item_id == so_item.id)
-                )
-                total_shipped = result.scalar() or 0
-                if total_shipped < so_item.quantity:
-                    fully_shipped = False
-                if total_shipped > 0:
-                    has_partial = True
+            # Decrement stock for all shipped lines in one conditional UPDATE
+            await ship_stock(db, aggregate_quantities(shipped_lines))
 
-            if fully_shipped:
-                sales_order.shipment_status = ShipmentStatus.shipped
-            elif has_partial:
-                sales_order.shipment_status = ShipmentStatus.partial
-            else:
-                sales_order.shipment_status = ShipmentStatus.not_shipped
+            await db.flush()
+            await change_feed.publish(db, "shipment", [shipment.id])
+            # The order's shipment status is recomputed after commit (app.worker)
+            await schedule_status_recompute(db, sales_order.id)
 
+        # The order's new version, for the client's next If-Match on it
+        response.headers[SALES_ORDER_ETAG_HEADER] = etag(order_version)
         return {"message": "Shipment created successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
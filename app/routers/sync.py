@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db
+from app.services.sync import SyncCursorExpired, fetch_changes
+
+router = APIRouter(tags=["sync"])
+
+
+class SyncChange(BaseModel):
+    entity: str
+    id: int
+    op: str  # upsert | delete
+    changedAt: datetime
+    data: Optional[Any] = None
+
+
+class SyncPage(BaseModel):
+    changes: List[SyncChange]
+    cursor: str
+    hasMore: bool
+
+
+@router.get("/sync", response_model=SyncPage)
+async def sync_changes(
+    since: Optional[str] = Query(None, description="Cursor from the previous response; omit for a full download"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Sales orders, invoices, quotations and purchase orders changed since the cursor"""
+    try:
+        changes, cursor, has_more = await fetch_changes(db, limit, since)
+    except SyncCursorExpired:
+        raise HTTPException(status_code=410, detail="Sync cursor expired, full resync required")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return SyncPage(
+        changes=[SyncChange(**change) for change in changes],
+        cursor=cursor,
+        hasMore=has_more,
+    )
@@ -86,15 +86,18 @@ class SalesOrder(BaseModel):
     id: int
     orderNumber: str
     quotationId: Optional[int]
+    # Relation fields default to None: list/detail responses leave out the
+    # ones not named in ?include=
+    quotationNumber: Optional[str] = None
     customerId: int
-    customerName: str
-    customerContactPerson: Optional[str]
-    customerEmail: Optional[EmailStr]
-    customerAddress: Optional[str]
+    customerName: Optional[str] = None
+    customerContactPerson: Optional[str] = None
+    customerEmail: Optional[EmailStr] = None
+    customerAddress: Optional[str] = None
     salesPersonId: int
-    salesPersonName: str
+    salesPersonName: Optional[str] = None
     date: date
-    deliveryDate: Optional[date]
+    deliveryDate: Optional[date] = None
     subtotal: float
     tax: float
     # taxRate: float
@@ -105,7 +108,9 @@ class SalesOrder(BaseModel):
     notes: Optional[str]
     createdAt: datetime
     updatedAt: datetime
-    items: List[LineItem]
+    items: Optional[List[LineItem]] = None
+    # Send back in If-Match to make a write conditional on this version
+    version: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -123,6 +128,41 @@ class Customer(BaseModel):
     class Config:
         from_attributes = True
 
+class CustomerCreate(BaseModel):
+    name: str
+    contact_person: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+
+class CustomerSearchResult(BaseModel):
+    id: int
+    name: str
+    email: Optional[str] = None
+
+class CustomerImportRow(BaseModel):
+    line_no: int
+    outcome: str  # inserted | updated | unchanged | duplicate | ambiguous | invalid
+    customer_id: Optional[int] = None
+    message: Optional[str] = None
+
+class CustomerImportResult(BaseModel):
+    summary: dict[str, int]
+    rows: List[CustomerImportRow]
+
+class StatementEntry(BaseModel):
+    type: str  # order | invoice | payment
+    id: int
+    number: Optional[str] = None
+    date: date
+    amount: float
+    balance: float
+
+class CustomerStatement(BaseModel):
+    customerId: int
+    entries: List[StatementEntry]
+    nextCursor: Optional[str] = None
+
 class SalesPerson(BaseModel):
     id: int
     name: str
@@ -130,6 +170,14 @@ class SalesPerson(BaseModel):
     class Config:
         from_attributes = True
 
+class SalesPersonLeaderboardRow(BaseModel):
+    salesPersonId: int
+    salesPersonName: str
+    orderCount: int
+    revenue: float
+    invoiced: float
+    collected: float
+
 class ProductBase(BaseModel):
     id: int 
     name: str
@@ -137,6 +185,7 @@ class ProductBase(BaseModel):
     description: Optional[str] = None
     category_id: Optional[int] = None
     quantity: int
+    reserved_quantity: int = 0
     # tax_rate: float
     cost_price: float
     selling_price: float
@@ -146,6 +195,29 @@ class ProductBase(BaseModel):
         from_attributes = True
         # extra = "allow"  # Allow extra fields like 'price' for compatibility
 
+class ProductAvailability(BaseModel):
+    product_id: int
+    quantity: int
+    reserved_quantity: int
+    available_quantity: int
+
+class ProductImportResult(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    duplicates: int
+    unresolved_categories: int
+
+class SalesReportRow(BaseModel):
+    key: str
+    label: Optional[str] = None
+    orderCount: int
+    quantity: int
+    revenue: float
+    tax: float
+    total: float
+
 class ShipmentBase(BaseModel):
     id: int
     sales_order_id: int
@@ -169,10 +241,12 @@ class InvoiceSchema(BaseModel):
     id: int
     invoiceNumber: str
     salesOrderId: Optional[int]
+    # Relation fields default to None, as on SalesOrder
+    salesOrderNumber: Optional[str] = None
     customerId: int
-    customerName: str
-    customerEmail: Optional[str]
-    customerAddress: Optional[str]
+    customerName: Optional[str] = None
+    customerEmail: Optional[str] = None
+    customerAddress: Optional[str] = None
     date: str  # ISO format date (e.g., "2025-09-05")
     dueDate: str  # ISO format date (e.g., "2025-10-05")
     subtotal: float
@@ -182,7 +256,8 @@ class InvoiceSchema(BaseModel):
     notes: Optional[str]
     createdAt: str  # ISO format datetime (e.g., "2025-09-05T01:02:00Z")
     updatedAt: str  # ISO format datetime (e.g., "2025-09-05T01:02:00Z")
-    items: List[LineItem]
+    items: Optional[List[LineItem]] = None
+    version: Optional[int] = None
 
     class Config:
         from_attributes = True  # Enables ORM compatibility
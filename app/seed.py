@@ -0,0 +1,565 @@
+"""
+Fill an empty database with a consistent synthetic dataset.
+
+    python -m app.seed --orders 1000000 --seed 42 --truncate
+
+Reference data (categories, products, customers, sales persons, suppliers,
+users) is generated and copied first. Sales orders with their items,
+quotations, shipments, invoices and payments are then generated in
+independent chunks. Each chunk is generated and COPYed by a worker process on
+its own connection. A chunk's rows depend only on --seed and the chunk number,
+so the same arguments always produce the same data, whatever the worker count.
+
+Statuses agree with the documents, as the outbox recompute would leave
+them. Stock reservations, the sales rollups and the sales person counters are
+rebuilt at the end, and the id sequences are moved past the seeded ids.
+"""
+import argparse
+import asyncio
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, List, Sequence, Tuple
+import asyncpg
+from sqlalchemy import text
+from app.config import get_settings
+from app.db import AsyncSessionLocal, engine
+from app.services.archive import ARCHIVE_SCHEMA, ARCHIVED_TABLES
+from app.services.document_numbers import rebuild_number_counters
+from app.services.partitions import ensure_partitions
+from app.services.sales_person_counters import rebuild_counters
+from app.services.sales_rollups import rebuild_rollups
+
+# table -> (columns, rows)
+Tables = Dict[str, Tuple[Sequence[str], List[tuple]]]
+
+SEEDED_TABLES = (
+    "roles", "users", "categories", "products", "customers", "sales_persons", "suppliers",
+    "quotations", "qo_items", "sales_orders", "so_items", "shipments", "shipment_items",
+    "invoices", "invoice_items", "payments",
+    "purchase_orders", "po_items", "purchase_receipts", "receipt_items",
+)
+# Also emptied by --truncate; the first four are rebuilt from the seeded rows
+# (document_numbers by its triggers during the load)
+DERIVED_TABLES = (
+    "sales_rollup_daily", "sales_person_counters", "document_numbers", "document_number_counters",
+    "sync_tombstones", "outbox_events", "audit_log",
+)
+
+# Child ids are derived from their parent's, leaving gaps but no coordination:
+# a line's id is (parent id - 1) * MAX_LINES + line number.
+MAX_LINES = 5
+LINE_COUNT_WEIGHTS = (30, 30, 20, 12, 8)
+QUANTITY_WEIGHTS = (35, 25, 15, 10, 5, 4, 3, 2, 1)
+
+TAX_RATES = (Decimal("0"), Decimal("0.0500"), Decimal("0.1200"), Decimal("0.2000"))
+CARRIERS = ("UPS", "FedEx", "DHL", "USPS")
+PAYMENT_METHODS = ("bank_transfer", "card", "cash", "check")
+WORDS = (
+    "steel", "bolt", "washer", "copper", "pipe", "valve", "cable", "switch",
+    "bracket", "hinge", "panel", "sensor", "relay", "filter", "pump", "gasket",
+)
+FIRST_NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Robin", "Avery")
+LAST_NAMES = ("Smith", "Garcia", "Chen", "Novak", "Okafor", "Silva", "Kowalski", "Haddad", "Ito", "Larsen")
+
+UTC = timezone.utc
+
+
+@dataclass(frozen=True)
+class Plan:
+    orders: int
+    customers: int
+    products: int
+    categories: int
+    sales_persons: int
+    suppliers: int
+    purchase_orders: int
+    start: date
+    end: date
+    seed: int
+    chunk_size: int
+
+    @property
+    def chunks(self) -> int:
+        return math.ceil(self.orders / self.chunk_size)
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+
+def _rng(plan: Plan, stream: str) -> random.Random:
+    # String seeds are hashed with SHA-512, so they are stable across runs
+    return random.Random(f"{plan.seed}/{stream}")
+
+
+def _money(value: float) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+
+def _stamp(day: date, seconds: int) -> datetime:
+    return datetime.combine(day, day_time(), UTC) + timedelta(seconds=seconds)
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+# ---------------------------------------------------------------------------
+# Reference data
+# ---------------------------------------------------------------------------
+
+def product_catalog(plan: Plan) -> List[Tuple[int, int, Decimal, Decimal, Decimal]]:
+    """(id, category id, cost, selling price, tax rate) per product; every worker derives the same"""
+    rng = _rng(plan, "products")
+    costs = [rng.uniform(2, 500) for _ in range(plan.products)]
+    markups = [rng.uniform(1.15, 1.8) for _ in range(plan.products)]
+    taxes = rng.choices(TAX_RATES, weights=(10, 20, 50, 20), k=plan.products)
+    categories = rng.choices(range(1, plan.categories + 1), k=plan.products)
+    return [
+        (i + 1, category_id, _money(cost), _money(cost * markup), tax)
+        for i, (category_id, cost, markup, tax) in enumerate(zip(categories, costs, markups, taxes))
+    ]
+
+
+def reference_tables(plan: Plan) -> Tables:
+    rng = _rng(plan, "reference")
+    catalog = product_catalog(plan)
+
+    categories = [
+        (i, f"{WORDS[(i - 1) % len(WORDS)].title()} parts {i}", None)
+        for i in range(1, plan.categories + 1)
+    ]
+    products = [
+        (
+            product_id,
+            f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {product_id}",
+            f"SEED-{product_id:08d}",
+            f"Industrial {rng.choice(WORDS)} for {rng.choice(WORDS)} assemblies",
+            category_id,
+            rng.randint(200, 2000),
+            0,
+            cost,
+            price,
+        )
+        for product_id, category_id, cost, price, _tax in catalog
+    ]
+    customers = [
+        (
+            i,
+            f"{rng.choice(LAST_NAMES)} {rng.choice(WORDS).title()} {i}",
+            _person(rng),
+            f"customer{i}@example.com",
+            f"+1-555-{i:07d}",
+            f"{rng.randint(1, 9999)} {rng.choice(WORDS).title()} Street",
+            plan.start - timedelta(days=rng.randint(0, 3650)),
+        )
+        for i in range(1, plan.customers + 1)
+    ]
+    sales_persons = [(i, f"{_person(rng)} ({i})") for i in range(1, plan.sales_persons + 1)]
+    suppliers = [
+        (i, f"{rng.choice(WORDS).title()} Supply {i}", _person(rng))
+        for i in range(1, plan.suppliers + 1)
+    ]
+    roles = [(1, "admin"), (2, "staff")]
+    # Not usable for logging in: "!" is never a valid password hash
+    users = [
+        (i, _person(rng), f"user{i}@example.com", "!", 1 if i == 1 else 2)
+        for i in range(1, 11)
+    ]
+    return {
+        "roles": (("id", "role_name"), roles),
+        "users": (("id", "name", "email", "password_hash", "role_id"), users),
+        "categories": (("id", "name", "description"), categories),
+        "products": (
+            ("id", "name", "sku", "description", "category_id", "quantity", "reserved_quantity",
+             "cost_price", "selling_price"),
+            products,
+        ),
+        "customers": (
+            ("id", "name", "contact_person", "email", "phone", "address", "customer_since"),
+            customers,
+        ),
+        "sales_persons": (("id", "name"), sales_persons),
+        "suppliers": (("id", "name", "contact_person"), suppliers),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Sales documents, one chunk of orders at a time
+# ---------------------------------------------------------------------------
+
+def order_chunk(plan: Plan, chunk: int) -> Tables:
+    """
+    Orders [chunk * chunk_size + 1, ...] with everything hanging off them.
+
+    Random draws are made per column for the whole chunk; the loop below only
+    assembles rows. Each order follows one path: optionally quoted, then
+    shipped fully, partly or not at all, invoiced for what shipped, and paid
+    fully, partly or not at all.
+    """
+    rng = _rng(plan, f"orders/{chunk}")
+    first = chunk * plan.chunk_size + 1
+    last = min(first + plan.chunk_size - 1, plan.orders)
+    n = last - first + 1
+    catalog = product_catalog(plan)
+    today = plan.end
+
+    # Popular products sell more: weights fall off like 1/rank
+    product_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(plan.products)))
+
+    day_offsets = rng.choices(range(plan.days), k=n)
+    customers = rng.choices(range(1, plan.customers + 1), k=n)
+    sales_persons = rng.choices(range(1, plan.sales_persons + 1), k=n)
+    line_counts = rng.choices(range(1, MAX_LINES + 1), weights=LINE_COUNT_WEIGHTS, k=n)
+    seconds = rng.choices(range(8 * 3600, 18 * 3600), k=n)
+    quoted = [rng.random() < 0.35 for _ in range(n)]
+    lost_quotes = [rng.random() < 0.15 for _ in range(n)]
+    ship_draws = [rng.random() for _ in range(n)]
+    invoice_draws = [rng.random() for _ in range(n)]
+    pay_draws = [rng.random() for _ in range(n)]
+    delays = rng.choices(range(0, 6), k=n)
+    transit = rng.choices(range(1, 9), k=n)
+    pay_delays = rng.choices(range(1, 45), k=n)
+    carriers = rng.choices(CARRIERS, k=n)
+    methods = rng.choices(PAYMENT_METHODS, k=n)
+    total_lines = sum(line_counts)
+    products = rng.choices(range(plan.products), cum_weights=product_weights, k=total_lines)
+    quantities = rng.choices(range(1, len(QUANTITY_WEIGHTS) + 1), weights=QUANTITY_WEIGHTS, k=total_lines)
+
+    quotations, qo_items, orders, so_items = [], [], [], []
+    shipments, shipment_items, invoices, invoice_items, payments = [], [], [], [], []
+    line = 0
+    for k in range(n):
+        order_id = first + k
+        order_date = plan.start + timedelta(days=day_offsets[k])
+        created = _stamp(order_date, seconds[k])
+        customer_id, sales_person_id = customers[k], sales_persons[k]
+
+        lines = []
+        for j in range(line_counts[k]):
+            product_id, category_id, _cost, price, tax = catalog[products[line]]
+            lines.append(
+                ((order_id - 1) * MAX_LINES + j + 1, product_id, category_id, quantities[line], price, tax)
+            )
+            line += 1
+
+        quotation_id = None
+        if quoted[k]:
+            quotation_id = order_id
+            quote_date = max(plan.start, order_date - timedelta(days=delays[k] + 3))
+            quotations.append((quotation_id, f"QT-{quote_date.year}-{quotation_id:07d}", customer_id, quote_date,
+                               "accepted", sales_person_id, None, _stamp(quote_date, seconds[k]), created))
+            qo_items.extend((item_id, quotation_id, product_id, qty, tax, price)
+                            for item_id, product_id, _category_id, qty, price, tax in lines)
+        if lost_quotes[k]:
+            # A quotation that never became an order; ids above every order id
+            lost_id = plan.orders + order_id
+            status = "open" if order_date > today - timedelta(days=30) else rng.choice(("rejected", "expired"))
+            quotations.append((lost_id, f"QT-{order_date.year}-{lost_id:07d}", customer_id, order_date,
+                               status, sales_person_id, None, created, created))
+            product_id, _category_id, _cost, price, tax = catalog[products[line - 1]]
+            qo_items.append(((lost_id - 1) * MAX_LINES + 1, lost_id, product_id, 1, tax, price))
+
+        so_items.extend((item_id, order_id, order_date, product_id, category_id, qty, tax, price)
+                        for item_id, product_id, category_id, qty, price, tax in lines)
+
+        # Shipping: older orders are further along
+        age = (today - order_date).days
+        ship_date = order_date + timedelta(days=delays[k])
+        shipped = {}
+        if ship_date <= today and ship_draws[k] < min(0.95, 0.3 + age / 60):
+            if ship_draws[k] < 0.08 and len(lines) > 1:
+                shipped = {item_id: qty for item_id, _p, _c, qty, _pr, _t in lines[:-1]}
+            else:
+                shipped = {item_id: qty for item_id, _p, _c, qty, _pr, _t in lines}
+            delivered = ship_date + timedelta(days=transit[k])
+            shipments.append((order_id, order_id, order_date, carriers[k], delivered if delivered <= today else None,
+                              f"TRK{order_id:010d}"))
+            shipment_items.extend((item_id, order_id, item_id, order_date, qty) for item_id, qty in shipped.items())
+
+        shipment_status = (
+            "not_shipped" if not shipped
+            else "shipped" if len(shipped) == len(lines) else "partial"
+        )
+
+        # Invoicing what shipped, then payment
+        invoice_status = "not_invoiced"
+        payment_status = "unpaid"
+        updated = created
+        if shipped and invoice_draws[k] < 0.9:
+            invoice_date = min(today, ship_date + timedelta(days=1))
+            due_date = invoice_date + timedelta(days=30)
+            total = sum(
+                qty * price * (1 + tax)
+                for item_id, _p, _c, qty, price, tax in lines if item_id in shipped
+            ).quantize(Decimal("0.01"))
+            invoice_items.extend((item_id, order_id, invoice_date, item_id, order_date, qty)
+                                 for item_id, qty in shipped.items())
+            invoice_status = "invoiced" if len(shipped) == len(lines) else "partial"
+
+            pay_date = invoice_date + timedelta(days=pay_delays[k])
+            status = "overdue" if due_date < today else "unpaid"
+            if pay_date <= today and pay_draws[k] < 0.85:
+                payment_base = (order_id - 1) * 2
+                if pay_draws[k] < 0.1:
+                    amount = (total / 2).quantize(Decimal("0.01"))
+                    payments.append((payment_base + 1, order_id, invoice_date, customer_id, pay_date, amount, methods[k],
+                                     f"REF{order_id:010d}"))
+                    status = "partial"
+                else:
+                    payments.append((payment_base + 1, order_id, invoice_date, customer_id, pay_date, total, methods[k],
+                                     f"REF{order_id:010d}"))
+                    status = "paid"
+            payment_status = (
+                "paid" if status == "paid" and invoice_status == "invoiced"
+                else "partial" if status in ("paid", "partial") else "unpaid"
+            )
+            invoice_stamp = _stamp(invoice_date, seconds[k])
+            updated = max(invoice_stamp, _stamp(pay_date, seconds[k]) if status in ("paid", "partial") else invoice_stamp)
+            invoices.append((order_id, f"INV-{invoice_date.year}-{order_id:07d}", order_id, order_date, customer_id,
+                             invoice_date, due_date, status, sales_person_id, None, invoice_stamp, updated))
+        elif shipped:
+            updated = _stamp(ship_date, seconds[k])
+
+        orders.append((order_id, f"SO-{order_date.year}-{order_id:07d}", quotation_id, customer_id,
+                       sales_person_id, order_date, invoice_status, payment_status, shipment_status,
+                       None, created, updated))
+
+    return {
+        "quotations": (
+            ("id", "quotation_number", "customer_id", "date", "status", "sales_person_id", "notes",
+             "created_at", "updated_at"),
+            quotations,
+        ),
+        "qo_items": (("id", "quotation_id", "product_id", "quantity", "tax_rate", "price"), qo_items),
+        "sales_orders": (
+            ("id", "order_number", "quotation_id", "customer_id", "sales_person_id", "date",
+             "invoice_status", "payment_status", "shipment_status", "notes", "created_at", "updated_at"),
+            orders,
+        ),
+        "so_items": (
+            ("id", "sales_order_id", "order_date", "product_id", "category_id", "quantity", "tax_rate", "price"),
+            so_items,
+        ),
+        "shipments": (("id", "sales_order_id", "order_date", "carrier", "date_delivered", "tracker"), shipments),
+        "shipment_items": (("id", "shipment_id", "so_item_id", "order_date", "quantity_shipped"), shipment_items),
+        "invoices": (
+            ("id", "invoice_number", "sales_order_id", "order_date", "customer_id", "date", "due_date", "status",
+             "sales_person_id", "notes", "created_at", "updated_at"),
+            invoices,
+        ),
+        "invoice_items": (
+            ("id", "invoice_id", "invoice_date", "so_item_id", "order_date", "quantity_invoiced"),
+            invoice_items,
+        ),
+        "payments": (
+            ("id", "invoice_id", "invoice_date", "customer_id", "payment_date", "amount", "method", "reference"),
+            payments,
+        ),
+    }
+
+
+def purchase_tables(plan: Plan) -> Tables:
+    """Purchase orders with items; received ones get a receipt for every line"""
+    rng = _rng(plan, "purchases")
+    catalog = product_catalog(plan)
+    today = plan.end
+    purchase_orders, po_items, receipts, receipt_items = [], [], [], []
+    for po_id in range(1, plan.purchase_orders + 1):
+        po_date = plan.start + timedelta(days=rng.randrange(plan.days))
+        supplier_id = rng.randint(1, plan.suppliers)
+        expected = po_date + timedelta(days=rng.randint(5, 30))
+        received = expected <= today and rng.random() < 0.9
+        status = "received" if received else rng.choice(("draft", "sent"))
+        lines = []
+        for j in range(rng.choices(range(1, MAX_LINES + 1), weights=LINE_COUNT_WEIGHTS)[0]):
+            product_id, _category_id, cost, _price, tax = catalog[rng.randrange(plan.products)]
+            lines.append(((po_id - 1) * MAX_LINES + j + 1, product_id, rng.randint(10, 200), cost, tax))
+        po_items.extend((item_id, po_id, product_id, qty, cost, tax, None)
+                        for item_id, product_id, qty, cost, tax in lines)
+        total = sum(qty * cost * (1 + tax) for _i, _p, qty, cost, tax in lines).quantize(Decimal("0.01"))
+        paid = received and rng.random() < 0.8
+        created = _stamp(po_date, rng.randrange(8 * 3600, 18 * 3600))
+        purchase_orders.append((
+            po_id, f"PO-{po_date.year}-{po_id:06d}", supplier_id, po_date, expected, status,
+            "paid" if paid else "unpaid", expected if paid else None, total if paid else None,
+            "bank_transfer" if paid else None, f"PAY{po_id:08d}" if paid else None,
+            "Net 30", None, None, created, created,
+        ))
+        if received:
+            receipts.append((po_id, po_id, f"GR-{expected.year}-{po_id:06d}", supplier_id, expected,
+                             rng.randint(1, 10), None, created, created))
+            receipt_items.extend((item_id, po_id, item_id, qty, None) for item_id, _p, qty, _c, _t in lines)
+    return {
+        "purchase_orders": (
+            ("id", "po_number", "supplier_id", "date", "expected_delivery_date", "status", "payment_status",
+             "payment_date", "payment_amount", "payment_method", "payment_reference", "payment_terms",
+             "shipping_address", "notes", "created_at", "updated_at"),
+            purchase_orders,
+        ),
+        "po_items": (
+            ("id", "purchase_order_id", "product_id", "quantity", "unit_cost", "tax_rate", "notes"),
+            po_items,
+        ),
+        "purchase_receipts": (
+            ("id", "purchase_order_id", "receipt_number", "supplier_id", "received_date", "received_by",
+             "notes", "created_at", "updated_at"),
+            receipts,
+        ),
+        "receipt_items": (("id", "receipt_id", "po_item_id", "quantity_received", "notes"), receipt_items),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def _dsn() -> str:
+    url = get_settings().DIRECT_DATABASE_URL
+    return url.replace("postgresql+psycopg", "postgresql").replace("postgresql+asyncpg", "postgresql")
+
+
+async def copy_tables(tables: Tables) -> Dict[str, int]:
+    """COPY the tables in order (parents first) in one transaction"""
+    conn = await asyncpg.connect(_dsn())
+    try:
+        async with conn.transaction():
+            for table, (columns, rows) in tables.items():
+                if rows:
+                    await conn.copy_records_to_table(table, records=rows, columns=list(columns))
+    finally:
+        await conn.close()
+    return {table: len(rows) for table, (_columns, rows) in tables.items()}
+
+
+def load_chunk(plan: Plan, chunk: int) -> Dict[str, int]:
+    """Worker process entry point: generate one chunk and COPY it"""
+    return asyncio.run(copy_tables(order_chunk(plan, chunk)))
+
+
+def load_purchases(plan: Plan) -> Dict[str, int]:
+    return asyncio.run(copy_tables(purchase_tables(plan)))
+
+
+SEQUENCE_SQL = "SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST((SELECT max(id) FROM {table}), 1))"
+
+# Open orders hold stock for whatever has not shipped yet (see app.services.inventory)
+RESERVATIONS_SQL = text("""
+    UPDATE products p
+    SET reserved_quantity = o.qty, quantity = p.quantity + o.qty
+    FROM (
+        SELECT si.product_id,
+               sum(si.quantity - COALESCE((SELECT sum(shi.quantity_shipped) FROM shipment_items shi
+                                           WHERE shi.so_item_id = si.id), 0)) AS qty
+        FROM so_items si
+        GROUP BY si.product_id
+    ) o
+    WHERE o.product_id = p.id
+""")
+
+
+def _periods(start: date, end: date, interval: str) -> int:
+    if interval == "month":
+        return (end.year - start.year) * 12 + end.month - start.month
+    return end.year - start.year
+
+
+async def prepare(plan: Plan, truncate: bool) -> None:
+    async with engine.begin() as conn:
+        if truncate:
+            archived = [f"{ARCHIVE_SCHEMA}.{table}" for table in ARCHIVED_TABLES]
+            await conn.execute(text(f"TRUNCATE {', '.join(SEEDED_TABLES + DERIVED_TABLES + tuple(archived))} RESTART IDENTITY CASCADE"))
+        else:
+            for table in ("customers", "products", "sales_orders"):
+                if (await conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})"))).scalar():
+                    raise SystemExit(f"{table} is not empty; pass --truncate to replace the data")
+        settings = get_settings()
+        ahead = _periods(plan.start, plan.end, settings.PARTITION_INTERVAL) + settings.PARTITION_PREMAKE
+        created = await ensure_partitions(conn, today=plan.start, ahead=ahead)
+        if created:
+            print(f"created partitions: {', '.join(created)}")
+
+
+async def finish(plan: Plan) -> None:
+    async with engine.begin() as conn:
+        for table in SEEDED_TABLES:
+            await conn.execute(text(SEQUENCE_SQL.format(table=table)))
+        await conn.execute(RESERVATIONS_SQL)
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await rebuild_rollups(session, plan.start, plan.end)
+            await rebuild_counters(session)
+            await rebuild_number_counters(session)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+
+
+def _report(label: str, counts: Dict[str, int], started: float) -> None:
+    rows = sum(counts.values())
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, help="default: orders / 10")
+    parser.add_argument("--products", type=int, help="default: orders / 200")
+    parser.add_argument("--years", type=int, default=3, help="orders are spread over this many years up to today")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--chunk-size", type=int, default=20_000, help="orders per COPY transaction")
+    parser.add_argument("--truncate", action="store_true", help="empty the seeded tables first")
+    args = parser.parse_args()
+
+    end = date.today()
+    plan = Plan(
+        orders=args.orders,
+        customers=args.customers or max(100, args.orders // 10),
+        products=args.products or max(50, args.orders // 200),
+        categories=20,
+        sales_persons=25,
+        suppliers=50,
+        purchase_orders=max(10, args.orders // 40),
+        start=date(end.year - args.years, end.month, 1),
+        end=end,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+    )
+
+    started = time.perf_counter()
+    await prepare(plan, args.truncate)
+    _report("reference data", await copy_tables(reference_tables(plan)), started)
+
+    step = time.perf_counter()
+    totals: Dict[str, int] = {}
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = [loop.run_in_executor(pool, load_chunk, plan, chunk) for chunk in range(plan.chunks)]
+        jobs.append(loop.run_in_executor(pool, load_purchases, plan))
+        for done, job in enumerate(asyncio.as_completed(jobs), 1):
+            for table, count in (await job).items():
+                totals[table] = totals.get(table, 0) + count
+            print(f"\rchunks {done}/{len(jobs)}", end="", flush=True)
+    print()
+    _report("documents", totals, step)
+
+    step = time.perf_counter()
+    await finish(plan)
+    await engine.dispose()
+    print(f"rollups, counters, reservations and ANALYZE in {time.perf_counter() - step:.1f}s")
+    print(", ".join(f"{table}={count:,}" for table, count in sorted(totals.items())))
+    print(f"total {time.perf_counter() - started:.1f}s")
+
+
+# python -m app.seed --orders 1000000 --truncate
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import re
+from collections import Counter
+from typing import Dict, Optional
+from app.config import get_settings
+from app.db import statement_timeout_ms
+
+API_PREFIX = "/api/v1"
+
+# (methods, path under /api/v1, route class); first match wins. Unlisted GETs
+# are "read", every other method "write". None bypasses admission: the SSE
+# stream holds its request open for as long as the client listens.
+ROUTE_CLASSES = [
+    ({"GET"}, re.compile(r"/events"), None),
+    ({"GET"}, re.compile(r"/(sales-orders|invoices|customers|products)"), "heavy"),
+    ({"GET"}, re.compile(r"/customers/\d+/statement"), "heavy"),
+    ({"GET"}, re.compile(r"/reports/.*"), "heavy"),
+    ({"GET"}, re.compile(r"/sync"), "heavy"),
+    ({"POST"}, re.compile(r"/(customers|products)/import"), "heavy"),
+    ({"POST"}, re.compile(r"/sales-orders/bulk-delete"), "heavy"),
+]
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    if not path.startswith(API_PREFIX):
+        return None
+    path = path[len(API_PREFIX):].rstrip("/")
+    for methods, pattern, name in ROUTE_CLASSES:
+        if method in methods and pattern.fullmatch(path):
+            return name
+    return "read" if method in ("GET", "HEAD") else "write"
+
+
+class Overloaded(Exception):
+    """No slot became free in time, or the wait queue was already full"""
+
+
+class Gate:
+    """
+    At most ``limit`` requests of one route class run at a time and at most
+    ``queue_size`` more wait, each for up to ``queue_timeout`` seconds.
+    Everything beyond that is turned away at once instead of queueing for a
+    pool connection.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float, statement_timeout: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.statement_timeout = statement_timeout
+        self.running = 0
+        self.waiting = 0
+        self.counts: Counter = Counter()
+        self._slots = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> None:
+        if not self._slots.locked():
+            await self._slots.acquire()
+            self.running += 1
+            self.counts["admitted"] += 1
+            return
+        if self.waiting >= self.queue_size:
+            self.counts["rejected"] += 1
+            raise Overloaded
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            raise Overloaded
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        self.counts["queued"] += 1
+        self.counts["admitted"] += 1
+
+    def release(self) -> None:
+        self.running -= 1
+        self._slots.release()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"limit": self.limit, "running": self.running, "waiting": self.waiting, **self.counts}
+
+
+def _gates() -> Dict[str, Gate]:
+    settings = get_settings()
+    return {
+        name: Gate(
+            name,
+            limit=getattr(settings, f"ADMISSION_{name.upper()}_LIMIT"),
+            queue_size=settings.ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            statement_timeout=getattr(settings, f"STATEMENT_TIMEOUT_{name.upper()}_MS"),
+        )
+        for name in ("heavy", "read", "write")
+    }
+
+
+gates = _gates()
+
+
+class AdmissionControlMiddleware:
+    """Sheds API requests with 503 and Retry-After before they reach the DB pool"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().ADMISSION_CONTROL:
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = gates[name]
+        try:
+            await gate.acquire()
+        except Overloaded:
+            await _send_overloaded(send, name)
+            return
+        # Picked up by get_db, which applies it with SET LOCAL per transaction
+        token = statement_timeout_ms.set(gate.statement_timeout or None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            statement_timeout_ms.reset(token)
+            gate.release()
+
+
+async def _send_overloaded(send, name: str) -> None:
+    body = json.dumps({"detail": f"Server busy ({name} requests), retry shortly"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(get_settings().ADMISSION_RETRY_AFTER).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def snapshot() -> Dict[str, Dict[str, int]]:
+    return {name: gate.snapshot() for name, gate in gates.items()}
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.config import get_settings
+from app.db import engine
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "archive"
+
+# Moved together with each order, children before parents
+ARCHIVED_TABLES = (
+    "payments",
+    "invoice_items",
+    "invoices",
+    "shipment_items",
+    "shipments",
+    "so_items",
+    "sales_orders",
+)
+
+# Which rows of each table belong to the current batch
+_BATCH_FILTERS = {
+    "payments": "(invoice_id, invoice_date) IN (SELECT id, date FROM batch_invoices)",
+    "invoice_items": "(invoice_id, invoice_date) IN (SELECT id, date FROM batch_invoices)",
+    "invoices": "(id, date) IN (SELECT id, date FROM batch_invoices)",
+    "shipment_items": "shipment_id IN (SELECT id FROM batch_shipments)",
+    "shipments": "id IN (SELECT id FROM batch_shipments)",
+    "so_items": "(sales_order_id, order_date) IN (SELECT id, date FROM batch)",
+    "sales_orders": "(id, date) IN (SELECT id, date FROM batch)",
+}
+
+COLUMNS_SQL = text("""
+    SELECT table_schema, table_name,
+           array_agg(column_name::text ORDER BY ordinal_position) AS columns
+    FROM information_schema.columns
+    WHERE table_schema IN ('public', :schema) AND table_name = ANY(:tables)
+    GROUP BY table_schema, table_name
+""")
+
+
+class ArchiveSchemaDrift(Exception):
+    """A hot table and its archive twin no longer have the same columns"""
+
+
+async def build_move_batch_sql(conn: AsyncConnection) -> str:
+    """
+    One statement that moves a batch of closed orders and all their documents.
+
+    Hot and archive tables must have exactly the same columns: a column added
+    to one but not the other would be dropped from every archived row, so the
+    move refuses to run until the migration adds it to both.
+    """
+    result = await conn.execute(COLUMNS_SQL, {"schema": ARCHIVE_SCHEMA, "tables": list(ARCHIVED_TABLES)})
+    found: Dict[tuple, List[str]] = {(schema, table): cols for schema, table, cols in result.all()}
+
+    drift = []
+    for table in ARCHIVED_TABLES:
+        hot = set(found.get(("public", table), ()))
+        archived = set(found.get((ARCHIVE_SCHEMA, table), ()))
+        if not archived:
+            drift.append(f"{ARCHIVE_SCHEMA}.{table} is missing")
+        elif hot != archived:
+            missing, extra = sorted(hot - archived), sorted(archived - hot)
+            drift.append(
+                f"{table}: not in {ARCHIVE_SCHEMA}: {', '.join(missing) or '-'}; "
+                f"only in {ARCHIVE_SCHEMA}: {', '.join(extra) or '-'}"
+            )
+    if drift:
+        raise ArchiveSchemaDrift("archive tables differ from the hot tables: " + "; ".join(drift))
+    # Hot table column order; both sides list the same names
+    columns = {table: ", ".join(f'"{c}"' for c in found[("public", table)]) for table in ARCHIVED_TABLES}
+
+    ctes = [
+        """batch AS (
+            SELECT id, date FROM sales_orders
+            WHERE shipment_status = 'shipped'
+              AND invoice_status = 'invoiced'
+              AND payment_status = 'paid'
+              AND deleted_at IS NULL
+              AND date < :cutoff
+            ORDER BY date, id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )""",
+        "batch_invoices AS (SELECT id, date FROM invoices"
+        " WHERE (sales_order_id, order_date) IN (SELECT id, date FROM batch))",
+        "batch_shipments AS (SELECT id FROM shipments"
+        " WHERE (sales_order_id, order_date) IN (SELECT id, date FROM batch))",
+    ]
+    for table in ARCHIVED_TABLES:
+        cols = columns[table]
+        ctes.append(f"moved_{table} AS (DELETE FROM {table} WHERE {_BATCH_FILTERS[table]} RETURNING {cols})")
+        ctes.append(
+            f"archived_{table} AS (INSERT INTO {ARCHIVE_SCHEMA}.{table} ({cols}) "
+            f"SELECT {cols} FROM moved_{table} RETURNING 1)"
+        )
+    counts = ", ".join(f"(SELECT count(*) FROM archived_{table}) AS {table}" for table in ARCHIVED_TABLES)
+    return "WITH " + ",\n".join(ctes) + f"\nSELECT {counts}"
+
+
+async def archive_closed_orders(
+    older_than_years: int,
+    batch_size: int,
+    max_batches: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Move fully shipped, invoiced and paid orders older than the cutoff into the
+    archive schema, one short transaction per batch so locks stay brief.
+    """
+    today = date.today()
+    cutoff = date(today.year - older_than_years, today.month, min(today.day, 28))
+    totals = {table: 0 for table in ARCHIVED_TABLES}
+
+    async with engine.connect() as conn:
+        sql = text(await build_move_batch_sql(conn))
+        await conn.rollback()
+
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            async with conn.begin():
+                moved = (await conn.execute(sql, {"cutoff": cutoff, "batch_size": batch_size})).one()
+            batches += 1
+            for table in ARCHIVED_TABLES:
+                totals[table] += getattr(moved, table)
+            logger.info("archived batch %d: %s", batches, dict(moved._mapping))
+            if moved.sales_orders < batch_size:
+                break
+
+    return totals
+
+
+ARCHIVED_ORDER_SQL = text("""
+    SELECT so.*, c.name AS customer_name, c.contact_person AS customer_contact_person,
+           c.email AS customer_email, c.address AS customer_address,
+           sp.name AS sales_person_name
+    FROM archive.sales_orders so
+    LEFT JOIN customers c ON c.id = so.customer_id
+    LEFT JOIN sales_persons sp ON sp.id = so.sales_person_id
+    WHERE so.id = :order_id
+""")
+
+ARCHIVED_ITEMS_SQL = text("""
+    SELECT si.*, p.name AS product_name, p.description AS product_description,
+           p.cost_price AS product_cost_price,
+           (SELECT COALESCE(sum(shi.quantity_shipped), 0)
+            FROM archive.shipment_items shi WHERE shi.so_item_id = si.id) AS shipped_quantity
+    FROM archive.so_items si
+    LEFT JOIN products p ON p.id = si.product_id
+    WHERE si.sales_order_id = :order_id
+    ORDER BY si.id
+""")
+
+ARCHIVED_DELIVERY_SQL = text("""
+    SELECT date_delivered FROM archive.shipments
+    WHERE sales_order_id = :order_id
+    ORDER BY id
+    LIMIT 1
+""")
+
+
+async def fetch_archived_order(db: AsyncSession, order_id: int) -> Optional[dict]:
+    """Load an archived order with its items, or None if it was never archived"""
+    order = (await db.execute(ARCHIVED_ORDER_SQL, {"order_id": order_id})).one_or_none()
+    if order is None:
+        return None
+    items: List = (await db.execute(ARCHIVED_ITEMS_SQL, {"order_id": order_id})).all()
+    delivered = (await db.execute(ARCHIVED_DELIVERY_SQL, {"order_id": order_id})).scalar_one_or_none()
+    return {"order": order, "items": items, "date_delivered": delivered}
+
+
+async def _main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Move closed sales orders into the archive schema")
+    parser.add_argument("--years", type=int, default=settings.ARCHIVE_AFTER_YEARS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    totals = await archive_closed_orders(args.years, args.batch_size, args.max_batches)
+    await engine.dispose()
+    print(", ".join(f"{table}={count}" for table, count in totals.items()))
+
+
+# python -m app.services.archive --years 3
+if __name__ == "__main__":
+    asyncio.run(_main())
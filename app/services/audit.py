@@ -0,0 +1,204 @@
+import asyncio
+import enum
+import json
+import logging
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.db import engine
+from app.models.audit import AuditLog
+from app.models.customers import Customer
+from app.models.invoices import Invoice, InvoiceItem, Payment
+from app.models.products import Product
+from app.models.purchase_orders import PurchaseOrder
+from app.models.quotations import Quotation
+from app.models.sales_orders import SalesOrder, SOItem
+from app.models.shipments import Shipment
+# Targets of PurchaseOrder's relationships, needed once it is mapped in the app
+from app.models.suppliers import Supplier  # noqa: F401
+from app.models.users import User  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Set per request from a trusted gateway's X-User-Id header (see app.main)
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+
+AUDITED_MODELS = (
+    SalesOrder, SOItem, Invoice, InvoiceItem, Payment, Shipment,
+    Quotation, PurchaseOrder, Customer, Product,
+)
+
+# Bookkeeping columns that would only add noise to every diff
+IGNORED_COLUMNS = {"created_at", "updated_at"}
+
+AUDIT_COLUMNS = ["entity", "entity_id", "action", "changes", "user_id", "changed_at"]
+
+AuditRow = Tuple[str, int, str, dict, Optional[int], datetime]
+
+
+def asserted_user_id(client_host: Optional[str], header: Optional[str]) -> Optional[int]:
+    """
+    The X-User-Id header's user if the request came from one of
+    TRUSTED_PROXIES, else None: any other client could name anyone.
+    """
+    trusted = {host.strip() for host in get_settings().TRUSTED_PROXIES.split(",") if host.strip()}
+    if client_host is None or client_host not in trusted:
+        return None
+    return int(header) if header and header.isdigit() else None
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _diff(obj, action: str) -> Dict[str, list]:
+    """
+    [old, new] per changed column, read from what is already loaded so no
+    extra queries are issued. Must run before the flush resets history.
+    """
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if key in IGNORED_COLUMNS:
+            continue
+        if action == "update":
+            history = state.attrs[key].history
+            if not history.has_changes():
+                continue
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            changes[key] = [_jsonable(old), _jsonable(new)]
+        elif key in state.dict:
+            value = _jsonable(state.dict[key])
+            changes[key] = [None, value] if action == "insert" else [value, None]
+    return changes
+
+
+def _row(entity: str, entity_id: int, action: str, changes: dict) -> AuditRow:
+    return (
+        entity, entity_id, action, changes,
+        current_user_id.get(), datetime.now(timezone.utc),
+    )
+
+
+def _stage(session: Session, rows: List[AuditRow]) -> None:
+    """Write rows now (transaction durability) or hold them until commit (async)"""
+    if not rows:
+        return
+    mode = get_settings().AUDIT_DURABILITY
+    if mode == "transaction":
+        session.connection().execute(
+            AuditLog.__table__.insert(),
+            [dict(zip(AUDIT_COLUMNS, row)) for row in rows],
+        )
+    elif mode == "async":
+        session.info.setdefault("audit_rows", []).extend(rows)
+
+
+@event.listens_for(Session, "before_flush")
+def _fill_created_by(session: Session, flush_context, instances) -> None:
+    user_id = current_user_id.get()
+    if user_id is None:
+        return
+    for obj in session.new:
+        if hasattr(obj, "created_by") and obj.created_by is None:
+            obj.created_by = user_id
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_changes(session: Session, flush_context) -> None:
+    if get_settings().AUDIT_DURABILITY == "off":
+        return
+    rows = []
+    for objects, action in ((session.new, "insert"), (session.dirty, "update"), (session.deleted, "delete")):
+        for obj in objects:
+            if not isinstance(obj, AUDITED_MODELS):
+                continue
+            changes = _diff(obj, action)
+            if changes:
+                rows.append(_row(obj.__tablename__, obj.id, action, changes))
+    _stage(session, rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _release_on_commit(session: Session) -> None:
+    rows = session.info.pop("audit_rows", None)
+    if rows:
+        audit_buffer.add(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("audit_rows", None)
+
+
+async def record_changes(db: AsyncSession, entity: str, ids: List[int], action: str, changes: dict) -> None:
+    """Audit writes made with set-based SQL, which the flush hooks cannot see"""
+    if get_settings().AUDIT_DURABILITY == "off":
+        return
+    rows = [_row(entity, entity_id, action, changes) for entity_id in ids]
+    await db.run_sync(_stage, rows)
+
+
+class AuditBuffer:
+    """
+    Committed audit rows waiting to be written. Flushed with COPY every
+    AUDIT_FLUSH_SECONDS or as soon as AUDIT_BATCH_SIZE rows are waiting.
+    Best effort: rows still buffered when the process dies are lost.
+    """
+
+    def __init__(self):
+        self.rows: List[AuditRow] = []
+        self._full = asyncio.Event()
+
+    def add(self, rows: List[AuditRow]) -> None:
+        settings = get_settings()
+        self.rows.extend(rows)
+        overflow = len(self.rows) - settings.AUDIT_MAX_BUFFER
+        if overflow > 0:
+            # The database is not keeping up; shed the oldest rows rather than grow
+            del self.rows[:overflow]
+            logger.warning("audit buffer full, dropped %d rows", overflow)
+        if len(self.rows) >= settings.AUDIT_BATCH_SIZE:
+            self._full.set()
+
+    async def flush(self) -> None:
+        rows, self.rows = self.rows, []
+        self._full.clear()
+        if not rows:
+            return
+        try:
+            async with engine.connect() as connection:
+                raw = await connection.get_raw_connection()
+                # asyncpg takes jsonb as text
+                records = [(*row[:3], json.dumps(row[3]), *row[4:]) for row in rows]
+                await raw.driver_connection.copy_records_to_table("audit_log", records=records, columns=AUDIT_COLUMNS)
+                await connection.commit()
+        except Exception:
+            logger.exception("writing %d audit rows failed, keeping them for the next flush", len(rows))
+            self.rows[:0] = rows
+
+    async def run(self, stop: asyncio.Event) -> None:
+        interval = get_settings().AUDIT_FLUSH_SECONDS
+        while not stop.is_set():
+            waiters = [asyncio.ensure_future(self._full.wait()), asyncio.ensure_future(stop.wait())]
+            await asyncio.wait(waiters, timeout=interval, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+            await self.flush()
+        await self.flush()
+
+
+audit_buffer = AuditBuffer()
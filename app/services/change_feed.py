@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "sales_events"
+
+ENTITIES = ("sales_order", "invoice", "shipment")
+
+# Last event a subscriber receives when the worker shuts down; its stream ends
+# and the client reconnects (SSE retry) to another instance
+CLOSED = {"entity": "closed"}
+
+# Events are built from the rows as they stand inside the writing transaction;
+# Postgres only delivers them once that transaction commits.
+_EVENT_SQL = {
+    "sales_order": """
+        SELECT pg_notify(:channel, json_build_object(
+            'entity', 'sales_order', 'id', so.id, 'salesOrderId', so.id,
+            'customerId', so.customer_id,
+            'invoiceStatus', so.invoice_status, 'paymentStatus', so.payment_status,
+            'shipmentStatus', so.shipment_status,
+            'deleted', so.deleted_at IS NOT NULL, 'updatedAt', so.updated_at
+        )::text)
+        FROM sales_orders so WHERE so.id = ANY(:ids)
+    """,
+    "invoice": """
+        SELECT pg_notify(:channel, json_build_object(
+            'entity', 'invoice', 'id', inv.id, 'salesOrderId', inv.sales_order_id,
+            'customerId', inv.customer_id, 'status', inv.status, 'updatedAt', inv.updated_at
+        )::text)
+        FROM invoices inv WHERE inv.id = ANY(:ids)
+    """,
+    "shipment": """
+        SELECT pg_notify(:channel, json_build_object(
+            'entity', 'shipment', 'id', sh.id, 'salesOrderId', sh.sales_order_id,
+            'customerId', so.customer_id, 'dateDelivered', sh.date_delivered, 'updatedAt', now()
+        )::text)
+        FROM shipments sh
+        LEFT JOIN sales_orders so ON so.id = sh.sales_order_id
+        WHERE sh.id = ANY(:ids)
+    """,
+    # Internal, not offered to SSE clients: keeps every worker's customer
+    # prefix index current. Only ids, so deleted customers are announced too.
+    "customer": """
+        SELECT pg_notify(:channel, json_build_object('entity', 'customer', 'id', id)::text)
+        FROM unnest(CAST(:ids AS integer[])) AS id
+    """,
+}
+EVENT_SQL = {entity: text(sql) for entity, sql in _EVENT_SQL.items()}
+
+
+async def publish(db: AsyncSession, entity: str, ids: List[int]) -> None:
+    """Queue change events for the given rows (flush pending ORM changes first)"""
+    await db.execute(EVENT_SQL[entity], {"channel": CHANNEL, "ids": ids})
+
+
+@dataclass(eq=False)
+class Subscriber:
+    """One SSE client: its filters and a bounded queue of pending events"""
+
+    entities: Set[str]
+    sales_order_id: Optional[int] = None
+    customer_id: Optional[int] = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(get_settings().EVENTS_QUEUE_SIZE))
+    # Set when events were dropped; the client is told to refetch
+    overflowed: bool = False
+    closed: bool = False
+
+    def wants(self, event: dict) -> bool:
+        if event["entity"] not in self.entities:
+            return False
+        if self.sales_order_id is not None and event.get("salesOrderId") != self.sales_order_id:
+            return False
+        if self.customer_id is not None and event.get("customerId") != self.customer_id:
+            return False
+        return True
+
+    def offer(self, event: dict) -> None:
+        """
+        Never block the listener on a slow client: once its queue is full the
+        backlog is discarded and replaced by a single resync marker.
+        """
+        if self.overflowed or self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"entity": "resync"})
+
+    def close(self) -> None:
+        """Queue CLOSED after what is pending (or instead of it, if full); nothing follows it"""
+        self.closed = True
+        try:
+            self.queue.put_nowait(CLOSED)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(CLOSED)
+
+
+class ChangeFeed:
+    """
+    A single LISTEN connection per worker, fanned out to every SSE client.
+
+    The connection is opened with the first subscriber and re-established
+    with backoff if it drops; subscribers are sent a resync marker after a
+    reconnect because notifications sent in between are lost.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def _dispatch(self, connection, pid, channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("ignoring malformed change event: %r", payload)
+            return
+        for subscriber in list(self.subscribers):
+            if subscriber.wants(event):
+                subscriber.offer(event)
+
+    def _broadcast_resync(self) -> None:
+        for subscriber in list(self.subscribers):
+            subscriber.offer({"entity": "resync"})
+
+    async def _run(self) -> None:
+        delay = 1.0
+        connected_before = False
+        while self.subscribers:
+            # Any failure, while connecting or while listening, ends in a
+            # reconnect; only cancellation (close) stops the loop
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                try:
+                    await conn.add_listener(self.channel, self._dispatch)
+                    if connected_before:
+                        self._broadcast_resync()
+                    connected_before = True
+                    delay = 1.0
+                    # Stay connected while anyone listens; check back periodically
+                    while self.subscribers and not lost.is_set():
+                        try:
+                            await asyncio.wait_for(lost.wait(), timeout=30)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    if not conn.is_closed():
+                        await conn.close()
+                if not lost.is_set():
+                    continue
+                logger.warning("change feed: connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("change feed: listening failed, retrying in %.0fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def close(self) -> None:
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self.subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+def _listen_dsn() -> str:
+    url = get_settings().DIRECT_DATABASE_URL
+    return url.replace("postgresql+psycopg", "postgresql").replace("postgresql+asyncpg", "postgresql")
+
+
+change_feed = ChangeFeed(_listen_dsn())
@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.db import AsyncSessionLocal
+from app.services.loaders import Loaders
+
+# Per handler: executed (ran the query), coalesced (joined one in flight),
+# cached (answered from a result inside the staleness window)
+metrics: Dict[str, Counter] = {}
+
+_in_flight: Dict[Tuple, asyncio.Future] = {}
+_recent: Dict[Tuple, Tuple[float, bytes]] = {}
+
+MAX_RECENT = 1000
+
+
+def _request_key(name: str, kwargs: Dict[str, Any]) -> Tuple:
+    """Handler plus its parsed path and query parameters"""
+    params = tuple(sorted(
+        (key, repr(value)) for key, value in kwargs.items()
+        if not isinstance(value, (AsyncSession, Loaders))
+    ))
+    return (name, params)
+
+
+def _remember(key: Tuple, body: bytes, window: float) -> None:
+    now = time.monotonic()
+    # Distinct parameter combinations would otherwise accumulate forever
+    if len(_recent) >= MAX_RECENT:
+        for old_key in [k for k, (at, _) in _recent.items() if now - at > window]:
+            del _recent[old_key]
+    _recent[key] = (now, body)
+
+
+def coalesced(stale_seconds: Optional[float] = None, exclude_unset: bool = False):
+    """
+    Let concurrent identical calls of a GET handler share one execution.
+
+    The first caller runs the handler on its own session and serializes the
+    result once; callers arriving while it runs, or within ``stale_seconds``
+    after it finished, get the same bytes. Failures are not shared beyond
+    the callers already waiting and are never cached. ``exclude_unset``
+    mirrors the route's ``response_model_exclude_unset``.
+    """
+    def decorate(func):
+        name = func.__name__
+        counters = metrics.setdefault(name, Counter())
+
+        async def compute(kwargs: Dict[str, Any]) -> bytes:
+            # Its own session, so a leader that disconnects cannot close it
+            # under the requests waiting on the result
+            async with AsyncSessionLocal() as session:
+                # Loaders are rebound too: they query through the session
+                loaders = Loaders(session)
+                call_kwargs = {}
+                for key, value in kwargs.items():
+                    if isinstance(value, AsyncSession):
+                        session.info.update(value.info)
+                        value = session
+                    elif isinstance(value, Loaders):
+                        value = loaders
+                    call_kwargs[key] = value
+                result = await func(**call_kwargs)
+            return json.dumps(jsonable_encoder(result, exclude_unset=exclude_unset)).encode()
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            window = get_settings().COALESCE_STALE_SECONDS if stale_seconds is None else stale_seconds
+            key = _request_key(name, kwargs)
+
+            recent = _recent.get(key)
+            if recent is not None and time.monotonic() - recent[0] <= window:
+                counters["cached"] += 1
+                return Response(content=recent[1], media_type="application/json")
+
+            future = _in_flight.get(key)
+            if future is not None:
+                counters["coalesced"] += 1
+            else:
+                counters["executed"] += 1
+                future = asyncio.ensure_future(compute(kwargs))
+                _in_flight[key] = future
+
+                def _finished(done: asyncio.Future, key=key, window=window):
+                    _in_flight.pop(key, None)
+                    if window > 0 and not done.cancelled() and done.exception() is None:
+                        _remember(key, done.result(), window)
+
+                future.add_done_callback(_finished)
+
+            body = await asyncio.shield(future)
+            return Response(content=body, media_type="application/json")
+
+        return wrapper
+
+    return decorate
+
+
+def snapshot() -> Dict[str, Dict[str, int]]:
+    return {name: dict(counts) for name, counts in metrics.items()}
@@ -0,0 +1,198 @@
+from collections import Counter
+from typing import AsyncIterator, Dict, List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.streaming import field, iter_lines, iter_rows
+
+# Columns a row without an email may be matched on. Values are trusted column
+# names interpolated into SQL, so only add entries here.
+MATCH_KEYS = {"name": "name", "phone": "phone", "none": None}
+
+IMPORT_COLUMNS = (
+    "line_no", "name", "contact_person", "email", "phone", "address",
+    "match_value", "outcome", "message",
+)
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE customer_import (
+        line_no bigint PRIMARY KEY,
+        name text,
+        contact_person text,
+        email text,
+        phone text,
+        address text,
+        match_value text,
+        outcome text,
+        message text,
+        customer_id integer
+    ) ON COMMIT DROP
+"""
+
+# Within the file the last row for an email (or match value) wins
+MARK_DUPLICATES_SQL = text("""
+    UPDATE customer_import i
+    SET outcome = 'duplicate', message = 'superseded by line ' || d.winner
+    FROM (
+        SELECT
+            line_no,
+            row_number() OVER w AS rn,
+            first_value(line_no) OVER w AS winner
+        FROM customer_import
+        WHERE outcome IS NULL AND (email IS NOT NULL OR match_value IS NOT NULL)
+        WINDOW w AS (PARTITION BY email IS NULL, COALESCE(email, match_value) ORDER BY line_no DESC)
+    ) d
+    WHERE i.line_no = d.line_no AND d.rn > 1
+""")
+
+# Optional fields left empty in the file never erase what is already stored
+UPSERT_BY_EMAIL_SQL = text("""
+    WITH upserted AS (
+        INSERT INTO customers AS c (name, contact_person, email, phone, address)
+        SELECT name, contact_person, email, phone, address
+        FROM customer_import
+        WHERE outcome IS NULL AND email IS NOT NULL
+        ON CONFLICT (email) DO UPDATE SET
+            name = EXCLUDED.name,
+            contact_person = COALESCE(EXCLUDED.contact_person, c.contact_person),
+            phone = COALESCE(EXCLUDED.phone, c.phone),
+            address = COALESCE(EXCLUDED.address, c.address)
+        WHERE (c.name, c.contact_person, c.phone, c.address) IS DISTINCT FROM (
+            EXCLUDED.name,
+            COALESCE(EXCLUDED.contact_person, c.contact_person),
+            COALESCE(EXCLUDED.phone, c.phone),
+            COALESCE(EXCLUDED.address, c.address)
+        )
+        RETURNING c.id, c.email, (xmax = 0) AS inserted
+    )
+    UPDATE customer_import i
+    SET customer_id = u.id, outcome = CASE WHEN u.inserted THEN 'inserted' ELSE 'updated' END
+    FROM upserted u
+    WHERE i.outcome IS NULL AND i.email = u.email
+""")
+
+MARK_UNCHANGED_BY_EMAIL_SQL = text("""
+    UPDATE customer_import i
+    SET customer_id = c.id, outcome = 'unchanged'
+    FROM customers c
+    WHERE i.outcome IS NULL AND i.email IS NOT NULL AND c.email = i.email
+""")
+
+MATCH_BY_KEY_SQL = """
+    UPDATE customer_import i
+    SET
+        customer_id = CASE WHEN m.matches = 1 THEN m.customer_id END,
+        outcome = CASE WHEN m.matches = 1 THEN 'matched' ELSE 'ambiguous' END,
+        message = CASE WHEN m.matches > 1 THEN m.matches || ' customers share this {column}' END
+    FROM (
+        SELECT s.line_no, min(c.id) AS customer_id, count(*) AS matches
+        FROM customer_import s
+        JOIN customers c ON c.{column} = s.match_value
+        WHERE s.outcome IS NULL AND s.email IS NULL AND s.match_value IS NOT NULL
+        GROUP BY s.line_no
+    ) m
+    WHERE i.line_no = m.line_no
+"""
+
+UPDATE_MATCHED_SQL = text("""
+    WITH changed AS (
+        UPDATE customers c
+        SET
+            name = i.name,
+            contact_person = COALESCE(i.contact_person, c.contact_person),
+            phone = COALESCE(i.phone, c.phone),
+            address = COALESCE(i.address, c.address)
+        FROM customer_import i
+        WHERE i.outcome = 'matched' AND c.id = i.customer_id
+          AND (c.name, c.contact_person, c.phone, c.address) IS DISTINCT FROM (
+              i.name,
+              COALESCE(i.contact_person, c.contact_person),
+              COALESCE(i.phone, c.phone),
+              COALESCE(i.address, c.address)
+          )
+        RETURNING c.id
+    )
+    UPDATE customer_import i
+    SET outcome = 'updated'
+    FROM changed
+    WHERE i.outcome = 'matched' AND i.customer_id = changed.id
+""")
+
+MARK_UNCHANGED_MATCHED_SQL = text("UPDATE customer_import SET outcome = 'unchanged' WHERE outcome = 'matched'")
+
+# Ids are allocated up front so every inserted customer maps back to its line
+ALLOCATE_NEW_SQL = text("""
+    UPDATE customer_import
+    SET customer_id = nextval(pg_get_serial_sequence('customers', 'id')), outcome = 'inserted'
+    WHERE outcome IS NULL
+""")
+
+INSERT_NEW_SQL = text("""
+    INSERT INTO customers (id, name, contact_person, email, phone, address)
+    SELECT customer_id, name, contact_person, email, phone, address
+    FROM customer_import
+    WHERE outcome = 'inserted' AND email IS NULL
+""")
+
+REPORT_SQL = text("SELECT line_no, outcome, customer_id, message FROM customer_import ORDER BY line_no")
+
+
+def to_record(line_no: int, row: Dict[str, object], match_column: str | None) -> tuple:
+    name, email = field(row, "name"), field(row, "email")
+    values = {
+        "name": name,
+        "contact_person": field(row, "contact_person"),
+        "email": email,
+        "phone": field(row, "phone"),
+        "address": field(row, "address"),
+    }
+    outcome = message = None
+    if not name:
+        outcome, message = "invalid", "name is required"
+    match_value = values[match_column] if match_column and not email else None
+    return (
+        line_no, name, values["contact_person"], email, values["phone"], values["address"],
+        match_value, outcome, message,
+    )
+
+
+async def import_customers(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    match_on: str,
+) -> tuple[Dict[str, int], List[dict]]:
+    """
+    Bulk upsert customers from a streamed CSV/NDJSON body.
+
+    Rows with an email are merged on customers.email; rows without one are
+    matched on ``match_on`` (or always inserted when it is "none"). Every step
+    is a set-based statement against the staging table, so existing customers
+    are never loaded into Python. Must be called inside a transaction.
+    """
+    match_column = MATCH_KEYS[match_on]
+    rows = iter_rows(iter_lines(chunks), fmt)
+
+    async def records():
+        async for line_no, row in rows:
+            yield to_record(line_no, row, match_column)
+
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+
+    await connection.execute(text(CREATE_STAGING_SQL))
+    await raw.driver_connection.copy_records_to_table("customer_import", records=records(), columns=IMPORT_COLUMNS)
+    await connection.execute(text("ANALYZE customer_import"))
+
+    await connection.execute(MARK_DUPLICATES_SQL)
+    await connection.execute(UPSERT_BY_EMAIL_SQL)
+    await connection.execute(MARK_UNCHANGED_BY_EMAIL_SQL)
+    if match_column:
+        await connection.execute(text(MATCH_BY_KEY_SQL.format(column=match_column)))
+        await connection.execute(UPDATE_MATCHED_SQL)
+        await connection.execute(MARK_UNCHANGED_MATCHED_SQL)
+    await connection.execute(ALLOCATE_NEW_SQL)
+    await connection.execute(INSERT_NEW_SQL)
+
+    report = [dict(row._mapping) for row in (await connection.execute(REPORT_SQL)).all()]
+    summary = Counter(row["outcome"] for row in report)
+    return dict(summary), report
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.config import get_settings
+from app.db import AsyncSessionLocal
+from app.models.customers import Customer
+from app.services import change_feed
+
+logger = logging.getLogger(__name__)
+
+# (id, name, email) - the compact projection returned by typeahead
+CustomerEntry = Tuple[int, str, Optional[str]]
+
+
+def _keys_for(name: str, contact_person: Optional[str], email: Optional[str]) -> set[str]:
+    """Every string a user might start typing: whole values plus each word"""
+    keys: set[str] = set()
+    for value in (name, contact_person):
+        if value:
+            value = value.lower().strip()
+            keys.add(value)
+            keys.update(value.split())
+    if email:
+        email = email.lower().strip()
+        keys.add(email)
+        keys.add(email.split("@", 1)[0])
+    return {key for key in keys if key}
+
+
+class CustomerPrefixIndex:
+    """
+    In-process prefix index over customer name, contact person and email.
+
+    Keys are kept in one sorted list of (key, customer_id) pairs, so a lookup
+    is a bisect plus a short forward scan. Each worker process holds its own
+    copy: writes made through this process update it at once, writes made
+    anywhere reach it through the change feed (follow_customer_changes).
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._entries: Dict[int, CustomerEntry] = {}
+        self._keys_by_id: Dict[int, set[str]] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, customers: Iterable[Tuple[int, str, Optional[str], Optional[str]]]) -> None:
+        """Replace the index contents from (id, name, contact_person, email) rows"""
+        keys: List[Tuple[str, int]] = []
+        entries: Dict[int, CustomerEntry] = {}
+        keys_by_id: Dict[int, set[str]] = {}
+        for customer_id, name, contact_person, email in customers:
+            customer_keys = _keys_for(name, contact_person, email)
+            entries[customer_id] = (customer_id, name, email)
+            keys_by_id[customer_id] = customer_keys
+            keys.extend((key, customer_id) for key in customer_keys)
+        keys.sort()
+        self._keys, self._entries, self._keys_by_id = keys, entries, keys_by_id
+        self.ready = True
+
+    def upsert(self, customer_id: int, name: str, contact_person: Optional[str], email: Optional[str]) -> None:
+        self.remove(customer_id)
+        customer_keys = _keys_for(name, contact_person, email)
+        for key in customer_keys:
+            insort(self._keys, (key, customer_id))
+        self._entries[customer_id] = (customer_id, name, email)
+        self._keys_by_id[customer_id] = customer_keys
+
+    def remove(self, customer_id: int) -> None:
+        for key in self._keys_by_id.pop(customer_id, ()):
+            position = bisect_left(self._keys, (key, customer_id))
+            if position < len(self._keys) and self._keys[position] == (key, customer_id):
+                del self._keys[position]
+        self._entries.pop(customer_id, None)
+
+    def search(self, prefix: str, limit: int = 10) -> List[CustomerEntry]:
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        matches: List[CustomerEntry] = []
+        seen: set[int] = set()
+        position = bisect_left(self._keys, (prefix, -1))
+        while position < len(self._keys) and len(matches) < limit:
+            key, customer_id = self._keys[position]
+            if not key.startswith(prefix):
+                break
+            if customer_id not in seen:
+                seen.add(customer_id)
+                matches.append(self._entries[customer_id])
+            position += 1
+        return matches
+
+
+customer_index = CustomerPrefixIndex()
+
+# Beyond this many changed customers a full reload beats per-key inserts
+REBUILD_THRESHOLD = 2000
+
+
+async def build_customer_index() -> None:
+    """Load every customer into the process-wide index"""
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(
+            select(Customer.id, Customer.name, Customer.contact_person, Customer.email)
+        )
+        rows = [tuple(row) async for row in result]
+    customer_index.load(rows)
+
+
+async def refresh_customers(customer_ids: Iterable[int]) -> None:
+    """Re-index customers changed in bulk; large batches trigger a full rebuild"""
+    customer_ids = list(customer_ids)
+    if not customer_ids or not customer_index.ready:
+        return
+    if len(customer_ids) > REBUILD_THRESHOLD:
+        await build_customer_index()
+        return
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Customer.id, Customer.name, Customer.contact_person, Customer.email)
+            .where(Customer.id.in_(customer_ids))
+        )
+        rows = result.all()
+    for customer_id, name, contact_person, email in rows:
+        customer_index.upsert(customer_id, name, contact_person, email)
+    # Deleted since they were announced
+    for customer_id in set(customer_ids) - {row[0] for row in rows}:
+        customer_index.remove(customer_id)
+
+
+REBUILD_EVENT_SQL = text(
+    "SELECT pg_notify(:channel, json_build_object('entity', 'customer', 'rebuild', true)::text)"
+)
+
+
+async def publish_customer_changes(db: AsyncSession, customer_ids: List[int]) -> None:
+    """
+    Tell every worker's index about customers written in this transaction
+    (delivered on commit); large batches ask for a full rebuild instead.
+    """
+    if len(customer_ids) > REBUILD_THRESHOLD:
+        await db.execute(REBUILD_EVENT_SQL, {"channel": change_feed.CHANNEL})
+    elif customer_ids:
+        await change_feed.publish(db, "customer", customer_ids)
+
+
+async def follow_customer_changes(stop: asyncio.Event) -> None:
+    """
+    Build the index, then keep it in step with customer writes from every
+    worker until ``stop`` is set (run at startup).
+
+    Notifications lost while the listen connection was down arrive as a
+    resync marker and trigger a full rebuild, as does a queue overflow; the
+    periodic rebuild covers anything committed between the initial load and
+    the first LISTEN.
+    """
+    interval = get_settings().CUSTOMER_INDEX_REBUILD_SECONDS
+    loop = asyncio.get_running_loop()
+    # Subscribe first so nothing written during the initial load is missed
+    subscriber = change_feed.Subscriber(entities={"customer"})
+    change_feed.change_feed.subscribe(subscriber)
+    rebuild_at = loop.time()
+    try:
+        while not stop.is_set():
+            events = []
+            try:
+                timeout = min(max(rebuild_at - loop.time(), 0.0), 1.0)
+                events.append(await asyncio.wait_for(subscriber.queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                pass
+            while not subscriber.queue.empty():
+                events.append(subscriber.queue.get_nowait())
+
+            rebuild = any(event["entity"] == "resync" or event.get("rebuild") for event in events)
+            if rebuild:
+                subscriber.overflowed = False
+            try:
+                if rebuild or loop.time() >= rebuild_at:
+                    await build_customer_index()
+                    rebuild_at = loop.time() + interval if interval > 0 else float("inf")
+                elif events:
+                    await refresh_customers({event["id"] for event in events})
+            except Exception:
+                # Searches fall back to SQL until the index is loaded; retry soon
+                logger.exception("customer index update failed")
+                rebuild_at = min(rebuild_at, loop.time() + 30)
+    finally:
+        change_feed.change_feed.unsubscribe(subscriber)
@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Document kinds in the order they sort within a single day
+KINDS = ("order", "invoice", "payment")
+
+# (kind rank, table alias, date column) per ledger branch
+_BRANCHES = (
+    (0, "so", "so.date"),
+    (1, "inv", "inv.date"),
+    (2, "p", "p.payment_date"),
+)
+
+STATEMENT_SQL = """
+    WITH page AS (
+        SELECT * FROM (
+            (SELECT 0 AS kind, so.id, so.date AS doc_date, so.order_number AS number
+             FROM sales_orders so
+             WHERE so.customer_id = :customer_id AND so.deleted_at IS NULL AND {cond_0}
+             ORDER BY so.date, so.id LIMIT :limit)
+            UNION ALL
+            (SELECT 1, inv.id, inv.date, inv.invoice_number
+             FROM invoices inv
+             WHERE inv.customer_id = :customer_id AND {cond_1}
+             ORDER BY inv.date, inv.id LIMIT :limit)
+            UNION ALL
+            (SELECT 2, p.id, p.payment_date, p.reference
+             FROM payments p
+             WHERE p.customer_id = :customer_id AND {cond_2}
+             ORDER BY p.payment_date, p.id LIMIT :limit)
+        ) docs
+        ORDER BY doc_date, kind, id
+        LIMIT :limit
+    )
+    SELECT
+        page.kind, page.id, page.doc_date, page.number, amounts.amount,
+        CAST(:opening AS numeric) + sum(
+            CASE page.kind WHEN 1 THEN amounts.amount WHEN 2 THEN -amounts.amount ELSE 0 END
+        ) OVER (ORDER BY page.doc_date, page.kind, page.id ROWS UNBOUNDED PRECEDING) AS balance
+    FROM page
+    CROSS JOIN LATERAL (
+        SELECT CASE page.kind
+            WHEN 0 THEN (
+                SELECT COALESCE(sum(si.quantity * si.price * (1 + si.tax_rate)), 0)
+                FROM so_items si WHERE si.sales_order_id = page.id AND si.order_date = page.doc_date)
+            WHEN 1 THEN (
+                SELECT COALESCE(sum(ii.quantity_invoiced * si.price * (1 + si.tax_rate)), 0)
+                FROM invoice_items ii JOIN so_items si ON si.id = ii.so_item_id
+                WHERE ii.invoice_id = page.id)
+            ELSE (SELECT pm.amount FROM payments pm WHERE pm.id = page.id)
+        END AS amount
+    ) amounts
+    ORDER BY page.doc_date, page.kind, page.id
+"""
+
+
+def encode_cursor(doc_date: date, kind: int, doc_id: int, balance: Decimal) -> str:
+    payload = json.dumps([doc_date.isoformat(), kind, doc_id, str(balance)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int, int, Decimal]:
+    try:
+        doc_date, kind, doc_id, balance = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(doc_date), int(kind), int(doc_id), Decimal(balance)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid statement cursor")
+
+
+def _branch_condition(kind: int, alias: str, date_column: str, after: Optional[tuple]) -> str:
+    """Keyset predicate for one branch, written so its (customer_id, date, id) index applies"""
+    if after is None:
+        return "TRUE"
+    _, after_kind, _, _ = after
+    if kind > after_kind:
+        return f"{date_column} >= :after_date"
+    if kind < after_kind:
+        return f"{date_column} > :after_date"
+    return f"({date_column}, {alias}.id) > (:after_date, :after_id)"
+
+
+async def fetch_statement_page(
+    db: AsyncSession,
+    customer_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a customer's chronological ledger with a running balance.
+
+    Invoices debit and payments credit the balance; orders are listed for
+    context only. The cursor carries the balance at the page boundary, so each
+    page reads at most ``limit + 1`` rows per document type regardless of how
+    long the history is.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    conditions = {
+        f"cond_{kind}": _branch_condition(kind, alias, column, after)
+        for kind, alias, column in _BRANCHES
+    }
+    params = {
+        "customer_id": customer_id,
+        "limit": limit + 1,
+        "opening": after[3] if after else Decimal(0),
+    }
+    if after:
+        params.update(after_date=after[0], after_id=after[2])
+
+    rows = (await db.execute(text(STATEMENT_SQL.format(**conditions)), params)).all()
+
+    entries = [
+        {
+            "type": KINDS[row.kind],
+            "id": row.id,
+            "number": row.number,
+            "date": row.doc_date,
+            "amount": row.amount,
+            "balance": row.balance,
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.doc_date, last.kind, last.id, last.balance)
+    return entries, next_cursor
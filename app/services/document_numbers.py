@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.document_numbers import DocumentNumber
+
+# Takes the next value under the counter row's lock, held until commit; a
+# rolled-back document gives its number back
+NEXT_VALUE_SQL = text("""
+    INSERT INTO document_number_counters AS c (prefix, last_value)
+    VALUES (:prefix, 1)
+    ON CONFLICT (prefix) DO UPDATE SET last_value = c.last_value + 1
+    RETURNING last_value
+""")
+
+# Counters from the numbers in use, archived ones included so none is reused
+REBUILD_COUNTERS_SQL = text("""
+    INSERT INTO document_number_counters (prefix, last_value)
+    SELECT substring(number FROM '^(.*)-[0-9]+$'), max(CAST(substring(number FROM '([0-9]+)$') AS integer))
+    FROM (
+        SELECT order_number FROM sales_orders
+        UNION ALL SELECT order_number FROM archive.sales_orders
+        UNION ALL SELECT invoice_number FROM invoices
+        UNION ALL SELECT invoice_number FROM archive.invoices
+    ) AS numbers(number)
+    WHERE number ~ '^(SO|INV)-[0-9]{4}-[0-9]+$'
+    GROUP BY 1
+    ON CONFLICT (prefix) DO UPDATE SET last_value = EXCLUDED.last_value
+""")
+
+
+async def next_document_number(db: AsyncSession, kind: str) -> str:
+    """Next number like SO-2026-001 for ``kind`` ("SO", "INV") in the current year"""
+    prefix = f"{kind}-{datetime.now().year}"
+    value = (await db.execute(NEXT_VALUE_SQL, {"prefix": prefix})).scalar_one()
+    return f"{prefix}-{value:03d}"
+
+
+async def rebuild_number_counters(db: AsyncSession) -> None:
+    """Reset the counters to the highest numbers in use (after bulk loads)"""
+    await db.execute(REBUILD_COUNTERS_SQL)
+
+
+async def document_date(db: AsyncSession, entity: str, entity_id: int) -> Optional[date]:
+    """
+    Date of a hot sales order or invoice ("sales_order", "invoice") by id, read
+    from the unpartitioned registry so the row itself can be fetched from its
+    one partition. None if no such document is in the hot tables.
+    """
+    result = await db.execute(
+        select(DocumentNumber.date).where(DocumentNumber.entity == entity, DocumentNumber.entity_id == entity_id)
+    )
+    return result.scalar_one_or_none()
@@ -0,0 +1,28 @@
+from typing import Iterable, Optional, Tuple
+from fastapi import HTTPException, Query
+
+Include = Tuple[str, ...]
+
+
+def include_param(allowed: Iterable[str], default: Iterable[str]):
+    """
+    Dependency parsing ``?include=a,b`` into a sorted tuple of relation names.
+
+    Without the parameter the endpoint returns ``default``; ``include=`` (empty)
+    asks for the bare row. Sorted so equal requests compare and hash alike.
+    """
+    allowed = tuple(allowed)
+    default = tuple(sorted(default))
+
+    def dependency(
+        include: Optional[str] = Query(None, description=f"Comma-separated: {','.join(allowed)}"),
+    ) -> Include:
+        if include is None:
+            return default
+        wanted = {name.strip() for name in include.split(",") if name.strip()}
+        unknown = wanted - set(allowed)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+        return tuple(sorted(wanted))
+
+    return dependency
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Sequence, Tuple
+from sqlalchemy import Integer, update, select, func, column, values, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.products import Product
+from app.models.sales_orders import SOItem
+from app.models.shipments import ShipmentItem
+
+
+class InsufficientStockError(Exception):
+    """Raised when a shipment would take a product's on-hand quantity below zero"""
+
+    def __init__(self, product_ids: list[int]):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for product(s): {', '.join(map(str, product_ids))}")
+
+
+def aggregate_quantities(lines: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Collapse (product_id, quantity) pairs into one total per product"""
+    totals: Dict[int, int] = defaultdict(int)
+    for product_id, quantity in lines:
+        totals[product_id] += quantity
+    return dict(totals)
+
+
+def _quantity_rows(quantities: Dict[int, int]):
+    # Sorted so concurrent writers touch product rows in the same order
+    return (
+        values(column("product_id", Integer), column("qty", Integer), name="delta")
+        .data(sorted(quantities.items()))
+    )
+
+
+async def reserve_stock(db: AsyncSession, quantities: Dict[int, int]) -> None:
+    """Add open sales order quantities to products.reserved_quantity in one statement"""
+    if not quantities:
+        return
+    delta = _quantity_rows(quantities)
+    await db.execute(
+        update(Product)
+        .where(Product.id == delta.c.product_id)
+        .values(reserved_quantity=Product.reserved_quantity + delta.c.qty)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def release_order_reservations(db: AsyncSession, orders: Sequence[Tuple[int, date]]) -> None:
+    """Release whatever is still reserved (ordered minus shipped) for (order id, order date) pairs"""
+    order_items = select(SOItem.id).where(tuple_(SOItem.sales_order_id, SOItem.order_date).in_(orders))
+    shipped = (
+        select(
+            ShipmentItem.so_item_id,
+            func.sum(ShipmentItem.quantity_shipped).label("shipped"),
+        )
+        .where(ShipmentItem.so_item_id.in_(order_items))
+        .group_by(ShipmentItem.so_item_id)
+        .subquery()
+    )
+    outstanding = (
+        select(
+            SOItem.product_id,
+            func.sum(SOItem.quantity - func.coalesce(shipped.c.shipped, 0)).label("qty"),
+        )
+        .outerjoin(shipped, shipped.c.so_item_id == SOItem.id)
+        .where(tuple_(SOItem.sales_order_id, SOItem.order_date).in_(orders))
+        .group_by(SOItem.product_id)
+        .subquery()
+    )
+    await db.execute(
+        update(Product)
+        .where(Product.id == outstanding.c.product_id)
+        .values(reserved_quantity=func.greatest(Product.reserved_quantity - outstanding.c.qty, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def ship_stock(db: AsyncSession, quantities: Dict[int, int]) -> None:
+    """
+    Decrement on-hand and reserved quantities for every shipped product at once.
+
+    The WHERE clause re-checks stock after any row lock wait, so concurrent
+    shipments can never take quantity below zero; if any row is refused the
+    whole shipment is rejected.
+    """
+    if not quantities:
+        return
+    delta = _quantity_rows(quantities)
+    result = await db.execute(
+        update(Product)
+        .where(Product.id == delta.c.product_id, Product.quantity >= delta.c.qty)
+        .values(
+            quantity=Product.quantity - delta.c.qty,
+            reserved_quantity=func.greatest(Product.reserved_quantity - delta.c.qty, 0),
+        )
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = set(result.scalars().all())
+    missing = sorted(set(quantities) - updated)
+    if missing:
+        raise InsufficientStockError(missing)
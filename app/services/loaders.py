@@ -0,0 +1,94 @@
+import asyncio
+from typing import Dict, Generic, Iterable, List, Optional, Type, TypeVar
+from fastapi import Depends
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_db
+from app.models.customers import Customer
+from app.models.products import Product
+from app.models.sales_persons import SalesPerson
+
+T = TypeVar("T")
+
+
+class BatchLoader(Generic[T]):
+    """
+    Request-scoped loader for rows by id.
+
+    ``load`` calls made in the same event-loop tick are answered by a single
+    ``WHERE id = ANY(:ids)`` query, and every id is fetched at most once per
+    request. The handler must await its loads before using the session for
+    anything else, since the batch runs on that same session; loaders sharing
+    a session share ``lock`` so their batches never overlap on it.
+    """
+
+    def __init__(self, db: AsyncSession, model: Type[T], lock: Optional[asyncio.Lock] = None):
+        self.db = db
+        self.model = model
+        self.lock = lock or asyncio.Lock()
+        self._statement = select(model).where(
+            model.id == any_(bindparam("ids", type_=ARRAY(Integer)))
+        )
+        self._cache: Dict[int, asyncio.Future] = {}
+        self._pending: List[int] = []
+
+    def load(self, key: int) -> "asyncio.Future[Optional[T]]":
+        future = self._cache.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._cache[key] = future
+            if not self._pending:
+                asyncio.get_running_loop().call_soon(self._dispatch)
+            self._pending.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[int]) -> Dict[int, Optional[T]]:
+        """Rows for the distinct non-null keys, as {id: row or None}"""
+        unique = [key for key in dict.fromkeys(keys) if key is not None]
+        rows = await asyncio.gather(*(self.load(key) for key in unique))
+        return dict(zip(unique, rows))
+
+    def prime(self, row: T) -> None:
+        """Seed the cache with a row the handler already has"""
+        future = self._cache.get(row.id)
+        if future is None or not future.done():
+            future = future or asyncio.get_running_loop().create_future()
+            self._cache[row.id] = future
+            future.set_result(row)
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        asyncio.ensure_future(self._fetch(keys))
+
+    async def _fetch(self, keys: List[int]) -> None:
+        try:
+            async with self.lock:
+                result = await self.db.execute(self._statement, {"ids": keys})
+            found = {row.id: row for row in result.scalars()}
+        except Exception as e:
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class Loaders:
+    """The reference-entity loaders shared by one request"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        lock = asyncio.Lock()
+        self.products: BatchLoader[Product] = BatchLoader(db, Product, lock)
+        self.customers: BatchLoader[Customer] = BatchLoader(db, Customer, lock)
+        self.sales_persons: BatchLoader[SalesPerson] = BatchLoader(db, SalesPerson, lock)
+
+
+def get_loaders(db: AsyncSession = Depends(get_db)) -> Loaders:
+    # FastAPI caches dependencies per request, so handlers share this and db
+    return Loaders(db)
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+from sqlalchemy import func, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.db import engine
+from app.models.sales_orders import SalesOrder
+from app.services import change_feed, sales_person_counters
+from app.services.audit import record_changes
+from app.services.inventory import release_order_reservations
+from app.services.sales_rollups import remove_orders_from_rollups
+from app.services.sync import record_tombstones
+
+logger = logging.getLogger(__name__)
+
+# Deleting an order removes its shipments, invoices and payments too. The
+# children reference their partitioned parents through (id, date) foreign keys
+# without ON DELETE actions, so all of them are deleted in this statement;
+# only so_items are reached by ON DELETE CASCADE. Matching on the dates lets
+# the planner prune partitions.
+PURGE_BATCH_SQL = text("""
+    WITH batch AS (
+        SELECT id, date FROM sales_orders
+        WHERE deleted_at IS NOT NULL
+        ORDER BY deleted_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    batch_invoices AS (
+        SELECT id, date FROM invoices WHERE (sales_order_id, order_date) IN (SELECT id, date FROM batch)
+    ),
+    deleted_payments AS (
+        DELETE FROM payments WHERE (invoice_id, invoice_date) IN (SELECT id, date FROM batch_invoices)
+    ),
+    deleted_invoice_items AS (
+        DELETE FROM invoice_items WHERE (invoice_id, invoice_date) IN (SELECT id, date FROM batch_invoices)
+    ),
+    deleted_invoices AS (
+        DELETE FROM invoices WHERE (id, date) IN (SELECT id, date FROM batch_invoices)
+    ),
+    invoice_tombstones AS (
+        INSERT INTO sync_tombstones (entity, entity_id)
+        SELECT 'invoice', id FROM batch_invoices
+    ),
+    deleted_shipment_items AS (
+        DELETE FROM shipment_items WHERE (so_item_id, order_date) IN (
+            SELECT si.id, si.order_date FROM so_items si
+            JOIN batch ON si.sales_order_id = batch.id AND si.order_date = batch.date
+        )
+    ),
+    deleted_shipments AS (
+        DELETE FROM shipments WHERE (sales_order_id, order_date) IN (SELECT id, date FROM batch)
+    ),
+    deleted_orders AS (
+        DELETE FROM sales_orders WHERE (id, date) IN (SELECT id, date FROM batch)
+        RETURNING 1
+    )
+    SELECT count(*) FROM deleted_orders
+""")
+
+EXPIRE_TOMBSTONES_SQL = text("""
+    DELETE FROM sync_tombstones WHERE deleted_at < now() - make_interval(days => :days)
+""")
+
+
+async def soft_delete_orders(
+    db: AsyncSession,
+    order_ids: List[int],
+    expected_version: Optional[int] = None,
+) -> List[int]:
+    """
+    Flag orders as deleted and back them out of reservations, rollups and
+    counters. Returns the ids that were flagged; unknown or already deleted
+    ids, and orders not at expected_version when it is given, are skipped.
+    The rows themselves are removed by purge_deleted_orders.
+    """
+    conditions = [SalesOrder.id.in_(order_ids), SalesOrder.deleted_at.is_(None)]
+    if expected_version is not None:
+        conditions.append(SalesOrder.version == expected_version)
+    result = await db.execute(
+        update(SalesOrder)
+        .where(*conditions)
+        .values(deleted_at=func.now(), version=SalesOrder.version + 1)
+        .returning(SalesOrder.id, SalesOrder.date)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = [tuple(row) for row in result.all()]
+    if not deleted:
+        return []
+
+    ids = [order_id for order_id, _ in deleted]
+    await release_order_reservations(db, deleted)
+    await remove_orders_from_rollups(db, ids)
+    await sales_person_counters.remove_orders(db, ids)
+    await change_feed.publish(db, "sales_order", ids)
+    await record_tombstones(db, "sales_order", ids)
+    await record_changes(db, "sales_orders", ids, "update", {"deleted": [False, True]})
+    return ids
+
+
+async def purge_deleted_orders(batch_size: int, max_batches: Optional[int] = None) -> int:
+    """Physically delete flagged orders, one short transaction per batch"""
+    purged = 0
+    batches = 0
+    async with engine.connect() as conn:
+        while max_batches is None or batches < max_batches:
+            async with conn.begin():
+                count = (await conn.execute(PURGE_BATCH_SQL, {"batch_size": batch_size})).scalar_one()
+            batches += 1
+            purged += count
+            if count < batch_size:
+                break
+        async with conn.begin():
+            await conn.execute(EXPIRE_TOMBSTONES_SQL, {"days": get_settings().SYNC_TOMBSTONE_RETENTION_DAYS})
+    logger.info("purged %d deleted sales orders in %d batches", purged, batches)
+    return purged
+
+
+async def purge_in_background() -> None:
+    """BackgroundTasks entry point: failures are left for the next purge run"""
+    try:
+        await purge_deleted_orders(get_settings().PURGE_BATCH_SIZE)
+    except Exception:
+        logger.exception("purging deleted sales orders failed")
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Purge soft-deleted sales orders")
+    parser.add_argument("--batch-size", type=int, default=get_settings().PURGE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    purged = await purge_deleted_orders(args.batch_size, args.max_batches)
+    await engine.dispose()
+    print(f"purged={purged}")
+
+
+# python -m app.services.order_deletion
+if __name__ == "__main__":
+    asyncio.run(_main())
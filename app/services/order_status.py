@@ -0,0 +1,114 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.services import change_feed
+from app.services.outbox import enqueue, handler
+from app.services.versioning import VersionConflict
+
+RECOMPUTE_STATUS_TOPIC = "sales_order.recompute_status"
+
+# Derives all three statuses of an order from its lines, shipments and
+# invoices, next to the values currently stored.
+COMPUTE_STATUS_SQL = text("""
+    WITH so AS (
+        SELECT id, date, invoice_status, shipment_status, payment_status
+        FROM sales_orders
+        WHERE id = :id AND deleted_at IS NULL
+    ),
+    lines AS (
+        SELECT si.quantity,
+               (SELECT COALESCE(sum(ii.quantity_invoiced), 0)
+                FROM invoice_items ii WHERE ii.so_item_id = si.id) AS invoiced,
+               (SELECT COALESCE(sum(shi.quantity_shipped), 0)
+                FROM shipment_items shi WHERE shi.so_item_id = si.id) AS shipped
+        FROM so_items si
+        JOIN so ON si.sales_order_id = so.id AND si.order_date = so.date
+    ),
+    totals AS (
+        SELECT COALESCE(bool_and(invoiced >= quantity), false) AS fully_invoiced,
+               COALESCE(bool_or(invoiced > 0), false) AS any_invoiced,
+               COALESCE(bool_and(shipped >= quantity), false) AS fully_shipped,
+               COALESCE(bool_or(shipped > 0), false) AS any_shipped
+        FROM lines
+    ),
+    inv AS (
+        SELECT count(*) AS invoices,
+               count(*) FILTER (WHERE status = 'paid') AS paid,
+               count(*) FILTER (WHERE status IN ('partial', 'paid')) AS with_payments
+        FROM invoices WHERE sales_order_id = :id
+    )
+    SELECT so.date,
+        so.invoice_status AS current_invoice_status,
+        so.shipment_status AS current_shipment_status,
+        so.payment_status AS current_payment_status,
+        CAST(CASE WHEN t.fully_invoiced THEN 'invoiced'
+                  WHEN t.any_invoiced THEN 'partial'
+                  ELSE 'not_invoiced' END AS so_invoice_status_enum) AS invoice_status,
+        CAST(CASE WHEN t.fully_shipped THEN 'shipped'
+                  WHEN t.any_shipped THEN 'partial'
+                  ELSE 'not_shipped' END AS so_shipment_status_enum) AS shipment_status,
+        CAST(CASE WHEN t.fully_invoiced AND inv.invoices > 0 AND inv.paid = inv.invoices THEN 'paid'
+                  WHEN inv.with_payments > 0 THEN 'partial'
+                  ELSE 'unpaid' END AS so_payment_status_enum) AS payment_status
+    FROM so, totals t, inv
+""")
+
+# Compare-and-set on the statuses read above; no row lock is held in between.
+# The version is left alone: statuses are derived from documents whose own
+# writes already bumped it, and bumping it again here would invalidate the
+# ETag those writes just handed to the client.
+APPLY_STATUS_SQL = text("""
+    UPDATE sales_orders
+    SET invoice_status = CAST(:invoice_status AS so_invoice_status_enum),
+        shipment_status = CAST(:shipment_status AS so_shipment_status_enum),
+        payment_status = CAST(:payment_status AS so_payment_status_enum),
+        updated_at = now()
+    WHERE id = :id AND date = :date
+      AND invoice_status = CAST(:current_invoice_status AS so_invoice_status_enum)
+      AND shipment_status = CAST(:current_shipment_status AS so_shipment_status_enum)
+      AND payment_status = CAST(:current_payment_status AS so_payment_status_enum)
+    RETURNING id
+""")
+
+
+async def schedule_status_recompute(db: AsyncSession, sales_order_id: int) -> None:
+    """Recompute the order's statuses after the current transaction commits"""
+    await enqueue(db, RECOMPUTE_STATUS_TOPIC, {"sales_order_id": sales_order_id})
+
+
+async def recompute_status(db: AsyncSession, sales_order_id: int) -> bool:
+    """
+    Bring an order's statuses in line with its documents. Each attempt reads
+    the order's statuses and writes only if they are unchanged; a concurrent
+    recompute makes the attempt start over, up to STATUS_RECOMPUTE_ATTEMPTS.
+    A document committed after the read is covered by the recompute its own
+    write scheduled.
+    Returns whether anything was written.
+    """
+    for _ in range(get_settings().STATUS_RECOMPUTE_ATTEMPTS):
+        row = (await db.execute(COMPUTE_STATUS_SQL, {"id": sales_order_id})).one_or_none()
+        if row is None:
+            return False
+        computed = (row.invoice_status, row.shipment_status, row.payment_status)
+        if computed == (row.current_invoice_status, row.current_shipment_status, row.current_payment_status):
+            return False
+        applied = await db.execute(APPLY_STATUS_SQL, {
+            "id": sales_order_id,
+            "date": row.date,
+            "current_invoice_status": row.current_invoice_status,
+            "current_shipment_status": row.current_shipment_status,
+            "current_payment_status": row.current_payment_status,
+            "invoice_status": row.invoice_status,
+            "shipment_status": row.shipment_status,
+            "payment_status": row.payment_status,
+        })
+        if applied.scalar_one_or_none() is not None:
+            await change_feed.publish(db, "sales_order", [sales_order_id])
+            return True
+    raise VersionConflict(f"Sales order {sales_order_id} kept changing during status recompute")
+
+
+@handler(RECOMPUTE_STATUS_TOPIC)
+async def handle_recompute_status(db: AsyncSession, payload: dict) -> None:
+    # A VersionConflict that outlasts the attempts goes back to the outbox for a later retry
+    await recompute_status(db, payload["sales_order_id"])
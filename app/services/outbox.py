@@ -0,0 +1,70 @@
+import logging
+from typing import Awaitable, Callable, Dict, List
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[AsyncSession, dict], Awaitable[None]]
+
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handler(topic: str) -> Callable[[Handler], Handler]:
+    """Register the coroutine that processes events of a topic"""
+    def register(func: Handler) -> Handler:
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+async def enqueue(db: AsyncSession, topic: str, payload: dict) -> None:
+    """Record a side effect in the caller's transaction; it runs after commit"""
+    await db.execute(insert(OutboxEvent).values(topic=topic, payload=payload))
+
+
+# Claimed events stay pending but become invisible until the lease expires
+CLAIM_SQL = text("""
+    UPDATE outbox_events e
+    SET attempts = e.attempts + 1,
+        available_at = now() + make_interval(secs => :lease_seconds)
+    FROM (
+        SELECT id FROM outbox_events
+        WHERE status = 'pending' AND available_at <= now()
+        ORDER BY available_at, id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ) claimed
+    WHERE e.id = claimed.id
+    RETURNING e.id, e.topic, e.payload, e.attempts
+""")
+
+COMPLETE_SQL = text("""
+    UPDATE outbox_events SET status = 'done', processed_at = now(), last_error = NULL
+    WHERE id = :id
+""")
+
+# Exponential backoff, capped at an hour; dead events stay for inspection
+FAIL_SQL = text("""
+    UPDATE outbox_events
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'dead' ELSE 'pending' END,
+        available_at = now() + make_interval(secs => LEAST(power(2, attempts) * 5, 3600)),
+        last_error = :error
+    WHERE id = :id
+    RETURNING status
+""")
+
+
+async def claim_events(db: AsyncSession, batch_size: int, lease_seconds: int) -> List:
+    result = await db.execute(CLAIM_SQL, {"batch_size": batch_size, "lease_seconds": lease_seconds})
+    return result.all()
+
+
+async def complete_event(db: AsyncSession, event_id: int) -> None:
+    await db.execute(COMPLETE_SQL, {"id": event_id})
+
+
+async def fail_event(db: AsyncSession, event_id: int, error: str, max_attempts: int) -> str:
+    result = await db.execute(FAIL_SQL, {"id": event_id, "error": error[:2000], "max_attempts": max_attempts})
+    return result.scalar_one()
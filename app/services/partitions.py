@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import logging
+import re
+from datetime import date
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.config import get_settings
+from app.db import engine
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition key (see migration 1a6d3f5b7c92)
+PARTITIONED_TABLES = {
+    "sales_orders": "date",
+    "so_items": "order_date",
+    "invoices": "date",
+}
+
+_BOUND = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+PARTITION_BOUNDS_SQL = text("""
+    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(:table AS regclass)
+""")
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def planned_partitions(today: date, interval: str, ahead: int) -> List[Tuple[date, date]]:
+    """[start, end) ranges from the current period through ``ahead`` periods ahead"""
+    if interval == "month":
+        first = date(today.year, today.month, 1)
+        return [(_add_months(first, n), _add_months(first, n + 1)) for n in range(ahead + 1)]
+    return [(date(today.year + n, 1, 1), date(today.year + n + 1, 1, 1)) for n in range(ahead + 1)]
+
+
+def default_list_window(today: date | None = None) -> Tuple[date, date]:
+    """
+    Date bounds for list endpoints called without from/to: the current year.
+    Both ends are bounded so the query skips DEFAULT and the premade future
+    partitions as well as the past years.
+    """
+    today = today or date.today()
+    return date(today.year, 1, 1), date(today.year, 12, 31)
+
+
+def partition_name(table: str, start: date, interval: str) -> str:
+    if interval == "month":
+        return f"{table}_y{start.year}m{start.month:02d}"
+    return f"{table}_y{start.year}"
+
+
+async def ensure_partitions(conn: AsyncConnection, today: date | None = None, ahead: int | None = None) -> List[str]:
+    """
+    Create any missing partitions for the configured horizon (``ahead``
+    periods after ``today``'s, PARTITION_PREMAKE unless given).
+
+    Ranges already covered by an existing partition are skipped, so yearly and
+    monthly partitions can coexist after switching PARTITION_INTERVAL. If the
+    DEFAULT partition already holds rows for a range, that range is skipped and
+    logged: moving rows out of it would fire the ON DELETE CASCADE on so_items.
+    """
+    settings = get_settings()
+    interval = settings.PARTITION_INTERVAL
+    if ahead is None:
+        ahead = settings.PARTITION_PREMAKE
+    created = []
+
+    for table, key in PARTITIONED_TABLES.items():
+        result = await conn.execute(PARTITION_BOUNDS_SQL, {"table": table})
+        existing = []
+        for _name, bound in result.all():
+            match = _BOUND.search(bound or "")
+            if match:
+                existing.append((date.fromisoformat(match[1]), date.fromisoformat(match[2])))
+
+        for start, end in planned_partitions(today or date.today(), interval, ahead):
+            if any(start < other_end and other_start < end for other_start, other_end in existing):
+                continue
+
+            stray = await conn.execute(
+                text(f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {key} >= :start AND {key} < :end)"),
+                {"start": start, "end": end},
+            )
+            if stray.scalar():
+                logger.warning("Skipping %s [%s, %s): rows already in %s_default", table, start, end, table)
+                continue
+
+            name = partition_name(table, start, interval)
+            await conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            existing.append((start, end))
+            created.append(name)
+
+    return created
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Create upcoming partitions for partitioned sales tables")
+    parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async with engine.begin() as conn:
+        created = await ensure_partitions(conn)
+    await engine.dispose()
+    print("created: " + (", ".join(created) if created else "nothing to do"))
+
+
+# Run from cron/systemd timer, e.g. daily: python -m app.services.partitions
+if __name__ == "__main__":
+    asyncio.run(_main())
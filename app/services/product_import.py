@@ -0,0 +1,122 @@
+from decimal import Decimal
+from typing import AsyncIterator, Dict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.streaming import ImportFormatError, field, iter_lines, iter_rows, number
+
+IMPORT_COLUMNS = (
+    "line_no", "sku", "name", "description", "category",
+    "quantity", "cost_price", "selling_price", "image",
+)
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE product_import (
+        line_no bigint NOT NULL,
+        sku text NOT NULL,
+        name text NOT NULL,
+        description text,
+        category text,
+        quantity integer,
+        cost_price numeric(10, 2) NOT NULL,
+        selling_price numeric(10, 2),
+        image text
+    ) ON COMMIT DROP
+"""
+
+# Rows that omit quantity keep the existing stock level instead of resetting it
+FILL_QUANTITY_SQL = text("""
+    UPDATE product_import i
+    SET quantity = p.quantity
+    FROM products p
+    WHERE i.quantity IS NULL AND p.sku = i.sku
+""")
+
+# Last occurrence of a SKU in the file wins; category names are resolved in the
+# same statement, and rows whose values did not change are left untouched.
+MERGE_SQL = text("""
+    WITH src AS (
+        SELECT DISTINCT ON (i.sku)
+            i.*,
+            (SELECT c.id FROM categories c WHERE c.name = i.category ORDER BY c.id LIMIT 1) AS category_id
+        FROM product_import i
+        ORDER BY i.sku, i.line_no DESC
+    ),
+    upserted AS (
+        INSERT INTO products AS p (sku, name, description, category_id, quantity, cost_price, selling_price, image)
+        SELECT sku, name, description, category_id, COALESCE(quantity, 0), cost_price, selling_price, image
+        FROM src
+        ON CONFLICT (sku) DO UPDATE SET
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            category_id = EXCLUDED.category_id,
+            quantity = EXCLUDED.quantity,
+            cost_price = EXCLUDED.cost_price,
+            selling_price = EXCLUDED.selling_price,
+            image = EXCLUDED.image
+        WHERE (p.name, p.description, p.category_id, p.quantity, p.cost_price, p.selling_price, p.image)
+            IS DISTINCT FROM
+            (EXCLUDED.name, EXCLUDED.description, EXCLUDED.category_id, EXCLUDED.quantity,
+             EXCLUDED.cost_price, EXCLUDED.selling_price, EXCLUDED.image)
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT count(*) FROM src) AS distinct_skus,
+        (SELECT count(*) FROM src WHERE category IS NOT NULL AND category_id IS NULL) AS unresolved_categories,
+        count(*) FILTER (WHERE inserted) AS inserted,
+        count(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted
+""")
+
+
+def to_record(line_no: int, row: Dict[str, object]) -> tuple:
+    sku, name = field(row, "sku"), field(row, "name")
+    if not sku or not name:
+        raise ImportFormatError(line_no, "sku and name are required")
+    cost_price = number(row, "cost_price", line_no, Decimal)
+    if cost_price is None:
+        raise ImportFormatError(line_no, "cost_price is required")
+    return (
+        line_no,
+        sku,
+        name,
+        field(row, "description"),
+        field(row, "category"),
+        number(row, "quantity", line_no, int),
+        cost_price,
+        number(row, "selling_price", line_no, Decimal),
+        field(row, "image"),
+    )
+
+
+async def import_products(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str) -> Dict[str, int]:
+    """
+    Stream CSV/NDJSON rows into a temp table with COPY, then merge into products.
+
+    Must be called inside a transaction; the staging table is dropped on commit.
+    Memory use is bounded by asyncpg's COPY buffer, not by the input size.
+    """
+    rows = iter_rows(iter_lines(chunks), fmt)
+
+    async def records():
+        async for line_no, row in rows:
+            yield to_record(line_no, row)
+
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    copy_target = raw.driver_connection
+
+    await connection.execute(text(CREATE_STAGING_SQL))
+    await copy_target.copy_records_to_table("product_import", records=records(), columns=IMPORT_COLUMNS)
+
+    staged = (await connection.execute(text("SELECT count(*) FROM product_import"))).scalar_one()
+    await connection.execute(FILL_QUANTITY_SQL)
+    summary = (await connection.execute(MERGE_SQL)).one()
+    distinct_skus = summary.distinct_skus
+    return {
+        "rows": staged,
+        "inserted": summary.inserted,
+        "updated": summary.updated,
+        "unchanged": distinct_skus - summary.inserted - summary.updated,
+        "duplicates": staged - distinct_skus,
+        "unresolved_categories": summary.unresolved_categories,
+    }
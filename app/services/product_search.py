@@ -0,0 +1,81 @@
+from sqlalchemy import Select, case, func, literal_column, or_, select, union
+from app.models.products import Product
+
+# Must match the expression indexed by migration 7c2d4e6f8a10 exactly,
+# otherwise the planner cannot use the GIN index.
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+DESCRIPTION_TSV = func.to_tsvector(SEARCH_CONFIG, func.coalesce(Product.description, literal_column("''")))
+
+# Shorter terms have no trigram to look up, so they only match name/sku prefixes
+MIN_TRIGRAM_TERM = 3
+
+# Must match the prefix indexes of migration b4e8d2a6c931 (byte order, so LIKE 'x%' can range-scan)
+NAME_PREFIX = func.lower(Product.name).collate("C")
+SKU_PREFIX = func.lower(Product.sku).collate("C")
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _candidates(term: str, limit: int):
+    """
+    Ids of at most a few times ``limit`` likely hits, each branch read in index
+    order and stopped at its LIMIT, so no branch ranks or sorts every match.
+    """
+    if len(term) < MIN_TRIGRAM_TERM:
+        prefix = escape_like(term.lower()) + "%"
+        return union(
+            select(Product.id).where(NAME_PREFIX.like(prefix)).order_by(NAME_PREFIX).limit(limit),
+            select(Product.id).where(SKU_PREFIX.like(prefix)).order_by(SKU_PREFIX).limit(limit),
+        )
+    pattern = f"%{escape_like(term)}%"
+    ts_query = func.plainto_tsquery(SEARCH_CONFIG, term)
+    return union(
+        # Exact SKU (case-insensitive) through the prefix index
+        select(Product.id).where(SKU_PREFIX == term.lower()).limit(1),
+        # Nearest by trigram distance: an ordered scan of the GiST indexes
+        select(Product.id)
+        .where(or_(Product.name.op("%")(term), Product.name.ilike(pattern)))
+        .order_by(Product.name.op("<->")(term)).limit(limit),
+        select(Product.id)
+        .where(or_(Product.sku.op("%")(term), Product.sku.ilike(pattern)))
+        .order_by(Product.sku.op("<->")(term)).limit(limit),
+        # Any description matches, ranked below among the candidates only
+        select(Product.id).where(DESCRIPTION_TSV.op("@@")(ts_query)).limit(limit),
+    )
+
+
+def build_product_search_query(q: str, limit: int) -> Select:
+    """
+    Ranked typeahead over products.
+
+    name/sku are matched by trigram similarity or substring (GiST trigram
+    indexes), description by full-text search; terms under three characters
+    match name/sku prefixes instead. Exact SKU hits rank first, then prefix
+    hits, then trigram similarity and text rank. Ranking only looks at the
+    candidates each index returns in its own order, so the cost depends on
+    ``limit`` rather than on how many products match.
+    """
+    term = q.strip()
+    prefix = f"{escape_like(term)}%"
+    ts_query = func.plainto_tsquery(SEARCH_CONFIG, term)
+    candidates = _candidates(term, limit).subquery()
+
+    rank = (
+        case((func.lower(Product.sku) == term.lower(), 3.0), else_=0.0)
+        + case(
+            (or_(Product.sku.ilike(prefix), Product.name.ilike(prefix)), 2.0),
+            else_=0.0,
+        )
+        + func.greatest(func.similarity(Product.name, term), func.similarity(Product.sku, term))
+        + func.ts_rank(DESCRIPTION_TSV, ts_query)
+    ).label("rank")
+
+    return (
+        select(Product, rank)
+        .where(Product.id.in_(select(candidates.c.id)))
+        .order_by(rank.desc(), Product.name)
+        .limit(limit)
+    )
@@ -0,0 +1,304 @@
+"""
+Opt-in profiling of single requests.
+
+A request carrying ``X-Profile: <PROFILE_SECRET>`` is sampled while it runs
+and leaves two files in PROFILE_DIR, named in the response's X-Profile-Id
+header:
+
+- ``<id>.folded``: collapsed stacks ("frame;frame;frame count"), the input of
+  flamegraph.pl, speedscope and inferno. The first frame below the request
+  is its phase, so the graph splits by phase first.
+- ``<id>.json``: wall time broken down into DB wait, ORM (statement
+  compilation and row hydration), Pydantic validation, JSON serialization
+  and the rest of the app's code, plus the slowest statements.
+
+DB wait is timed exactly from cursor execution events. The other phases are
+estimated from stack samples taken about every PROFILE_INTERVAL_MS by a
+thread, counting only samples taken while one of the request's own tasks was
+running, so concurrent requests on the same event loop do not leak into the
+profile. The sampler needs the GIL, which a busy loop thread hands over only
+every few milliseconds, so each sample is weighted by the time since the
+previous one; counts in the folded file are microseconds.
+Without the header the cost is one header lookup per request and one context
+variable read per SQL statement.
+"""
+import asyncio
+import contextvars
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"x-profile"
+
+PHASES = ("db", "orm", "validation", "serialization", "app")
+
+# Checked from the innermost frame outwards; the first frame that matches
+# decides the phase of a sample
+_SERIALIZATION_FUNCTIONS = {
+    "serialize", "serialize_json", "jsonable_encoder", "render", "dumps", "encode", "iterencode",
+    "model_dump", "model_dump_json", "dump_python", "dump_json",
+}
+_DRIVER_PATHS = (
+    "/asyncpg/", "/psycopg/", "/sqlalchemy/dialects/", "/sqlalchemy/pool/", "/sqlalchemy/engine/default.py",
+)
+
+Frame = Tuple[str, str, int]
+
+_HANDLE_FILE = os.path.join("asyncio", "events.py")
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+def _phase(stack: Tuple[Frame, ...]) -> str:
+    """Phase of a sample; ``stack`` is innermost frame first"""
+    for filename, name, _line in stack:
+        if name in _SERIALIZATION_FUNCTIONS or filename.endswith(("json/encoder.py", "fastapi/encoders.py")):
+            return "serialization"
+        if "/pydantic/" in filename or (name == "validate" and "/fastapi/" in filename):
+            return "validation"
+        if any(path in filename for path in _DRIVER_PATHS):
+            return "db"
+        if "/sqlalchemy/" in filename:
+            return "orm"
+    return "app"
+
+
+@lru_cache(maxsize=4096)
+def _label(frame: Frame) -> str:
+    filename, name, line = frame
+    for prefix in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    # ";" separates frames and " " the count in the folded format
+    return f"{name} ({filename}:{line})".replace(";", ":").replace(" ", "_")
+
+
+class RequestProfile:
+    def __init__(self, scope, interval: float):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = scope.get("query_string", b"").decode("latin-1")
+        self.interval = interval
+        self.started = time.perf_counter()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.path).strip("-")[:60] or "root"
+        self.id = f"{stamp}-{self.method}-{slug}"
+        # The request's task and every task started from its context
+        self.tasks: weakref.WeakSet = weakref.WeakSet()
+        self.stacks: Counter = Counter()
+        self.db_wait = 0.0
+        self.statements: List[Tuple[float, str]] = []
+        self.status: Optional[int] = None
+        self.elapsed = 0.0
+
+    def sample(self, frame, seconds: float) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            # Everything outside the callback the loop is running is the same for every sample
+            if code.co_name == "_run" and code.co_filename.endswith(_HANDLE_FILE):
+                break
+            stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+            frame = frame.f_back
+        self.stacks[tuple(stack)] += seconds
+
+    def statement(self, sql: str, seconds: float) -> None:
+        self.db_wait += seconds
+        self.statements.append((seconds, sql))
+
+    def breakdown(self) -> Dict[str, object]:
+        phases = Counter()
+        for stack, seconds in self.stacks.items():
+            phases[_phase(stack)] += seconds
+        sampled = {phase: round(phases[phase] * 1000, 2) for phase in PHASES}
+        total = self.elapsed * 1000
+        db_wait = self.db_wait * 1000
+        # Driver CPU time happens inside the timed statements, so it is part of DB wait
+        busy = sum(value for phase, value in sampled.items() if phase != "db")
+        return {
+            "request": {"method": self.method, "path": self.path, "query": self.query, "status": self.status},
+            "totalMs": round(total, 2),
+            "phasesMs": {
+                "dbWait": round(db_wait, 2),
+                "orm": sampled["orm"],
+                "validation": sampled["validation"],
+                "serialization": sampled["serialization"],
+                "app": sampled["app"],
+                # Waiting for the pool, admission, other requests' turns on the loop
+                "other": round(max(total - db_wait - busy, 0.0), 2),
+            },
+            "statements": len(self.statements),
+            "slowestStatements": [
+                {"ms": round(seconds * 1000, 2), "sql": " ".join(sql.split())[:500]}
+                for seconds, sql in sorted(self.statements, reverse=True)[:10]
+            ],
+            "sampledMs": round(sum(self.stacks.values()) * 1000, 2),
+            "intervalMs": self.interval * 1000,
+        }
+
+    def folded(self) -> str:
+        root = f"{self.method}_{self.path}".replace(" ", "_").replace(";", ":")
+        lines = [
+            ";".join([root, _phase(stack), *(_label(frame) for frame in reversed(stack))])
+            + f" {round(seconds * 1_000_000)}"
+            for stack, seconds in self.stacks.items()
+        ]
+        if self.db_wait:
+            lines.append(f"{root};db;[waiting_for_database] {round(self.db_wait * 1_000_000)}")
+        return "\n".join(sorted(lines)) + "\n"
+
+    def write(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        with open(f"{base}.folded", "w") as f:
+            f.write(self.folded())
+        with open(f"{base}.json", "w") as f:
+            json.dump(self.breakdown(), f, indent=2)
+
+
+class Sampler:
+    """
+    Samples the event loop thread's stack while any profiled request runs.
+
+    Started with the first profiled request and stopped after the last one;
+    meanwhile a task factory tags tasks created from a profiled request's
+    context so their samples are attributed to it.
+    """
+
+    def __init__(self):
+        self.active: Set[RequestProfile] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._previous_factory = None
+        self._stop: Optional[threading.Event] = None
+
+    def _task_factory(self, loop, coro, context=None):
+        if self._previous_factory is not None:
+            task = (self._previous_factory(loop, coro) if context is None
+                    else self._previous_factory(loop, coro, context=context))
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        profile = context.get(_current) if context is not None else _current.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+
+    def _run(self, interval: float, stop: threading.Event) -> None:
+        last = time.perf_counter()
+        while not stop.wait(interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            task = asyncio.current_task(self._loop)
+            if task is None:
+                continue
+            profiles = [profile for profile in list(self.active) if task in profile.tasks]
+            if not profiles:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            for profile in profiles:
+                profile.sample(frame, elapsed)
+
+    def start(self, profile: RequestProfile) -> None:
+        profile.tasks.add(asyncio.current_task())
+        self.active.add(profile)
+        if self._stop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        # One event per thread, so a restart cannot revive a thread being stopped
+        self._stop = threading.Event()
+        threading.Thread(
+            target=self._run, args=(profile.interval, self._stop), name="request-profiler", daemon=True
+        ).start()
+
+    def stop(self, profile: RequestProfile) -> None:
+        self.active.discard(profile)
+        if self.active or self._stop is None:
+            return
+        self._loop.set_task_factory(self._previous_factory)
+        # The thread exits within one interval; no need to block the loop on it
+        self._stop.set()
+        self._stop = None
+
+
+sampler = Sampler()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    started = conn.info.get("profile_started")
+    if profile is not None and started:
+        profile.statement(statement, time.perf_counter() - started.pop())
+
+
+def _requested(scope, secret: bytes) -> bool:
+    for name, value in scope["headers"]:
+        if name == HEADER:
+            return hmac.compare_digest(value, secret)
+    return False
+
+
+class ProfilingMiddleware:
+    """Profiles requests that present the secret in X-Profile (see module docstring)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings()
+        if (
+            scope["type"] != "http"
+            or not settings.PROFILE_SECRET
+            or not _requested(scope, settings.PROFILE_SECRET.encode())
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope, settings.PROFILE_INTERVAL_MS / 1000)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        token = _current.set(profile)
+        sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.elapsed = time.perf_counter() - profile.started
+            sampler.stop(profile)
+            _current.reset(token)
+            try:
+                await asyncio.to_thread(profile.write, settings.PROFILE_DIR)
+                logger.info("profile %s: %s", profile.id, profile.breakdown()["phasesMs"])
+            except OSError:
+                logger.exception("writing profile %s failed", profile.id)
@@ -0,0 +1,142 @@
+from datetime import date, timedelta
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Each fragment yields (day, sales_person_id, order_count, order_revenue,
+# invoiced_amount, collected_amount) deltas, multiplied by :sign, from one
+# schema: "public" for the hot tables, "archive" for app.services.archive.
+ORDER_DELTAS = """
+    SELECT so.date AS day, so.sales_person_id,
+           CAST(:sign AS integer) AS order_count,
+           CAST(:sign AS integer) * COALESCE(sum(si.quantity * si.price), 0) AS order_revenue,
+           CAST(0 AS numeric) AS invoiced_amount,
+           CAST(0 AS numeric) AS collected_amount
+    FROM {schema}.sales_orders so
+    LEFT JOIN {schema}.so_items si ON si.sales_order_id = so.id AND si.order_date = so.date
+    WHERE {where}
+    GROUP BY so.id, so.date, so.sales_person_id
+"""
+
+# Invoiced amounts include tax: that is what the customer is billed
+INVOICE_DELTAS = """
+    SELECT inv.date AS day, inv.sales_person_id,
+           0, CAST(0 AS numeric),
+           CAST(:sign AS integer) * COALESCE(sum(ii.quantity_invoiced * si.price * (1 + si.tax_rate)), 0),
+           CAST(0 AS numeric)
+    FROM {schema}.invoices inv
+    LEFT JOIN {schema}.invoice_items ii ON ii.invoice_id = inv.id AND ii.invoice_date = inv.date
+    LEFT JOIN {schema}.so_items si ON si.id = ii.so_item_id AND si.order_date = ii.order_date
+    WHERE {where}
+    GROUP BY inv.id, inv.date, inv.sales_person_id
+"""
+
+PAYMENT_DELTAS = """
+    SELECT p.payment_date AS day, inv.sales_person_id,
+           0, CAST(0 AS numeric), CAST(0 AS numeric),
+           CAST(:sign AS integer) * p.amount
+    FROM {schema}.payments p
+    JOIN {schema}.invoices inv ON inv.id = p.invoice_id AND inv.date = p.invoice_date
+    WHERE {where}
+"""
+
+# Every delta is applied at day, month and year grain. Deltas are grouped first
+# so one statement never touches the same counter row twice.
+APPLY_SQL = """
+    INSERT INTO sales_person_counters AS c
+        (grain, period_start, sales_person_id, order_count, order_revenue, invoiced_amount, collected_amount)
+    SELECT g.grain, g.period_start, d.sales_person_id,
+           sum(d.order_count), sum(d.order_revenue), sum(d.invoiced_amount), sum(d.collected_amount)
+    FROM ({deltas}) AS d(day, sales_person_id, order_count, order_revenue, invoiced_amount, collected_amount)
+    CROSS JOIN LATERAL (VALUES
+        ('d', d.day),
+        ('m', CAST(date_trunc('month', d.day) AS date)),
+        ('y', CAST(date_trunc('year', d.day) AS date))
+    ) AS g(grain, period_start)
+    WHERE d.sales_person_id IS NOT NULL
+    GROUP BY g.grain, g.period_start, d.sales_person_id
+    ON CONFLICT (grain, period_start, sales_person_id) DO UPDATE SET
+        order_count = c.order_count + EXCLUDED.order_count,
+        order_revenue = c.order_revenue + EXCLUDED.order_revenue,
+        invoiced_amount = c.invoiced_amount + EXCLUDED.invoiced_amount,
+        collected_amount = c.collected_amount + EXCLUDED.collected_amount
+"""
+
+ADD_ORDER_SQL = text(APPLY_SQL.format(deltas=ORDER_DELTAS.format(schema="public", where="so.id = :id")))
+ADD_INVOICE_SQL = text(APPLY_SQL.format(deltas=INVOICE_DELTAS.format(schema="public", where="inv.id = :id")))
+ADD_PAYMENT_SQL = text(APPLY_SQL.format(deltas=PAYMENT_DELTAS.format(schema="public", where="p.id = :id")))
+REMOVE_ORDERS_SQL = text(APPLY_SQL.format(deltas=" UNION ALL ".join([
+    ORDER_DELTAS.format(schema="public", where="so.id = ANY(:ids)"),
+    INVOICE_DELTAS.format(schema="public", where="inv.sales_order_id = ANY(:ids)"),
+    PAYMENT_DELTAS.format(schema="public", where="inv.sales_order_id = ANY(:ids)"),
+])))
+
+# Invoices and payments of soft-deleted orders were subtracted by remove_orders
+_LIVE_ORDER = (
+    "NOT EXISTS (SELECT 1 FROM {schema}.sales_orders d"
+    " WHERE d.id = inv.sales_order_id AND d.date = inv.order_date AND d.deleted_at IS NOT NULL)"
+)
+# Archiving moves documents without touching the counters, so a rebuild reads
+# the archived ones too; otherwise it would drop them from the leaderboard
+REBUILD_SQL = text(APPLY_SQL.format(deltas=" UNION ALL ".join(
+    fragment
+    for schema in ("public", "archive")
+    for fragment in (
+        ORDER_DELTAS.format(schema=schema, where="so.deleted_at IS NULL"),
+        INVOICE_DELTAS.format(schema=schema, where=_LIVE_ORDER.format(schema=schema)),
+        PAYMENT_DELTAS.format(schema=schema, where=_LIVE_ORDER.format(schema=schema)),
+    )
+)))
+
+
+async def add_order(db: AsyncSession, order_id: int) -> None:
+    await db.execute(ADD_ORDER_SQL, {"id": order_id, "sign": 1})
+
+
+async def add_invoice(db: AsyncSession, invoice_id: int) -> None:
+    await db.execute(ADD_INVOICE_SQL, {"id": invoice_id, "sign": 1})
+
+
+async def add_payment(db: AsyncSession, payment_id: int) -> None:
+    await db.execute(ADD_PAYMENT_SQL, {"id": payment_id, "sign": 1})
+
+
+async def remove_orders(db: AsyncSession, order_ids: List[int]) -> None:
+    """Subtract orders together with their invoices and payments (call before purging)"""
+    await db.execute(REMOVE_ORDERS_SQL, {"ids": order_ids, "sign": -1})
+
+
+async def rebuild_counters(db: AsyncSession) -> None:
+    """Recompute every counter row from the hot and archived orders, invoices and payments"""
+    await db.execute(text("DELETE FROM sales_person_counters"))
+    await db.execute(REBUILD_SQL, {"sign": 1})
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def split_period(start: date, end: date) -> List[Tuple[str, date, date]]:
+    """
+    Cover [start, end] with the coarsest counter rows available.
+
+    Returns (grain, first period_start, last period_start) ranges: at most a
+    partial month of days, the months up to a year boundary, whole years, and
+    the same again on the way out - a bounded row count for any range length.
+    """
+    ranges: List[Tuple[str, date, date]] = []
+    current = start
+    while current <= end:
+        if current.month == 1 and current.day == 1 and date(current.year, 12, 31) <= end:
+            grain, following = "y", date(current.year + 1, 1, 1)
+        elif current.day == 1 and _next_month(current) - timedelta(days=1) <= end:
+            grain, following = "m", _next_month(current)
+        else:
+            grain, following = "d", current + timedelta(days=1)
+
+        if ranges and ranges[-1][0] == grain:
+            ranges[-1] = (grain, ranges[-1][1], current)
+        else:
+            ranges.append((grain, current, current))
+        current = following
+    return ranges
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+from datetime import date
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import AsyncSessionLocal, engine
+
+DIMENSIONS = ("customer", "sales_person", "product", "category")
+
+# Order lines of one schema: "public" for the hot tables, "archive" for orders
+# moved there by app.services.archive
+_ORDER_LINES = """
+    SELECT so.id, so.date, so.customer_id, so.sales_person_id,
+           si.product_id, si.category_id, si.quantity, si.price, si.tax_rate
+    FROM {schema}.sales_orders so
+    JOIN {schema}.so_items si ON si.sales_order_id = so.id AND si.order_date = so.date
+    WHERE {where}
+"""
+
+# Expands each line item into one row per dimension. There is deliberately no
+# "total" dimension: every order has exactly one customer, so totals are the
+# sum of the customer rows and no single row becomes a write hotspot.
+# Categories come from the line itself (captured when the order was written),
+# so subtracting an order always hits the rows adding it did.
+_LINES_BY_DIMENSION = """
+    SELECT
+        l.date AS day,
+        d.dimension,
+        d.dimension_id,
+        count(DISTINCT l.id) AS order_count,
+        sum(l.quantity) AS quantity,
+        sum(l.quantity * l.price) AS revenue,
+        sum(l.quantity * l.price * l.tax_rate) AS tax
+    FROM ({lines}) l
+    CROSS JOIN LATERAL (VALUES
+        ('customer', l.customer_id),
+        ('sales_person', COALESCE(l.sales_person_id, 0)),
+        ('product', l.product_id),
+        ('category', COALESCE(l.category_id, 0))
+    ) AS d(dimension, dimension_id)
+    GROUP BY l.date, d.dimension, d.dimension_id
+"""
+
+APPLY_ORDER_SQL = text(f"""
+    INSERT INTO sales_rollup_daily AS r (day, dimension, dimension_id, order_count, quantity, revenue, tax)
+    SELECT day, dimension, dimension_id,
+           CAST(:sign AS integer) * order_count,
+           CAST(:sign AS integer) * quantity,
+           CAST(:sign AS integer) * revenue,
+           CAST(:sign AS integer) * tax
+    FROM ({_LINES_BY_DIMENSION.format(lines=_ORDER_LINES.format(schema="public", where="so.id = ANY(:order_ids)"))}) lines
+    ON CONFLICT (day, dimension, dimension_id) DO UPDATE SET
+        order_count = r.order_count + EXCLUDED.order_count,
+        quantity = r.quantity + EXCLUDED.quantity,
+        revenue = r.revenue + EXCLUDED.revenue,
+        tax = r.tax + EXCLUDED.tax
+""")
+
+DELETE_RANGE_SQL = text("DELETE FROM sales_rollup_daily WHERE day BETWEEN :start AND :end")
+
+# Archiving moves orders without touching the rollups, so a rebuild reads the
+# archived orders too; otherwise it would drop their revenue from the range
+_REBUILD_LINES = " UNION ALL ".join(
+    _ORDER_LINES.format(schema=schema, where="so.date BETWEEN :start AND :end AND so.deleted_at IS NULL")
+    for schema in ("public", "archive")
+)
+
+REBUILD_RANGE_SQL = text(f"""
+    INSERT INTO sales_rollup_daily (day, dimension, dimension_id, order_count, quantity, revenue, tax)
+    {_LINES_BY_DIMENSION.format(lines=_REBUILD_LINES)}
+""")
+
+
+async def add_order_to_rollups(db: AsyncSession, order_id: int) -> None:
+    """Fold a newly created order into the rollups (call after its items are flushed)"""
+    await db.execute(APPLY_ORDER_SQL, {"order_ids": [order_id], "sign": 1})
+
+
+async def remove_orders_from_rollups(db: AsyncSession, order_ids: List[int]) -> None:
+    """Subtract orders from the rollups (call before they are purged)"""
+    await db.execute(APPLY_ORDER_SQL, {"order_ids": order_ids, "sign": -1})
+
+
+async def rebuild_rollups(db: AsyncSession, start: date, end: date) -> None:
+    """Recompute the rollups for a date range from the hot and archived order lines"""
+    await db.execute(DELETE_RANGE_SQL, {"start": start, "end": end})
+    await db.execute(REBUILD_RANGE_SQL, {"start": start, "end": end})
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild sales rollups for a date range")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, required=True)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, required=True)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await rebuild_rollups(session, args.start, args.end)
+    await engine.dispose()
+
+
+# python -m app.services.sales_rollups --from 2024-01-01 --to 2024-12-31
+if __name__ == "__main__":
+    asyncio.run(_main())
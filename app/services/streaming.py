@@ -0,0 +1,94 @@
+import codecs
+import csv
+import json
+from decimal import InvalidOperation
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+
+class ImportFormatError(ValueError):
+    """Raised for malformed input rows; carries the 1-based line number"""
+
+    def __init__(self, line_no: int, message: str):
+        self.line_no = line_no
+        super().__init__(f"Line {line_no}: {message}")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    header: Optional[list[str]] = None
+    record, line_no, start_line = "", 0, 0
+    async for line in lines:
+        line_no += 1
+        if not record:
+            start_line = line_no
+        record = f"{record}\n{line}" if record else line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            continue
+        if len(values) != len(header):
+            raise ImportFormatError(start_line, f"expected {len(header)} fields, got {len(values)}")
+        yield start_line, dict(zip(header, values))
+    if record:
+        raise ImportFormatError(start_line, "unterminated quoted field")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Dict[str, object]]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(line_no, f"invalid JSON ({e.msg})")
+        if not isinstance(row, dict):
+            raise ImportFormatError(line_no, "expected a JSON object")
+        yield line_no, row
+
+
+def field(row: Dict[str, object], key: str) -> Optional[str]:
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def number(row: Dict[str, object], key: str, line_no: int, cast):
+    value = field(row, key)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (ValueError, InvalidOperation):
+        raise ImportFormatError(line_no, f"invalid {key}: {value!r}")
+
+
+def iter_rows(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Dict[str, object]]]:
+    """Parse decoded lines as CSV (with a header row) or NDJSON"""
+    return iter_csv_rows(lines) if fmt == "csv" else iter_ndjson_rows(lines)
+
+
+def detect_format(content_type: str) -> str:
+    return "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
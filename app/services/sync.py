@@ -0,0 +1,171 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+
+# Change kinds in the order they sort within a single timestamp
+KINDS = ("sales_order", "invoice", "quotation", "purchase_order", "tombstone")
+
+# (kind rank, table, extra filter) per change branch; every table is scanned
+# through its (updated_at, id) index, tombstones through (deleted_at, id)
+_BRANCHES = (
+    (0, "sales_orders", "t.deleted_at IS NULL"),
+    (1, "invoices", "TRUE"),
+    (2, "quotations", "TRUE"),
+    (3, "purchase_orders", "TRUE"),
+)
+
+_BRANCH_SQL = """
+    (SELECT {rank} AS kind, t.id, t.updated_at AS changed_at
+     FROM {table} t
+     WHERE {extra} AND t.updated_at < :horizon AND {cond}
+     ORDER BY t.updated_at, t.id LIMIT :limit)
+"""
+
+_TOMBSTONE_SQL = """
+    (SELECT 4 AS kind, t.id, t.deleted_at AS changed_at
+     FROM sync_tombstones t
+     WHERE t.deleted_at < :horizon AND {cond}
+     ORDER BY t.deleted_at, t.id LIMIT :limit)
+"""
+
+# Documents are sent as their raw rows with line items embedded
+SYNC_SQL = """
+    WITH page AS (
+        SELECT * FROM ({branches}) changes
+        ORDER BY changed_at, kind, id
+        LIMIT :limit
+    )
+    SELECT page.kind, page.id, page.changed_at, tomb.entity, tomb.entity_id,
+        CASE page.kind
+            WHEN 0 THEN (
+                SELECT to_jsonb(so) - 'deleted_at' || jsonb_build_object('items', (
+                    SELECT COALESCE(jsonb_agg(to_jsonb(si) ORDER BY si.id), '[]')
+                    FROM so_items si WHERE si.sales_order_id = so.id AND si.order_date = so.date))
+                FROM sales_orders so WHERE so.id = page.id)
+            WHEN 1 THEN (
+                SELECT to_jsonb(inv) || jsonb_build_object(
+                    'items', (SELECT COALESCE(jsonb_agg(to_jsonb(ii) ORDER BY ii.id), '[]')
+                              FROM invoice_items ii WHERE ii.invoice_id = inv.id),
+                    'payments', (SELECT COALESCE(jsonb_agg(to_jsonb(p) ORDER BY p.id), '[]')
+                                 FROM payments p WHERE p.invoice_id = inv.id))
+                FROM invoices inv WHERE inv.id = page.id)
+            WHEN 2 THEN (
+                SELECT to_jsonb(q) || jsonb_build_object('items', (
+                    SELECT COALESCE(jsonb_agg(to_jsonb(qi) ORDER BY qi.id), '[]')
+                    FROM qo_items qi WHERE qi.quotation_id = q.id))
+                FROM quotations q WHERE q.id = page.id)
+            WHEN 3 THEN (
+                SELECT to_jsonb(po) || jsonb_build_object('items', (
+                    SELECT COALESCE(jsonb_agg(to_jsonb(pi) ORDER BY pi.id), '[]')
+                    FROM po_items pi WHERE pi.purchase_order_id = po.id))
+                FROM purchase_orders po WHERE po.id = page.id)
+        END AS data
+    FROM page
+    LEFT JOIN sync_tombstones tomb ON page.kind = 4 AND tomb.id = page.id
+    ORDER BY page.changed_at, page.kind, page.id
+"""
+
+# updated_at is the writer's transaction start time, so a row stamped before
+# the oldest transaction still running is committed and can no longer appear
+# behind the cursor. Changes newer than that are left for the next call.
+HORIZON_SQL = text("""
+    SELECT LEAST(now(), COALESCE(min(xact_start), now()))
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND xact_start IS NOT NULL
+""")
+
+RECORD_TOMBSTONES_SQL = text("""
+    INSERT INTO sync_tombstones (entity, entity_id)
+    SELECT :entity, unnest(CAST(:ids AS integer[]))
+""")
+
+
+class SyncCursorExpired(Exception):
+    """The cursor predates the oldest retained tombstone; the client must resync in full"""
+
+
+def encode_cursor(changed_at: datetime, kind: int, change_id: int) -> str:
+    payload = json.dumps([changed_at.isoformat(), kind, change_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, int]:
+    try:
+        changed_at, kind, change_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        changed_at = datetime.fromisoformat(changed_at)
+        kind, change_id = int(kind), int(change_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid sync cursor")
+    # Cursors from encode_cursor always carry an offset; a naive one was not
+    # issued by us and cannot be compared with the timestamptz columns
+    if changed_at.tzinfo is None:
+        raise ValueError("Invalid sync cursor")
+    return changed_at, kind, change_id
+
+
+def _branch_condition(kind: int, column: str, after: Optional[tuple]) -> str:
+    """Keyset predicate for one branch, written so its (timestamp, id) index applies"""
+    if after is None:
+        return "TRUE"
+    _, after_kind, _ = after
+    if kind > after_kind:
+        return f"{column} >= :after_ts"
+    if kind < after_kind:
+        return f"{column} > :after_ts"
+    return f"({column}, t.id) > (:after_ts, :after_id)"
+
+
+async def record_tombstones(db: AsyncSession, entity: str, ids: List[int]) -> None:
+    await db.execute(RECORD_TOMBSTONES_SQL, {"entity": entity, "ids": ids})
+
+
+async def fetch_changes(
+    db: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], str, bool]:
+    """
+    Documents created, updated or deleted after the cursor, oldest first.
+
+    Without a cursor everything is returned (a full download, paginated).
+    Returns (changes, cursor to resume from, whether more pages follow).
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        retention = timedelta(days=get_settings().SYNC_TOMBSTONE_RETENTION_DAYS)
+        if after[0] < datetime.now(timezone.utc) - retention:
+            raise SyncCursorExpired()
+
+    branches = [
+        _BRANCH_SQL.format(rank=rank, table=table, extra=extra, cond=_branch_condition(rank, "t.updated_at", after))
+        for rank, table, extra in _BRANCHES
+    ]
+    branches.append(_TOMBSTONE_SQL.format(cond=_branch_condition(4, "t.deleted_at", after)))
+
+    horizon = (await db.execute(HORIZON_SQL)).scalar_one()
+    params = {"horizon": horizon, "limit": limit + 1}
+    if after:
+        params.update(after_ts=after[0], after_id=after[2])
+
+    sql = text(SYNC_SQL.format(branches=" UNION ALL ".join(branches))).columns(data=JSONB)
+    rows = (await db.execute(sql, params)).all()
+
+    changes = []
+    for row in rows[:limit]:
+        if row.kind == 4:
+            changes.append({"entity": row.entity, "id": row.entity_id, "op": "delete", "changedAt": row.changed_at, "data": None})
+        else:
+            changes.append({"entity": KINDS[row.kind], "id": row.id, "op": "upsert", "changedAt": row.changed_at, "data": row.data})
+
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return changes, encode_cursor(last.changed_at, last.kind, last.id), True
+    # Everything before the horizon has been seen: resume from there
+    if after is not None and horizon <= after[0]:
+        return changes, cursor, False
+    return changes, encode_cursor(horizon, -1, 0), False
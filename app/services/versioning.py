@@ -0,0 +1,68 @@
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Returned by writes that change a sales order through another document
+# (invoices, shipments): the order's new ETag, for the next If-Match
+SALES_ORDER_ETAG_HEADER = "X-Sales-Order-ETag"
+
+
+class VersionConflict(Exception):
+    """A row changed between reading its version and writing it back"""
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Version named by an If-Match header: a bare number or a quoted ETag"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must carry a document version")
+
+
+def check_if_match(if_match: Optional[str], version: int) -> None:
+    """Reject the write with 412 when the client edited an older version"""
+    expected = parse_if_match(if_match)
+    if expected is not None and expected != version:
+        raise HTTPException(
+            status_code=412,
+            detail=f"Document has changed (version {version}, If-Match {expected})",
+        )
+
+
+async def claim_version(db: AsyncSession, model, if_match: Optional[str], *criteria) -> int:
+    """
+    Bump the version of the row matching ``criteria`` inside the current
+    transaction and return the new one. updated_at moves with it, so /sync
+    sends the document again.
+
+    The If-Match check is part of the UPDATE, so it is made against the row
+    as it is when locked, not against an earlier read; the row lock then
+    makes other writers of the same document wait for this transaction.
+    412 when the client edited an older version, 404 when the row is gone.
+    """
+    expected = parse_if_match(if_match)
+    statement = (
+        update(model)
+        .where(*criteria)
+        .values(version=model.version + 1, updated_at=func.now())
+        .returning(model.version)
+        .execution_options(synchronize_session=False)
+    )
+    if expected is not None:
+        statement = statement.where(model.version == expected)
+    version = (await db.execute(statement)).scalar_one_or_none()
+    if version is None:
+        if expected is not None:
+            raise HTTPException(status_code=412, detail=f"Document has changed (If-Match {expected})")
+        raise HTTPException(status_code=404, detail="Document not found")
+    return version
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Optional
+from app.config import get_settings
+from app.db import AsyncSessionLocal, engine
+from app.services.outbox import HANDLERS, claim_events, complete_event, fail_event
+# Handler modules register their topics on import
+from app.services import order_status  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+async def process_event(event, semaphore: asyncio.Semaphore) -> None:
+    """Run one handler; its writes and the completion mark commit together"""
+    settings = get_settings()
+    async with semaphore:
+        try:
+            func = HANDLERS.get(event.topic)
+            if func is None:
+                raise LookupError(f"No handler for topic {event.topic!r}")
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    await func(session, event.payload)
+                    await complete_event(session, event.id)
+        except Exception as e:
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    status = await fail_event(session, event.id, repr(e), settings.OUTBOX_MAX_ATTEMPTS)
+            if status == "dead":
+                logger.error("outbox event %s (%s) dead-lettered after %s attempts", event.id, event.topic, event.attempts, exc_info=e)
+            else:
+                logger.warning("outbox event %s (%s) failed, will retry: %r", event.id, event.topic, e)
+
+
+async def run_worker(stop: Optional[asyncio.Event] = None) -> None:
+    """
+    Claim pending outbox events in batches with FOR UPDATE SKIP LOCKED and
+    run up to OUTBOX_CONCURRENCY handlers at once. Several workers (or API
+    processes running it in-process) can share the table safely.
+    """
+    settings = get_settings()
+    stop = stop or asyncio.Event()
+    semaphore = asyncio.Semaphore(settings.OUTBOX_CONCURRENCY)
+
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    events = await claim_events(session, settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_LEASE_SECONDS)
+        except Exception:
+            logger.exception("claiming outbox events failed")
+            events = []
+
+        if events:
+            await asyncio.gather(*(process_event(event, semaphore) for event in events))
+            if len(events) == settings.OUTBOX_BATCH_SIZE:
+                continue
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Process outbox events")
+    parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await run_worker(stop)
+    finally:
+        await engine.dispose()
+
+
+# python -m app.worker
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,212 @@
+"""
+Load-test every /api/v1 route against a seeded database and compare the
+results with a stored baseline.
+
+    python -m app.seed --orders 200000 --truncate
+    python -m benchmarks.api run --concurrency 1,16,64 --seconds 30 --save-baseline
+    ... change something, reseed the same way ...
+    python -m benchmarks.api run --concurrency 1,16,64 --seconds 30 --baseline benchmarks/baselines/api.json
+    python -m benchmarks.api compare benchmarks/results/api-20261018-101500.json
+
+The app is started with its lifespan (pool warm-up included) and driven
+in-process through its full middleware stack, so admission control,
+coalescing and the audit flusher behave as configured in the environment.
+Each concurrency level runs that many simulated clients, picking weighted
+scenarios from --mix, for --warmup seconds unrecorded and then --seconds
+recorded. Results (JSON) hold per-route p50/p95/p99 latency, throughput,
+status counts and SQL statements per request, plus RSS; compare exits 1
+when something regressed beyond --tolerance.
+
+Write scenarios add orders, customers and products: reseed with the same
+--seed before every run whose results are compared.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from sqlalchemy import text
+from app.db import engine
+from app.lifecycle import lifecycle
+from app.main import app, lifespan
+from app.services import admission
+from benchmarks.api.client import AsgiClient, count_queries
+from benchmarks.api.report import MemorySampler, Recorder, compare, format_run, summarize
+from benchmarks.api.scenarios import (
+    EXCLUDED_ROUTES, MIXES, SCENARIOS, Fixtures, Visitor, load_fixtures, pick_scenarios, uncovered_routes,
+)
+
+logger = logging.getLogger("benchmarks.api")
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "results"
+BASELINE = Path(__file__).resolve().parent.parent / "baselines" / "api.json"
+
+DATASET_SQL = text("""
+    SELECT (SELECT count(*) FROM sales_orders WHERE deleted_at IS NULL) AS orders,
+           (SELECT count(*) FROM invoices) AS invoices,
+           (SELECT count(*) FROM customers) AS customers,
+           (SELECT count(*) FROM products) AS products
+""")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+async def run_level(fixtures: Fixtures, mix: str, only: Optional[List[str]], concurrency: int,
+                    seconds: float, warmup: float, seed: int) -> dict:
+    scenarios, weights = pick_scenarios(mix, only)
+    recorder = Recorder()
+    client = AsgiClient(app, recorder)
+    scenario_errors: Counter = Counter()
+    deadline = time.perf_counter() + warmup + seconds
+
+    async def visitor(number: int) -> None:
+        v = Visitor(client, fixtures, random.Random(f"{seed}/{concurrency}/{number}"))
+        while time.perf_counter() < deadline:
+            fn = v.rng.choices(scenarios, weights)[0]
+            try:
+                await fn(v)
+            except Exception as e:
+                # Unexpected response shapes; the requests themselves were recorded
+                scenario_errors[f"{fn.__name__}: {type(e).__name__}: {e}"[:160]] += 1
+
+    visitors = asyncio.gather(*(visitor(i) for i in range(concurrency)))
+    await asyncio.sleep(warmup)
+    recorder.enabled = True
+    sampler = MemorySampler()
+    sampler.start()
+    started = time.perf_counter()
+    await visitors
+    elapsed = time.perf_counter() - started
+    recorder.enabled = False
+    memory = await sampler.stop()
+
+    routes = summarize(recorder, elapsed)
+    ok = sum(len(stats.latencies) for stats in recorder.routes.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed": round(elapsed, 3),
+        "requests": sum(route["requests"] for route in routes.values()),
+        "errors": sum(route["errors"] for route in routes.values()),
+        "throughput": round(ok / elapsed, 2),
+        "memory": memory,
+        "admission": admission.snapshot(),
+        "scenarioErrors": dict(scenario_errors.most_common(10)),
+        "routes": routes,
+    }
+
+
+async def run(args) -> dict:
+    count_queries(engine)
+    only = args.scenarios.split(",") if args.scenarios else None
+    unknown = set(only or ()) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    missing = uncovered_routes(app)
+    if missing:
+        print(f"warning: no scenario requests {', '.join(missing)}", file=sys.stderr)
+
+    async with lifespan(app):
+        while not lifecycle.ready:
+            await asyncio.sleep(0.05)
+        fixtures = await load_fixtures(engine)
+        async with engine.connect() as conn:
+            dataset = dict((await conn.execute(DATASET_SQL)).one()._mapping)
+
+        results = {
+            "meta": {
+                "startedAt": datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "mix": args.mix,
+                "scenarios": only,
+                "seconds": args.seconds,
+                "warmup": args.warmup,
+                "seed": args.seed,
+                "dataset": dataset,
+                "excludedRoutes": EXCLUDED_ROUTES,
+            },
+            "runs": [],
+        }
+        for concurrency in args.concurrency:
+            level = await run_level(fixtures, args.mix, only, concurrency, args.seconds, args.warmup, args.seed)
+            results["runs"].append(level)
+            print(format_run(level))
+    return results
+
+
+def write_json(path: Path, document: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2, default=str) + "\n")
+
+
+def report_comparison(current: dict, baseline_path: Path, tolerance: float) -> int:
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}", file=sys.stderr)
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    regressions = compare(current, baseline, tolerance)
+    print(f"compared with {baseline_path} (commit {baseline['meta'].get('commit')}, tolerance {tolerance:.0%})")
+    for line in regressions:
+        print(f"  REGRESSION {line}")
+    if not regressions:
+        print("  no regressions")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.api", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="drive the API and write a results file")
+    run_parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 16, 64],
+                            help="comma-separated client counts, one run each")
+    run_parser.add_argument("--seconds", type=float, default=30)
+    run_parser.add_argument("--warmup", type=float, default=5)
+    run_parser.add_argument("--mix", choices=MIXES, default="default")
+    run_parser.add_argument("--scenarios", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--output", type=Path, help="default: benchmarks/results/api-<timestamp>.json")
+    run_parser.add_argument("--baseline", type=Path, help="compare with this results file afterwards")
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE}")
+    run_parser.add_argument("--tolerance", type=float, default=0.2)
+
+    compare_parser = commands.add_parser("compare", help="compare a results file with the baseline")
+    compare_parser.add_argument("results", type=Path)
+    compare_parser.add_argument("--baseline", type=Path, default=BASELINE)
+    compare_parser.add_argument("--tolerance", type=float, default=0.2)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(report_comparison(json.loads(args.results.read_text()), args.baseline, args.tolerance))
+
+    results = asyncio.run(run(args))
+    output = args.output or RESULTS_DIR / f"api-{datetime.now():%Y%m%d-%H%M%S}.json"
+    write_json(output, results)
+    print(f"results written to {output}")
+    if args.save_baseline:
+        write_json(BASELINE, results)
+        print(f"baseline written to {BASELINE}")
+    if args.baseline:
+        sys.exit(report_comparison(results, args.baseline, args.tolerance))
+
+
+# python -m benchmarks.api run --concurrency 1,16,64 --seconds 30
+if __name__ == "__main__":
+    main()
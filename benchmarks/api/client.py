@@ -0,0 +1,143 @@
+"""
+An in-process HTTP client for the ASGI app that times every request and
+counts the SQL statements it ran.
+
+Requests go through the app's full middleware stack, the same path uvicorn
+takes, minus sockets and HTTP parsing. That keeps results free of client-side
+noise and lets queries be attributed to the request that issued them.
+"""
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from benchmarks.api.report import Recorder
+
+# Statements run by the request in progress; tasks the app spawns inherit it
+_queries: ContextVar[Optional[List[int]]] = ContextVar("bench_queries", default=None)
+
+
+def count_queries(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class AsgiClient:
+    def __init__(self, app, recorder: Recorder, user_id: int = 1):
+        self.app = app
+        self.recorder = recorder
+        self.user_id = user_id
+
+    async def request(
+        self,
+        method: str,
+        route: str,
+        path_params: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+        content: bytes = b"",
+        content_type: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        """
+        Send one request and record it under "METHOD route" (the path
+        template, so /sales-orders/1 and /sales-orders/2 aggregate together).
+        """
+        path = route.format(**(path_params or {}))
+        if json_body is not None:
+            content, content_type = json.dumps(json_body).encode(), "application/json"
+        raw_headers = [(b"host", b"bench"), (b"x-user-id", str(self.user_id).encode())]
+        if content_type:
+            raw_headers.append((b"content-type", content_type.encode()))
+        if content:
+            raw_headers.append((b"content-length", str(len(content)).encode()))
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode(), value.encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": urlencode(params or {}, doseq=True).encode(),
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+
+        body_sent = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": content, "more_body": False}
+            # Only asked by code watching for a disconnect, which never comes
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        status, response_headers, chunks = 500, {}, []
+        latency = queries = None
+        counter = [0]
+        token = _queries.set(counter)
+        started = time.perf_counter()
+
+        async def send(message):
+            nonlocal status, response_headers, latency, queries
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = {k.decode().lower(): v.decode() for k, v in message.get("headers", [])}
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    # Background tasks run after this; the client already has its answer
+                    latency = time.perf_counter() - started
+                    queries = counter[0]
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception as e:
+            self.recorder.failure(method, route, f"{type(e).__name__}: {str(e).splitlines()[0][:120] if str(e) else ''}")
+            return Response(599, {}, b"")
+        finally:
+            finished.set()
+            _queries.reset(token)
+
+        if latency is None:
+            latency, queries = time.perf_counter() - started, counter[0]
+        self.recorder.record(method, route, status, latency, queries)
+        return Response(status, response_headers, b"".join(chunks))
+
+    async def get(self, route: str, **kwargs) -> Response:
+        return await self.request("GET", route, **kwargs)
+
+    async def post(self, route: str, **kwargs) -> Response:
+        return await self.request("POST", route, **kwargs)
+
+    async def delete(self, route: str, **kwargs) -> Response:
+        return await self.request("DELETE", route, **kwargs)
@@ -0,0 +1,183 @@
+"""
+Per-route measurements, the results document and baseline comparison.
+
+A results file holds one entry per concurrency level, each with per-route
+latency percentiles (ms, successful requests only), throughput, status
+counts and SQL statements per request, plus the process's memory use.
+"""
+import asyncio
+import os
+import resource
+import statistics
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    failures: Counter = field(default_factory=Counter)
+
+
+class Recorder:
+    """Collects measurements; disabled while warming up"""
+
+    def __init__(self):
+        self.enabled = False
+        self.routes: Dict[str, RouteStats] = {}
+
+    def _stats(self, method: str, route: str) -> RouteStats:
+        return self.routes.setdefault(f"{method} {route}", RouteStats())
+
+    def record(self, method: str, route: str, status: int, latency: float, queries: int) -> None:
+        if not self.enabled:
+            return
+        stats = self._stats(method, route)
+        stats.statuses[str(status)] += 1
+        stats.queries.append(queries)
+        if status < 400:
+            stats.latencies.append(latency * 1000)
+
+    def failure(self, method: str, route: str, message: str) -> None:
+        if self.enabled:
+            self._stats(method, route).failures[message] += 1
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 3)
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, dict]:
+    routes = {}
+    for key, stats in sorted(recorder.routes.items()):
+        count = sum(stats.statuses.values()) + sum(stats.failures.values())
+        errors = count - len(stats.latencies)
+        routes[key] = {
+            "requests": count,
+            "errors": errors,
+            "statuses": dict(stats.statuses),
+            "failures": dict(stats.failures.most_common(5)),
+            "throughput": round(len(stats.latencies) / elapsed, 2),
+            "p50": percentile(stats.latencies, 0.50),
+            "p95": percentile(stats.latencies, 0.95),
+            "p99": percentile(stats.latencies, 0.99),
+            "mean": round(statistics.fmean(stats.latencies), 3) if stats.latencies else None,
+            "queries": round(statistics.fmean(stats.queries), 2) if stats.queries else None,
+            "queriesMax": max(stats.queries, default=None),
+        }
+    return routes
+
+
+def rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class MemorySampler:
+    """Resident set size sampled while a run is in progress"""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            rss = rss_bytes()
+            if rss is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, Optional[float]]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        mb = 1024 * 1024
+        # ru_maxrss is in kilobytes on Linux
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {
+            "rssStartMb": round(self.samples[0] / mb, 1) if self.samples else None,
+            "rssEndMb": round(self.samples[-1] / mb, 1) if self.samples else None,
+            "rssPeakMb": round(max(self.samples) / mb, 1) if self.samples else None,
+            "maxRssMb": round(max_rss / mb, 1),
+        }
+
+
+def _slower(current: Optional[float], base: Optional[float], tolerance: float, min_delta: float) -> bool:
+    if current is None or base is None:
+        return False
+    return current > base * (1 + tolerance) and current - base > min_delta
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2, min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Regressions of current against baseline, matched by concurrency and route.
+
+    Latency and throughput must move by more than ``tolerance`` (and latency
+    by more than ``min_delta_ms``) to count, since timings are noisy. Query
+    counts barely vary between runs, so any increase of half a statement per
+    request or more is reported.
+    """
+    regressions = []
+    base_runs = {run["concurrency"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        base = base_runs.get(run["concurrency"])
+        if base is None:
+            continue
+        label = f"c={run['concurrency']}"
+        if run["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{label} throughput {base['throughput']:.1f} -> {run['throughput']:.1f} req/s")
+        if _slower(run["memory"].get("rssPeakMb"), base["memory"].get("rssPeakMb"), tolerance, 0):
+            regressions.append(
+                f"{label} peak RSS {base['memory']['rssPeakMb']} -> {run['memory']['rssPeakMb']} MB"
+            )
+        for route, stats in run["routes"].items():
+            before = base["routes"].get(route)
+            if before is None:
+                continue
+            for metric in ("p50", "p95", "p99"):
+                if _slower(stats[metric], before[metric], tolerance, min_delta_ms):
+                    regressions.append(f"{label} {route} {metric} {before[metric]:.1f} -> {stats[metric]:.1f} ms")
+            if stats["queries"] is not None and before["queries"] is not None \
+                    and stats["queries"] >= before["queries"] + 0.5:
+                regressions.append(f"{label} {route} queries/request {before['queries']} -> {stats['queries']}")
+            error_rate = stats["errors"] / max(stats["requests"], 1)
+            base_error_rate = before["errors"] / max(before["requests"], 1)
+            if error_rate > base_error_rate + 0.01:
+                regressions.append(f"{label} {route} error rate {base_error_rate:.1%} -> {error_rate:.1%}")
+    return regressions
+
+
+def format_run(run: dict) -> str:
+    lines = [
+        f"concurrency={run['concurrency']} requests={run['requests']} "
+        f"throughput={run['throughput']:.1f} req/s errors={run['errors']} "
+        f"peak RSS={run['memory'].get('rssPeakMb')} MB",
+        f"    {'route':<58} {'n':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6}",
+    ]
+
+    def ms(value):
+        return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+    for route, stats in run["routes"].items():
+        queries = f"{stats['queries']:6.1f}" if stats["queries"] is not None else f"{'-':>6}"
+        lines.append(
+            f"    {route:<58} {stats['requests']:>7} {stats['errors']:>5} "
+            f"{ms(stats['p50'])} {ms(stats['p95'])} {ms(stats['p99'])} {queries}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,326 @@
+"""
+What a simulated client does: weighted scenarios over every /api/v1 route.
+
+Each scenario is one user action, which may take several requests (creating
+an order, shipping it, invoicing it and paying the invoice). Weights are
+given per mix; a scenario without a weight for the selected mix never runs.
+Ids come from a sample of the seeded database taken before the run.
+"""
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from benchmarks.api.client import AsgiClient
+
+API = "/api/v1"
+
+# Routes no scenario drives, with the reason
+EXCLUDED_ROUTES = {
+    f"GET {API}/events": "server-sent events stream; it stays open until the client leaves",
+}
+
+TAX_RATES = (0.0, 0.05, 0.12, 0.2)
+
+
+@dataclass
+class Fixtures:
+    customers: List[Tuple[int, str]]
+    products: List[Tuple[int, str, float]]
+    sales_persons: List[int]
+    orders: List[int]
+    invoices: List[int]
+    first_day: date
+    last_day: date
+
+
+FIXTURE_SQL = {
+    "customers": "SELECT id, name FROM customers ORDER BY random() LIMIT 1000",
+    "products": "SELECT id, name, COALESCE(selling_price, cost_price) FROM products ORDER BY random() LIMIT 1000",
+    "sales_persons": "SELECT id FROM sales_persons",
+    "orders": "SELECT id FROM sales_orders WHERE deleted_at IS NULL ORDER BY random() LIMIT 5000",
+    "invoices": "SELECT id FROM invoices ORDER BY random() LIMIT 5000",
+    "days": "SELECT min(date), max(date) FROM sales_orders WHERE deleted_at IS NULL",
+}
+
+
+async def load_fixtures(engine: AsyncEngine) -> Fixtures:
+    async with engine.connect() as conn:
+        rows = {name: (await conn.execute(text(sql))).all() for name, sql in FIXTURE_SQL.items()}
+    first_day, last_day = rows["days"][0]
+    if not rows["orders"] or not rows["products"] or not rows["customers"]:
+        raise SystemExit("the database has no orders; seed it first: python -m app.seed --orders 100000")
+    return Fixtures(
+        customers=[tuple(row) for row in rows["customers"]],
+        products=[(row[0], row[1], float(row[2])) for row in rows["products"]],
+        sales_persons=[row[0] for row in rows["sales_persons"]],
+        orders=[row[0] for row in rows["orders"]],
+        invoices=[row[0] for row in rows["invoices"]],
+        first_day=first_day,
+        last_day=last_day,
+    )
+
+
+class Visitor:
+    """One simulated client: its own random stream and the shared fixtures"""
+
+    def __init__(self, client: AsgiClient, fixtures: Fixtures, rng: random.Random):
+        self.client = client
+        self.fixtures = fixtures
+        self.rng = rng
+
+    def day(self) -> date:
+        span = (self.fixtures.last_day - self.fixtures.first_day).days
+        return self.fixtures.first_day + timedelta(days=self.rng.randint(0, max(span, 0)))
+
+    def window(self, days: int) -> Dict[str, str]:
+        start = self.day()
+        return {"from": start.isoformat(), "to": (start + timedelta(days=days - 1)).isoformat()}
+
+    def word(self, names: List[str]) -> str:
+        return self.rng.choice(names).split()[0][:12]
+
+    async def create_order(self, lines: Optional[int] = None) -> Optional[dict]:
+        products = self.rng.sample(self.fixtures.products, lines or self.rng.randint(1, 4))
+        response = await self.client.post(f"{API}/sales-orders", json_body={
+            "customer_id": self.rng.choice(self.fixtures.customers)[0],
+            "sales_person_id": self.rng.choice(self.fixtures.sales_persons),
+            "date": date.today().isoformat(),
+            "notes": "benchmark",
+            "items": [
+                {"product_id": product_id, "quantity": self.rng.randint(1, 5), "price": price,
+                 "tax_rate": self.rng.choice(TAX_RATES)}
+                for product_id, _name, price in products
+            ],
+        })
+        return response.json() if response.ok else None
+
+
+Scenario = Callable[[Visitor], Awaitable[None]]
+
+# name -> (scenario, weight per mix)
+SCENARIOS: Dict[str, Tuple[Scenario, Dict[str, float]]] = {}
+
+MIXES = ("default", "read", "write")
+
+
+def scenario(**weights: float):
+    def register(fn: Scenario) -> Scenario:
+        SCENARIOS[fn.__name__] = (fn, weights)
+        return fn
+    return register
+
+
+def pick_scenarios(mix: str, only: Optional[List[str]] = None) -> Tuple[List[Scenario], List[float]]:
+    chosen = [
+        (fn, weights[mix]) for name, (fn, weights) in SCENARIOS.items()
+        if weights.get(mix) and (not only or name in only)
+    ]
+    if not chosen:
+        raise SystemExit(f"no scenarios for mix {mix!r}")
+    return [fn for fn, _ in chosen], [weight for _, weight in chosen]
+
+
+# --- sales orders ---------------------------------------------------------
+
+@scenario(default=10, read=12)
+async def list_orders_week(v: Visitor) -> None:
+    await v.client.get(f"{API}/sales-orders", params=v.window(7))
+
+
+@scenario(default=3, read=4)
+async def list_orders_week_lean(v: Visitor) -> None:
+    await v.client.get(f"{API}/sales-orders", params={**v.window(7), "include": ""})
+
+
+@scenario(default=15, read=18)
+async def order_detail(v: Visitor) -> None:
+    await v.client.get(f"{API}/sales-orders/{{order_id}}", path_params={"order_id": v.rng.choice(v.fixtures.orders)})
+
+
+@scenario(default=3, read=3)
+async def order_quantities(v: Visitor) -> None:
+    order_id = v.rng.choice(v.fixtures.orders)
+    await v.client.get(f"{API}/sales-orders/{{order_id}}/shipped-quantities", path_params={"order_id": order_id})
+    await v.client.get(f"{API}/sales-orders/{{order_id}}/invoiced-quantities", path_params={"order_id": order_id})
+
+
+@scenario(default=8, write=10)
+async def order_to_cash(v: Visitor) -> None:
+    """Create an order, ship it, invoice it and pay the invoice"""
+    order = await v.create_order()
+    if order is None:
+        return
+    lines = [{"soItemId": item["id"], "quantity": item["quantity"]} for item in order.get("items") or []]
+    today = date.today().isoformat()
+    shipped = await v.client.post(f"{API}/shipments", json_body={
+        "salesOrderId": order["id"], "date": today, "carrier": v.rng.choice(("UPS", "DHL")),
+        "tracker": uuid.uuid4().hex[:12], "items": lines,
+    })
+    if not shipped.ok:
+        return
+    invoiced = await v.client.post(f"{API}/invoices", json_body={
+        "salesOrderId": order["id"], "date": today,
+        "dueDate": (date.today() + timedelta(days=30)).isoformat(), "notes": None, "items": lines,
+    })
+    if not invoiced.ok:
+        return
+    invoice = invoiced.json()
+    await v.client.post(f"{API}/invoices/{{invoice_id}}/payments", path_params={"invoice_id": invoice["id"]}, json_body={
+        "date": today, "amount": invoice["total"], "method": "card", "reference": uuid.uuid4().hex[:12],
+    })
+
+
+@scenario(default=1, write=2)
+async def create_and_delete_order(v: Visitor) -> None:
+    order = await v.create_order()
+    if order is not None:
+        await v.client.delete(f"{API}/sales-orders/{{order_id}}", path_params={"order_id": order["id"]})
+
+
+@scenario(default=0.5, write=1)
+async def bulk_delete_orders(v: Visitor) -> None:
+    orders = [await v.create_order(lines=1) for _ in range(3)]
+    ids = [order["id"] for order in orders if order is not None]
+    if ids:
+        await v.client.post(f"{API}/sales-orders/bulk-delete", json_body={"ids": ids})
+
+
+# --- invoices -------------------------------------------------------------
+
+@scenario(default=6, read=8)
+async def list_invoices_week(v: Visitor) -> None:
+    await v.client.get(f"{API}/invoices", params=v.window(7))
+
+
+@scenario(default=8, read=10)
+async def invoice_detail(v: Visitor) -> None:
+    if v.fixtures.invoices:
+        await v.client.get(f"{API}/invoices/{{invoice_id}}", path_params={"invoice_id": v.rng.choice(v.fixtures.invoices)})
+
+
+# --- customers ------------------------------------------------------------
+
+@scenario(default=0.5, read=0.5)
+async def list_customers(v: Visitor) -> None:
+    await v.client.get(f"{API}/customers")
+
+
+@scenario(default=6, read=8)
+async def search_customers(v: Visitor) -> None:
+    names = [name for _id, name in v.fixtures.customers]
+    await v.client.get(f"{API}/customers/search", params={"q": v.word(names)})
+
+
+@scenario(default=4, read=5)
+async def customer_statement(v: Visitor) -> None:
+    customer_id = v.rng.choice(v.fixtures.customers)[0]
+    await v.client.get(f"{API}/customers/{{customer_id}}/statement", path_params={"customer_id": customer_id})
+
+
+@scenario(default=1, write=2)
+async def create_customer(v: Visitor) -> None:
+    key = uuid.uuid4().hex[:12]
+    await v.client.post(f"{API}/customers", json_body={
+        "name": f"Bench Customer {key}", "email": f"bench.{key}@example.com", "phone": f"+1-555-{key[:7]}",
+    })
+
+
+@scenario(default=0.3, write=1)
+async def import_customers(v: Visitor) -> None:
+    batch = uuid.uuid4().hex[:8]
+    rows = [
+        {"name": f"Bench Import {batch} {i}", "email": f"bench.import.{batch}.{i}@example.com"}
+        for i in range(50)
+    ]
+    await v.client.post(
+        f"{API}/customers/import", content="\n".join(json.dumps(row) for row in rows).encode(),
+        content_type="application/x-ndjson",
+    )
+
+
+# --- products and sales persons ------------------------------------------
+
+@scenario(default=0.5, read=0.5)
+async def list_products(v: Visitor) -> None:
+    await v.client.get(f"{API}/products")
+
+
+@scenario(default=6, read=8)
+async def search_products(v: Visitor) -> None:
+    names = [name for _id, name, _price in v.fixtures.products]
+    await v.client.get(f"{API}/products/search", params={"q": v.word(names)})
+
+
+@scenario(default=6, read=6)
+async def product_availability(v: Visitor) -> None:
+    product_id = v.rng.choice(v.fixtures.products)[0]
+    await v.client.get(f"{API}/products/{{product_id}}/availability", path_params={"product_id": product_id})
+
+
+@scenario(default=0.3, write=1)
+async def import_products(v: Visitor) -> None:
+    batch = uuid.uuid4().hex[:8]
+    rows = [
+        {"sku": f"BENCH-{batch}-{i}", "name": f"Bench product {i}", "cost_price": "9.50",
+         "selling_price": "14.00", "quantity": 100}
+        for i in range(50)
+    ]
+    await v.client.post(
+        f"{API}/products/import", content="\n".join(json.dumps(row) for row in rows).encode(),
+        content_type="application/x-ndjson",
+    )
+
+
+@scenario(default=1, read=1)
+async def list_sales_persons(v: Visitor) -> None:
+    await v.client.get(f"{API}/salespersons")
+
+
+@scenario(default=2, read=3)
+async def sales_person_leaderboard(v: Visitor) -> None:
+    await v.client.get(f"{API}/salespersons/leaderboard", params=v.window(30))
+
+
+# --- reporting and sync ---------------------------------------------------
+
+@scenario(default=2, read=3)
+async def sales_report(v: Visitor) -> None:
+    group_by = v.rng.choice(("month", "customer", "sales_person", "product", "category"))
+    await v.client.get(f"{API}/reports/sales", params={"group_by": group_by, **v.window(90)})
+
+
+@scenario(default=1, read=1)
+async def sync_two_pages(v: Visitor) -> None:
+    first = await v.client.get(f"{API}/sync", params={"limit": 500})
+    if first.ok and first.json()["hasMore"]:
+        await v.client.get(f"{API}/sync", params={"limit": 500, "since": first.json()["cursor"]})
+
+
+# Route templates each scenario requests, for the coverage check
+ROUTES = {
+    f"GET {API}/sales-orders", f"POST {API}/sales-orders", f"GET {API}/sales-orders/{{order_id}}",
+    f"DELETE {API}/sales-orders/{{order_id}}", f"POST {API}/sales-orders/bulk-delete",
+    f"GET {API}/sales-orders/{{order_id}}/shipped-quantities",
+    f"GET {API}/sales-orders/{{order_id}}/invoiced-quantities",
+    f"POST {API}/shipments", f"GET {API}/invoices", f"POST {API}/invoices",
+    f"GET {API}/invoices/{{invoice_id}}", f"POST {API}/invoices/{{invoice_id}}/payments",
+    f"GET {API}/customers", f"POST {API}/customers", f"GET {API}/customers/search",
+    f"POST {API}/customers/import", f"GET {API}/customers/{{customer_id}}/statement",
+    f"GET {API}/products", f"GET {API}/products/search", f"GET {API}/products/{{product_id}}/availability",
+    f"POST {API}/products/import", f"GET {API}/salespersons", f"GET {API}/salespersons/leaderboard",
+    f"GET {API}/reports/sales", f"GET {API}/sync",
+}
+
+
+def uncovered_routes(app) -> List[str]:
+    """/api/v1 operations in the app's OpenAPI schema that nothing here requests"""
+    operations = {
+        f"{method.upper()} {path}"
+        for path, methods in app.openapi()["paths"].items() if path.startswith(API)
+        for method in methods
+    }
+    return sorted(operations - ROUTES - set(EXCLUDED_ROUTES))
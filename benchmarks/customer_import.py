@@ -0,0 +1,61 @@
+"""
+Benchmark the bulk customer upsert at CRM-export scale.
+
+    python -m benchmarks.customer_import --rows 100000 --runs 2
+
+The first run mostly inserts; later runs exercise the update/unchanged paths
+because the same emails are regenerated with a few fields changed. A share
+of rows has no email so the configured match key is exercised too.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from app.db import AsyncSessionLocal, engine
+from app.services.customer_import import import_customers
+
+
+async def ndjson_chunks(rows: int, run: int, no_email_ratio: float, chunk_rows: int = 2000):
+    rng = random.Random(run)
+    buffer = []
+    for i in range(rows):
+        row = {
+            "name": f"Bench Customer {i}",
+            "contact_person": f"Contact {i % 977}",
+            "phone": f"+1-555-{i:07d}",
+            "address": f"{rng.randint(1, 9999)} Bench Street" if rng.random() < 0.2 else f"{i} Bench Street",
+        }
+        if rng.random() >= no_email_ratio:
+            row["email"] = f"bench.customer.{i}@example.com"
+        buffer.append(json.dumps(row))
+        if len(buffer) == chunk_rows:
+            yield ("\n".join(buffer) + "\n").encode()
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--match-on", choices=["name", "phone", "none"], default="phone")
+    parser.add_argument("--no-email-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    for run in range(1, args.runs + 1):
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                summary, report = await import_customers(
+                    session, ndjson_chunks(args.rows, run, args.no_email_ratio), "ndjson", args.match_on
+                )
+        elapsed = time.perf_counter() - started
+        print(f"run={run} rows={len(report)} seconds={elapsed:.2f} rows/s={len(report) / elapsed:,.0f} {summary}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Check that date-bounded queries on the partitioned sales tables prune.
+
+    python -m benchmarks.partition_pruning --from 2026-01-01 --to 2026-12-31
+
+Prints the EXPLAIN ANALYZE plan and timing of the "this period" order list
+query (orders plus their items) and lists the partitions it touched. Run it
+against a database seeded with a few million orders spread over several years.
+"""
+import argparse
+import asyncio
+import re
+from datetime import date
+from sqlalchemy import text
+from app.db import engine
+
+QUERY = """
+    SELECT so.id, so.date, sum(si.quantity * si.price) AS subtotal
+    FROM sales_orders so
+    JOIN so_items si ON si.sales_order_id = so.id AND si.order_date = so.date
+    WHERE so.date BETWEEN :start AND :end
+    GROUP BY so.id, so.date
+"""
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=date(date.today().year, 1, 1))
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=date(date.today().year, 12, 31))
+    args = parser.parse_args()
+
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS) {QUERY}"), {"start": args.start, "end": args.end}
+        )
+        plan = [row[0] for row in result.all()]
+    await engine.dispose()
+
+    print("\n".join(plan))
+    scanned = sorted({m for line in plan for m in re.findall(r"on ((?:sales_orders|so_items)_\w+)", line)})
+    print(f"\npartitions scanned: {', '.join(scanned)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Seed a large product catalog and measure /products/search query latency.
+
+    python -m benchmarks.product_search --products 1000000 --queries 2000
+
+Seeding uses a single INSERT ... SELECT generate_series, so it runs entirely
+inside Postgres. Use --skip-seed to re-run against an existing catalog.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from sqlalchemy import text
+from app.db import engine
+from app.services.product_search import build_product_search_query
+
+WORDS = [
+    "steel", "bolt", "washer", "copper", "pipe", "valve", "cable", "switch",
+    "bracket", "hinge", "panel", "sensor", "relay", "filter", "pump", "gasket",
+]
+
+SEED_SQL = text("""
+    INSERT INTO products (name, sku, description, quantity, reserved_quantity, cost_price, selling_price)
+    SELECT
+        initcap((CAST(:words AS text[]))[1 + (g % 16)] || ' ' || (CAST(:words AS text[]))[1 + ((g / 16) % 16)]) || ' ' || g,
+        'BENCH-' || lpad(g::text, 8, '0'),
+        'Industrial ' || (CAST(:words AS text[]))[1 + ((g / 7) % 16)] || ' for ' || (CAST(:words AS text[]))[1 + ((g / 3) % 16)] || ' assemblies',
+        (g % 500),
+        0,
+        round((random() * 100)::numeric, 2),
+        round((random() * 150)::numeric, 2)
+    FROM generate_series(:start, :stop) AS g
+    ON CONFLICT (sku) DO NOTHING
+""")
+
+
+def random_term() -> str:
+    kind = random.random()
+    if kind < 0.1:
+        # Typeahead's first keystrokes take the prefix path
+        return random.choice(WORDS)[: random.randint(1, 2)]
+    if kind < 0.4:
+        return random.choice(WORDS)[: random.randint(3, 6)]
+    if kind < 0.7:
+        return f"BENCH-{random.randint(0, 9999):04d}"
+    return f"{random.choice(WORDS)} {random.choice(WORDS)}"
+
+
+async def seed(products: int, batch: int) -> None:
+    async with engine.begin() as conn:
+        for start in range(1, products + 1, batch):
+            stop = min(start + batch - 1, products)
+            await conn.execute(SEED_SQL, {"words": WORDS, "start": start, "stop": stop})
+            print(f"seeded {stop}/{products}")
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE products"))
+
+
+async def measure(queries: int, limit: int) -> list[float]:
+    timings = []
+    async with engine.connect() as conn:
+        # Warm the connection and plan cache before measuring
+        for _ in range(20):
+            await conn.execute(build_product_search_query(random_term(), limit))
+        for _ in range(queries):
+            stmt = build_product_search_query(random_term(), limit)
+            started = time.perf_counter()
+            result = await conn.execute(stmt)
+            result.all()
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        await seed(args.products, args.batch)
+
+    timings = sorted(await measure(args.queries, args.limit))
+    p50 = statistics.median(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"queries={len(timings)} p50={p50:.2f}ms p99={p99:.2f}ms max={timings[-1]:.2f}ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -19,6 +19,11 @@ from app.models.quotations import Quotation, QOItem
 from app.models.purchase_orders import PurchaseOrder, POItem, PurchaseReceipt, ReceiptItem
 from app.models.suppliers import Supplier
 from app.models.users import User
+from app.models.sales_rollups import SalesRollupDaily, SalesPersonCounter
+from app.models.sync import SyncTombstone
+from app.models.outbox import OutboxEvent
+from app.models.audit import AuditLog
+from app.models.document_numbers import DocumentNumber, DocumentNumberCounter
 
 
 
@@ -28,7 +33,7 @@ config = context.config
 
 # load settings from our app
 settings = get_settings()
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+config.set_main_option("sqlalchemy.url", settings.DIRECT_DATABASE_URL)
 
 # Interpret the config file for Python logging.
 fileConfig(config.config_file_name)
@@ -38,7 +43,7 @@ target_metadata = Base.metadata
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
     context.configure(
-        url=settings.DATABASE_URL,
+        url=settings.DIRECT_DATABASE_URL,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
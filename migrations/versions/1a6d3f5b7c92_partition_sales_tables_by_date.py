@@ -0,0 +1,178 @@
+"""partition sales_orders, so_items and invoices by date
+
+Converts the three largest tables to declarative RANGE partitioning with one
+partition per year (plus a DEFAULT partition as a safety net). Partitions for
+later periods are created ahead of time by ``python -m app.services.partitions``.
+
+Postgres requires the partition key in every unique constraint, so:
+
+* primary keys become (id, date) / (id, order_date); ids still come from the
+  original sequences and stay unique in practice;
+* order_number / invoice_number are unique per date rather than globally;
+* so_items gets an order_date column copied from its order and references
+  sales_orders through a composite (sales_order_id, order_date) foreign key;
+* foreign keys *into* sales_orders, so_items and invoices from tables that do
+  not carry the parent's date (shipments, invoice_items, payments,
+  shipment_items, invoices.sales_order_id) are dropped; the application keeps
+  those references consistent.
+
+Revision ID: 1a6d3f5b7c92
+Revises: f4c1a9e7d203
+Create Date: 2026-10-18 17:40:12.935518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a6d3f5b7c92'
+down_revision: Union[str, Sequence[str], None] = 'f4c1a9e7d203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Foreign keys pointing into the tables being partitioned
+INBOUND_FKS = [
+    ('so_items', 'so_items_sales_order_id_fkey', 'sales_order_id', 'sales_orders'),
+    ('shipments', 'shipments_sales_order_id_fkey', 'sales_order_id', 'sales_orders'),
+    ('invoices', 'invoices_sales_order_id_fkey', 'sales_order_id', 'sales_orders'),
+    ('invoice_items', 'invoice_items_invoice_id_fkey', 'invoice_id', 'invoices'),
+    ('invoice_items', 'invoice_items_so_item_id_fkey', 'so_item_id', 'so_items'),
+    ('payments', 'payments_invoice_id_fkey', 'invoice_id', 'invoices'),
+    ('shipment_items', 'shipment_items_so_item_id_fkey', 'so_item_id', 'so_items'),
+]
+
+# table -> (partition key, outbound FKs as (column, referenced table))
+TABLES = {
+    'sales_orders': ('date', [
+        ('customer_id', 'customers'),
+        ('quotation_id', 'quotations'),
+        ('sales_person_id', 'sales_persons'),
+    ]),
+    'so_items': ('order_date', [('product_id', 'products')]),
+    'invoices': ('date', [
+        ('customer_id', 'customers'),
+        ('sales_person_id', 'sales_persons'),
+    ]),
+}
+
+# table -> (index name, columns) recreated on the new table
+INDEXES = {
+    'sales_orders': [
+        ('ix_sales_orders_id', 'id'),
+        ('ix_sales_orders_customer_id_date', 'customer_id, date, id'),
+    ],
+    'so_items': [
+        ('ix_so_items_id', 'id'),
+        ('ix_so_items_sales_order_id', 'sales_order_id'),
+    ],
+    'invoices': [
+        ('ix_invoices_id', 'id'),
+        ('ix_invoices_customer_id_date', 'customer_id, date, id'),
+    ],
+}
+
+UNIQUES = {
+    'sales_orders': ('sales_orders_order_number_date_key', 'order_number, date'),
+    'invoices': ('invoices_invoice_number_date_key', 'invoice_number, date'),
+}
+
+
+def _partition(table: str, key: str) -> None:
+    """Swap ``table`` for a yearly RANGE-partitioned copy holding the same rows"""
+    legacy = f'{table}_legacy'
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    op.execute(
+        f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) '
+        f'PARTITION BY RANGE ({key})'
+    )
+    # Keep the id sequence alive when the legacy table is dropped
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    op.execute(f"""
+        DO $$
+        DECLARE y int;
+        BEGIN
+            FOR y IN
+                SELECT generate_series(
+                    COALESCE(EXTRACT(year FROM min({key}))::int, EXTRACT(year FROM now())::int),
+                    EXTRACT(year FROM now())::int + 2
+                )
+                FROM {legacy}
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE {table}_y%s PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    y, make_date(y, 1, 1), make_date(y + 1, 1, 1)
+                );
+            END LOOP;
+        END $$
+    """)
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+    op.execute(f'DROP TABLE {legacy}')
+
+
+def _add_constraints(table: str, key: str, fks) -> None:
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})')
+    if table in UNIQUES:
+        name, columns = UNIQUES[table]
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({columns})')
+    for name, columns in INDEXES[table]:
+        op.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+    for column, referenced in fks:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, referenced, [column], ['id'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, name, _, _ in INBOUND_FKS:
+        op.drop_constraint(name, table, type_='foreignkey')
+
+    op.add_column('so_items', sa.Column('order_date', sa.Date(), nullable=True))
+    op.execute("""
+        UPDATE so_items si
+        SET order_date = so.date
+        FROM sales_orders so
+        WHERE so.id = si.sales_order_id
+    """)
+    op.alter_column('so_items', 'order_date', nullable=False)
+
+    for table, (key, fks) in TABLES.items():
+        _partition(table, key)
+        _add_constraints(table, key, fks)
+
+    op.create_foreign_key(
+        'so_items_sales_order_id_order_date_fkey', 'so_items', 'sales_orders',
+        ['sales_order_id', 'order_date'], ['id', 'date'], ondelete='CASCADE',
+    )
+
+
+def _unpartition(table: str) -> None:
+    partitioned = f'{table}_partitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {partitioned}')
+    op.execute(f'CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS)')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {partitioned}')
+    op.execute(f'DROP TABLE {partitioned} CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(list(TABLES)):
+        _unpartition(table)
+
+    for table, (_, fks) in TABLES.items():
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+        for name, columns in INDEXES[table]:
+            op.execute(f'CREATE INDEX {name} ON {table} ({columns})')
+        for column, referenced in fks:
+            op.create_foreign_key(f'{table}_{column}_fkey', table, referenced, [column], ['id'])
+
+    op.create_unique_constraint('sales_orders_order_number_key', 'sales_orders', ['order_number'])
+    op.create_unique_constraint('invoices_invoice_number_key', 'invoices', ['invoice_number'])
+
+    for table, name, column, referenced in INBOUND_FKS:
+        op.create_foreign_key(name, table, referenced, [column], ['id'])
+
+    op.drop_column('so_items', 'order_date')
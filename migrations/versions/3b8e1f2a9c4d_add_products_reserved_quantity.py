@@ -0,0 +1,45 @@
+"""add products reserved_quantity
+
+Revision ID: 3b8e1f2a9c4d
+Revises: ecfb4727e15e
+Create Date: 2026-10-18 09:12:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1f2a9c4d'
+down_revision: Union[str, Sequence[str], None] = 'ecfb4727e15e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('reserved_quantity', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill reservations from open (not fully shipped) sales order lines
+    op.execute("""
+        UPDATE products p
+        SET reserved_quantity = r.qty
+        FROM (
+            SELECT si.product_id, SUM(GREATEST(si.quantity - COALESCE(sh.shipped, 0), 0)) AS qty
+            FROM so_items si
+            LEFT JOIN (
+                SELECT so_item_id, SUM(quantity_shipped) AS shipped
+                FROM shipment_items
+                GROUP BY so_item_id
+            ) sh ON sh.so_item_id = si.id
+            GROUP BY si.product_id
+        ) r
+        WHERE p.id = r.product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'reserved_quantity')
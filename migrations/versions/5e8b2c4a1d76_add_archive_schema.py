@@ -0,0 +1,67 @@
+"""add archive schema for closed sales orders
+
+Creates an ``archive`` schema holding plain (unpartitioned) copies of the
+sales document tables. ``python -m app.services.archive`` moves closed orders
+and everything hanging off them there in batches.
+
+Also indexes the parent references used to collect an order's documents.
+
+Revision ID: 5e8b2c4a1d76
+Revises: 1a6d3f5b7c92
+Create Date: 2026-10-18 18:55:03.214870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b2c4a1d76'
+down_revision: Union[str, Sequence[str], None] = '1a6d3f5b7c92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> lookup columns indexed in the archive
+ARCHIVE_TABLES = {
+    'sales_orders': ['customer_id'],
+    'so_items': ['sales_order_id'],
+    'shipments': ['sales_order_id'],
+    'shipment_items': ['shipment_id', 'so_item_id'],
+    'invoices': ['sales_order_id', 'customer_id'],
+    'invoice_items': ['invoice_id'],
+    'payments': ['invoice_id'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_invoices_sales_order_id'), 'invoices', ['sales_order_id'], unique=False)
+    op.create_index(op.f('ix_payments_invoice_id'), 'payments', ['invoice_id'], unique=False)
+    op.create_index(op.f('ix_shipments_sales_order_id'), 'shipments', ['sales_order_id'], unique=False)
+    op.create_index(op.f('ix_shipment_items_shipment_id'), 'shipment_items', ['shipment_id'], unique=False)
+
+    op.execute('CREATE SCHEMA IF NOT EXISTS archive')
+    for table, columns in ARCHIVE_TABLES.items():
+        # Column copies only: ids keep their original values and nothing
+        # references the archive, so no defaults or foreign keys are needed
+        op.execute(f'CREATE TABLE archive.{table} (LIKE public.{table})')
+        op.create_primary_key(f'{table}_pkey', table, ['id'], schema='archive')
+        for column in columns:
+            op.create_index(f'ix_{table}_{column}', table, [column], unique=False, schema='archive')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Parents first so the so_items -> sales_orders foreign key holds
+    for table in ARCHIVE_TABLES:
+        op.execute(f'INSERT INTO public.{table} SELECT * FROM archive.{table}')
+    for table in reversed(list(ARCHIVE_TABLES)):
+        op.drop_table(table, schema='archive')
+    op.execute('DROP SCHEMA IF EXISTS archive')
+
+    op.drop_index(op.f('ix_shipment_items_shipment_id'), table_name='shipment_items')
+    op.drop_index(op.f('ix_shipments_sales_order_id'), table_name='shipments')
+    op.drop_index(op.f('ix_payments_invoice_id'), table_name='payments')
+    op.drop_index(op.f('ix_invoices_sales_order_id'), table_name='invoices')
@@ -0,0 +1,43 @@
+"""add product search indexes
+
+Revision ID: 7c2d4e6f8a10
+Revises: 3b8e1f2a9c4d
+Create Date: 2026-10-18 10:04:52.918344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d4e6f8a10'
+down_revision: Union[str, Sequence[str], None] = '3b8e1f2a9c4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_products_name_trgm', 'products', ['name'],
+        unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_products_sku_trgm', 'products', ['sku'],
+        unique=False, postgresql_using='gin', postgresql_ops={'sku': 'gin_trgm_ops'},
+    )
+    # Expression must stay in sync with app.services.product_search.DESCRIPTION_TSV
+    op.execute(
+        "CREATE INDEX ix_products_description_tsv ON products "
+        "USING gin (to_tsvector('english'::regconfig, COALESCE(description, '')))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_description_tsv', table_name='products')
+    op.drop_index('ix_products_sku_trgm', table_name='products')
+    op.drop_index('ix_products_name_trgm', table_name='products')
@@ -0,0 +1,40 @@
+"""add soft delete to sales orders and cascade shipment items
+
+Revision ID: 8d3f6a2b9e41
+Revises: 5e8b2c4a1d76
+Create Date: 2026-10-18 19:32:47.508112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f6a2b9e41'
+down_revision: Union[str, Sequence[str], None] = '5e8b2c4a1d76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sales_orders', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_sales_orders_deleted_at', 'sales_orders', ['deleted_at'], unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+    op.drop_constraint('shipment_items_shipment_id_fkey', 'shipment_items', type_='foreignkey')
+    op.create_foreign_key(
+        'shipment_items_shipment_id_fkey', 'shipment_items', 'shipments',
+        ['shipment_id'], ['id'], ondelete='CASCADE',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('shipment_items_shipment_id_fkey', 'shipment_items', type_='foreignkey')
+    op.create_foreign_key('shipment_items_shipment_id_fkey', 'shipment_items', 'shipments', ['shipment_id'], ['id'])
+    op.drop_index('ix_sales_orders_deleted_at', table_name='sales_orders')
+    op.drop_column('sales_orders', 'deleted_at')
@@ -0,0 +1,33 @@
+"""add deleted_at to the archived sales orders
+
+The soft-delete column was added to ``public.sales_orders`` after the archive
+tables were created, so archived orders silently lost it. The archive move now
+refuses to run while any archive table differs from its hot twin.
+
+Revision ID: 9f2d7b4e6a13
+Revises: e8c5a3f7b261
+Create Date: 2026-10-18 23:10:41.502318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2d7b4e6a13'
+down_revision: Union[str, Sequence[str], None] = 'e8c5a3f7b261'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only live orders are archived, so existing archived rows are correctly NULL
+    op.add_column('sales_orders', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True), schema='archive')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sales_orders', 'deleted_at', schema='archive')
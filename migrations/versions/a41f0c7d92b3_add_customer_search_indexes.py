@@ -0,0 +1,34 @@
+"""add customer search indexes
+
+Revision ID: a41f0c7d92b3
+Revises: 7c2d4e6f8a10
+Create Date: 2026-10-18 11:20:07.351902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f0c7d92b3'
+down_revision: Union[str, Sequence[str], None] = '7c2d4e6f8a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm is created by 7c2d4e6f8a10
+    for column in ('name', 'contact_person', 'email'):
+        op.create_index(
+            f'ix_customers_{column}_trgm', 'customers', [column],
+            unique=False, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ('email', 'contact_person', 'name'):
+        op.drop_index(f'ix_customers_{column}_trgm', table_name='customers')
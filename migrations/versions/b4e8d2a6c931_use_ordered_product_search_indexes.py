@@ -0,0 +1,46 @@
+"""use ordered product search indexes
+
+GIN trigram indexes can filter but not order, so every match had to be
+ranked and sorted before the LIMIT. GiST trigram indexes serve ``%``, ILIKE
+and nearest-first ``<->`` scans; the byte-ordered lower() indexes serve the
+prefix path used for terms too short to have a trigram.
+
+Revision ID: b4e8d2a6c931
+Revises: 9f2d7b4e6a13
+Create Date: 2026-10-18 23:48:17.204655
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8d2a6c931'
+down_revision: Union[str, Sequence[str], None] = '9f2d7b4e6a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in ('name', 'sku'):
+        op.drop_index(f'ix_products_{column}_trgm', table_name='products')
+        op.create_index(
+            f'ix_products_{column}_trgm_gist', 'products', [column],
+            unique=False, postgresql_using='gist', postgresql_ops={column: 'gist_trgm_ops'},
+        )
+        # Expression must stay in sync with app.services.product_search.NAME_PREFIX / SKU_PREFIX
+        op.execute(f'CREATE INDEX ix_products_{column}_prefix ON products ((lower({column})) COLLATE "C")')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ('sku', 'name'):
+        op.drop_index(f'ix_products_{column}_prefix', table_name='products')
+        op.drop_index(f'ix_products_{column}_trgm_gist', table_name='products')
+        op.create_index(
+            f'ix_products_{column}_trgm', 'products', [column],
+            unique=False, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+        )
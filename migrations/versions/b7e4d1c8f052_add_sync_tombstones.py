@@ -0,0 +1,49 @@
+"""add sync tombstones and updated_at indexes
+
+Revision ID: b7e4d1c8f052
+Revises: 8d3f6a2b9e41
+Create Date: 2026-10-18 20:14:36.771940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4d1c8f052'
+down_revision: Union[str, Sequence[str], None] = '8d3f6a2b9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('sales_orders', 'invoices', 'quotations', 'purchase_orders')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('entity', sa.String(length=32), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_deleted_at', 'sync_tombstones', ['deleted_at', 'id'], unique=False)
+
+    # Orders deleted but not yet purged get their tombstones now
+    op.execute("""
+        INSERT INTO sync_tombstones (entity, entity_id, deleted_at)
+        SELECT 'sales_order', id, deleted_at FROM sales_orders WHERE deleted_at IS NOT NULL
+    """)
+
+    for table in SYNCED_TABLES:
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(SYNCED_TABLES):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+    op.drop_index('ix_sync_tombstones_deleted_at', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
@@ -0,0 +1,29 @@
+"""add customers phone index
+
+Revision ID: c58e2b1d4f67
+Revises: a41f0c7d92b3
+Create Date: 2026-10-18 12:41:15.660213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e2b1d4f67'
+down_revision: Union[str, Sequence[str], None] = 'a41f0c7d92b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Supports matching email-less rows on phone during bulk import
+    op.create_index(op.f('ix_customers_phone'), 'customers', ['phone'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_customers_phone'), table_name='customers')
@@ -0,0 +1,46 @@
+"""add so_items.category_id
+
+The category a line counted under in the sales rollups is stored with the
+line, so removing an order subtracts from the same rollup row it was added
+to even after its product moved to another category.
+
+Revision ID: c6f1e9a3d528
+Revises: b4e8d2a6c931
+Create Date: 2026-10-19 00:21:06.731940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1e9a3d528'
+down_revision: Union[str, Sequence[str], None] = 'b4e8d2a6c931'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('so_items', sa.Column('category_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('so_items_category_id_fkey', 'so_items', 'categories', ['category_id'], ['id'])
+    # Archived rows are copied column for column (app.services.archive)
+    op.add_column('so_items', sa.Column('category_id', sa.Integer(), nullable=True), schema='archive')
+
+    # The existing rollups were built from the products' current categories,
+    # so backfilling from them keeps rollups and lines consistent
+    for table in ('so_items', 'archive.so_items'):
+        op.execute(f"""
+            UPDATE {table} si SET category_id = p.category_id
+            FROM products p
+            WHERE p.id = si.product_id AND p.category_id IS NOT NULL
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('so_items', 'category_id', schema='archive')
+    op.drop_constraint('so_items_category_id_fkey', 'so_items', type_='foreignkey')
+    op.drop_column('so_items', 'category_id')
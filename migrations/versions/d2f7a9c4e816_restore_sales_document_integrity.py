@@ -0,0 +1,193 @@
+"""restore sales document integrity across the partitioned tables
+
+Partitioning (1a6d3f5b7c92) left order and invoice numbers unique only per
+date and dropped every foreign key into sales_orders, so_items and invoices.
+
+* document_numbers holds every order and invoice number in use with its
+  document's id and date; row triggers on sales_orders and invoices keep it in
+  step, its primary key rejects a number already taken on any date, and
+  lookups by id read the date from it to reach a single partition;
+* document_number_counters hands out the next number per prefix and year
+  (app.services.document_numbers), replacing the unlocked max + 1 lookups;
+* the children carry their parent's date (shipments, invoices and
+  shipment_items the order's, invoice_items both, payments the invoice's) and
+  reference the partitioned parents through composite foreign keys, with
+  an index on the two keys into so_items, which nothing covered before.
+
+Existing duplicates and orphaned children make the upgrade fail with a list of
+them instead of being resolved silently.
+
+Revision ID: d2f7a9c4e816
+Revises: c6f1e9a3d528
+Create Date: 2026-10-19 02:14:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f7a9c4e816'
+down_revision: Union[str, Sequence[str], None] = 'c6f1e9a3d528'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (number column, entity) registered in document_numbers
+NUMBERED = {
+    'sales_orders': ('order_number', 'sales_order'),
+    'invoices': ('invoice_number', 'invoice'),
+}
+
+# (table, new date column, nullable, key column, parent, parent date column)
+PARENT_DATES = [
+    ('shipments', 'order_date', False, 'sales_order_id', 'sales_orders', 'date'),
+    ('invoices', 'order_date', True, 'sales_order_id', 'sales_orders', 'date'),
+    ('invoice_items', 'invoice_date', False, 'invoice_id', 'invoices', 'date'),
+    ('invoice_items', 'order_date', False, 'so_item_id', 'so_items', 'order_date'),
+    ('payments', 'invoice_date', False, 'invoice_id', 'invoices', 'date'),
+    ('shipment_items', 'order_date', False, 'so_item_id', 'so_items', 'order_date'),
+]
+
+
+def _fk_name(table: str, key: str, column: str) -> str:
+    return f'{table}_{key}_{column}_fkey'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        DO $$
+        DECLARE duplicates text;
+        BEGIN
+            SELECT string_agg(number, ', ') INTO duplicates
+            FROM (
+                SELECT number FROM (
+                    SELECT order_number FROM sales_orders
+                    UNION ALL SELECT invoice_number FROM invoices
+                ) AS numbers(number)
+                GROUP BY number HAVING count(*) > 1
+                ORDER BY number LIMIT 50
+            ) AS d;
+            IF duplicates IS NOT NULL THEN
+                RAISE EXCEPTION 'renumber duplicate order/invoice numbers first: %', duplicates;
+            END IF;
+        END $$
+    """)
+
+    op.create_table(
+        'document_numbers',
+        sa.Column('number', sa.String(), nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('number'),
+        sa.UniqueConstraint('entity', 'entity_id'),
+    )
+    op.create_table(
+        'document_number_counters',
+        sa.Column('prefix', sa.String(), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('prefix'),
+    )
+    op.execute("""
+        INSERT INTO document_numbers (number, entity, entity_id, date)
+        SELECT order_number, 'sales_order', id, date FROM sales_orders
+        UNION ALL SELECT invoice_number, 'invoice', id, date FROM invoices
+    """)
+    # Same as app.services.document_numbers.REBUILD_COUNTERS_SQL
+    op.execute("""
+        INSERT INTO document_number_counters (prefix, last_value)
+        SELECT substring(number FROM '^(.*)-[0-9]+$'), max(CAST(substring(number FROM '([0-9]+)$') AS integer))
+        FROM (
+            SELECT order_number FROM sales_orders
+            UNION ALL SELECT order_number FROM archive.sales_orders
+            UNION ALL SELECT invoice_number FROM invoices
+            UNION ALL SELECT invoice_number FROM archive.invoices
+        ) AS numbers(number)
+        WHERE number ~ '^(SO|INV)-[0-9]{4}-[0-9]+$'
+        GROUP BY 1
+    """)
+
+    # A number or date change, a move between partitions (delete + insert)
+    # and a purge or archive move all go through here. Arguments: the number
+    # column and the entity name.
+    op.execute("""
+        CREATE FUNCTION register_document_number() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE doc jsonb;
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM document_numbers WHERE number = to_jsonb(OLD) ->> TG_ARGV[0];
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                doc := to_jsonb(NEW);
+                INSERT INTO document_numbers (number, entity, entity_id, date)
+                VALUES (doc ->> TG_ARGV[0], TG_ARGV[1], CAST(doc ->> 'id' AS integer), CAST(doc ->> 'date' AS date));
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    for table, (column, entity) in NUMBERED.items():
+        op.execute(
+            f'CREATE TRIGGER {table}_document_number '
+            f'AFTER INSERT OR DELETE OR UPDATE OF {column}, id, date ON {table} '
+            f"FOR EACH ROW EXECUTE FUNCTION register_document_number('{column}', '{entity}')"
+        )
+        op.drop_constraint(f'{table}_{column}_date_key', table, type_='unique')
+
+    for table, column, nullable, key, parent, parent_date in PARENT_DATES:
+        op.add_column(table, sa.Column(column, sa.Date(), nullable=True))
+        # Archived rows are copied column for column (app.services.archive)
+        op.add_column(table, sa.Column(column, sa.Date(), nullable=True), schema='archive')
+        for schema in ('public', 'archive'):
+            op.execute(f"""
+                UPDATE {schema}.{table} c SET {column} = p.{parent_date}
+                FROM {schema}.{parent} p
+                WHERE p.id = c.{key}
+            """)
+        op.execute(f"""
+            DO $$
+            DECLARE orphans text;
+            BEGIN
+                SELECT string_agg(id::text, ', ') INTO orphans
+                FROM (
+                    SELECT id FROM {table}
+                    WHERE {key} IS NOT NULL AND {column} IS NULL
+                    ORDER BY id LIMIT 50
+                ) AS o;
+                IF orphans IS NOT NULL THEN
+                    RAISE EXCEPTION '{table} rows whose {key} matches no {parent} row: %', orphans;
+                END IF;
+            END $$
+        """)
+        if not nullable:
+            op.alter_column(table, column, nullable=False)
+        op.create_foreign_key(
+            _fk_name(table, key, column), table, parent,
+            [key, column], ['id', parent_date],
+        )
+
+    # The only new keys without an index: deleting order lines (purge,
+    # archive) checks them, and shipped/invoiced quantities are summed by them
+    for table in ('invoice_items', 'shipment_items'):
+        op.create_index(op.f(f'ix_{table}_so_item_id_order_date'), table, ['so_item_id', 'order_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('shipment_items', 'invoice_items'):
+        op.drop_index(op.f(f'ix_{table}_so_item_id_order_date'), table_name=table)
+    for table, column, _, key, _, _ in reversed(PARENT_DATES):
+        op.drop_constraint(_fk_name(table, key, column), table, type_='foreignkey')
+        op.drop_column(table, column)
+        op.drop_column(table, column, schema='archive')
+
+    for table, (column, _) in NUMBERED.items():
+        op.execute(f'DROP TRIGGER {table}_document_number ON {table}')
+        op.create_unique_constraint(f'{table}_{column}_date_key', table, [column, 'date'])
+    op.execute('DROP FUNCTION register_document_number()')
+
+    op.drop_table('document_number_counters')
+    op.drop_table('document_numbers')
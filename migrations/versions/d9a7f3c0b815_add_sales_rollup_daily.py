@@ -0,0 +1,59 @@
+"""add sales_rollup_daily
+
+Revision ID: d9a7f3c0b815
+Revises: c58e2b1d4f67
+Create Date: 2026-10-18 13:55:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a7f3c0b815'
+down_revision: Union[str, Sequence[str], None] = 'c58e2b1d4f67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_rollup_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('dimension_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.BigInteger(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('tax', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'dimension', 'dimension_id')
+    )
+    # Report queries filter by dimension first, then a day range
+    op.create_index('ix_sales_rollup_daily_dimension_day', 'sales_rollup_daily', ['dimension', 'day'], unique=False)
+
+    # Backfill from existing orders
+    op.execute("""
+        INSERT INTO sales_rollup_daily (day, dimension, dimension_id, order_count, quantity, revenue, tax)
+        SELECT
+            so.date, d.dimension, d.dimension_id,
+            count(DISTINCT so.id), sum(si.quantity), sum(si.quantity * si.price),
+            sum(si.quantity * si.price * si.tax_rate)
+        FROM sales_orders so
+        JOIN so_items si ON si.sales_order_id = so.id
+        JOIN products p ON p.id = si.product_id
+        CROSS JOIN LATERAL (VALUES
+            ('customer', so.customer_id),
+            ('sales_person', COALESCE(so.sales_person_id, 0)),
+            ('product', si.product_id),
+            ('category', COALESCE(p.category_id, 0))
+        ) AS d(dimension, dimension_id)
+        GROUP BY so.date, d.dimension, d.dimension_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sales_rollup_daily_dimension_day', table_name='sales_rollup_daily')
+    op.drop_table('sales_rollup_daily')
@@ -0,0 +1,72 @@
+"""add sales_person_counters
+
+Revision ID: e2b6c8d1a347
+Revises: d9a7f3c0b815
+Create Date: 2026-10-18 15:02:26.774930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c8d1a347'
+down_revision: Union[str, Sequence[str], None] = 'd9a7f3c0b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_person_counters',
+    sa.Column('grain', sa.String(length=1), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('sales_person_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('order_revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('invoiced_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('collected_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['sales_person_id'], ['sales_persons.id'], ),
+    sa.PrimaryKeyConstraint('grain', 'period_start', 'sales_person_id')
+    )
+
+    # Backfill all three grains from existing orders, invoices and payments
+    op.execute("""
+        INSERT INTO sales_person_counters
+            (grain, period_start, sales_person_id, order_count, order_revenue, invoiced_amount, collected_amount)
+        SELECT g.grain, g.period_start, d.sales_person_id,
+               sum(d.order_count), sum(d.order_revenue), sum(d.invoiced_amount), sum(d.collected_amount)
+        FROM (
+            SELECT so.date AS day, so.sales_person_id, 1 AS order_count,
+                   COALESCE(sum(si.quantity * si.price), 0) AS order_revenue,
+                   CAST(0 AS numeric) AS invoiced_amount, CAST(0 AS numeric) AS collected_amount
+            FROM sales_orders so
+            LEFT JOIN so_items si ON si.sales_order_id = so.id
+            GROUP BY so.id, so.date, so.sales_person_id
+            UNION ALL
+            SELECT inv.date, inv.sales_person_id, 0, 0,
+                   COALESCE(sum(ii.quantity_invoiced * si.price * (1 + si.tax_rate)), 0), 0
+            FROM invoices inv
+            LEFT JOIN invoice_items ii ON ii.invoice_id = inv.id
+            LEFT JOIN so_items si ON si.id = ii.so_item_id
+            GROUP BY inv.id, inv.date, inv.sales_person_id
+            UNION ALL
+            SELECT p.payment_date, inv.sales_person_id, 0, 0, 0, p.amount
+            FROM payments p
+            JOIN invoices inv ON inv.id = p.invoice_id
+        ) d
+        CROSS JOIN LATERAL (VALUES
+            ('d', d.day),
+            ('m', CAST(date_trunc('month', d.day) AS date)),
+            ('y', CAST(date_trunc('year', d.day) AS date))
+        ) AS g(grain, period_start)
+        WHERE d.sales_person_id IS NOT NULL
+        GROUP BY g.grain, g.period_start, d.sales_person_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sales_person_counters')
@@ -0,0 +1,35 @@
+"""add version columns to sales orders, invoices and purchase orders
+
+Revision ID: e8c5a3f7b261
+Revises: d6b2e9a4c150
+Create Date: 2026-10-18 22:03:18.442097
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c5a3f7b261'
+down_revision: Union[str, Sequence[str], None] = 'd6b2e9a4c150'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('sales_orders', 'invoices', 'purchase_orders'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    # Archived rows keep the version they had (see app.services.archive)
+    for table in ('sales_orders', 'invoices'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False), schema='archive')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('invoices', 'sales_orders'):
+        op.drop_column(table, 'version', schema='archive')
+    for table in ('purchase_orders', 'invoices', 'sales_orders'):
+        op.drop_column(table, 'version')
@@ -0,0 +1,49 @@
+"""add customer statement indexes
+
+Revision ID: f4c1a9e7d203
+Revises: e2b6c8d1a347
+Create Date: 2026-10-18 16:18:53.402671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c1a9e7d203'
+down_revision: Union[str, Sequence[str], None] = 'e2b6c8d1a347'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('payments', sa.Column('customer_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('payments_customer_id_fkey', 'payments', 'customers', ['customer_id'], ['id'])
+    op.execute("""
+        UPDATE payments p
+        SET customer_id = inv.customer_id
+        FROM invoices inv
+        WHERE inv.id = p.invoice_id
+    """)
+
+    # Keyset scans per customer, ordered by document date
+    op.create_index('ix_sales_orders_customer_id_date', 'sales_orders', ['customer_id', 'date', 'id'], unique=False)
+    op.create_index('ix_invoices_customer_id_date', 'invoices', ['customer_id', 'date', 'id'], unique=False)
+    op.create_index('ix_payments_customer_id_date', 'payments', ['customer_id', 'payment_date', 'id'], unique=False)
+    # Child lookups used to total each document
+    op.create_index(op.f('ix_so_items_sales_order_id'), 'so_items', ['sales_order_id'], unique=False)
+    op.create_index(op.f('ix_invoice_items_invoice_id'), 'invoice_items', ['invoice_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_invoice_items_invoice_id'), table_name='invoice_items')
+    op.drop_index(op.f('ix_so_items_sales_order_id'), table_name='so_items')
+    op.drop_index('ix_payments_customer_id_date', table_name='payments')
+    op.drop_index('ix_invoices_customer_id_date', table_name='invoices')
+    op.drop_index('ix_sales_orders_customer_id_date', table_name='sales_orders')
+    op.drop_constraint('payments_customer_id_fkey', 'payments', type_='foreignkey')
+    op.drop_column('payments', 'customer_id')
@@ -0,0 +1,52 @@
+"""
+The tests run against a real Postgres. Point TEST_DATABASE_URL at a database
+they may wipe, e.g.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost:5432/sales_test python -m pytest
+
+It is migrated to head and filled by app.seed once per session. Without
+TEST_DATABASE_URL every test is skipped.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # app.config reads these when first imported
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["DIRECT_DATABASE_URL"] = TEST_DATABASE_URL
+
+ROOT = Path(__file__).resolve().parents[1]
+SEED_ORDERS = 3000
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    for args in (
+        ["-m", "alembic", "upgrade", "head"],
+        ["-m", "app.seed", "--orders", str(SEED_ORDERS), "--years", "5", "--truncate", "--workers", "1"],
+    ):
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+
+@pytest.fixture
+def run(database):
+    """Run a coroutine to completion; pooled connections are bound to its loop, so drop them after"""
+    # Imports every model, as the server does, so relationships by name resolve
+    import app.main  # noqa: F401
+    from app.db import engine
+
+    def runner(coro):
+        async def wrapped():
+            try:
+                return await coro
+            finally:
+                await engine.dispose()
+        return asyncio.run(wrapped())
+    return runner
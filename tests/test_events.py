@@ -0,0 +1,63 @@
+import asyncio
+import json
+from app.lifecycle import lifecycle
+from app.routers import events
+from app.services.change_feed import CHANNEL, ChangeFeed
+
+INVOICE_EVENT = {"entity": "invoice", "id": 1, "salesOrderId": 2, "customerId": 3}
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def _open_stream(monkeypatch):
+    feed = ChangeFeed("postgresql://unused")
+    # No LISTEN connection; events are dispatched by hand
+    monkeypatch.setattr(feed, "_run", lambda: asyncio.sleep(3600))
+    monkeypatch.setattr(events, "change_feed", feed)
+    return feed
+
+
+async def _rest(chunks) -> list:
+    async def collect():
+        return [chunk async for chunk in chunks]
+    return await asyncio.wait_for(collect(), timeout=5)
+
+
+def test_feed_close_ends_streams_after_pending_events(monkeypatch):
+    async def scenario():
+        feed = _open_stream(monkeypatch)
+        response = await events.stream_events(_ConnectedRequest(), None, None, None)
+        chunks = response.body_iterator
+        first = await anext(chunks)
+        feed._dispatch(None, 0, CHANNEL, json.dumps(INVOICE_EVENT))
+        await feed.close()
+        return first, await _rest(chunks), feed.subscribers
+
+    first, rest, subscribers = asyncio.run(scenario())
+
+    assert first == "retry: 3000\n\n"
+    assert rest == [f"event: invoice\ndata: {json.dumps(INVOICE_EVENT)}\n\n"]
+    assert not subscribers
+
+
+def test_draining_ends_streams_at_the_next_heartbeat(monkeypatch):
+    monkeypatch.setattr(events, "HEARTBEAT_SECONDS", 0.01)
+    monkeypatch.setattr(lifecycle, "draining", False)
+
+    async def scenario():
+        feed = _open_stream(monkeypatch)
+        response = await events.stream_events(_ConnectedRequest(), None, None, None)
+        chunks = response.body_iterator
+        head = [await anext(chunks), await anext(chunks)]
+        lifecycle.draining = True
+        rest = await _rest(chunks)
+        await feed.close()
+        return head, rest
+
+    head, rest = asyncio.run(scenario())
+
+    assert head == ["retry: 3000\n\n", ": ping\n\n"]
+    assert rest == []
@@ -0,0 +1,41 @@
+from datetime import date
+from sqlalchemy import text
+from app.db import AsyncSessionLocal, engine
+from app.services.archive import archive_closed_orders
+from app.services.sales_person_counters import rebuild_counters
+from app.services.sales_rollups import rebuild_rollups
+
+ROLLUP_TOTALS_SQL = text("""
+    SELECT dimension, sum(order_count), sum(quantity), sum(revenue), sum(tax)
+    FROM sales_rollup_daily GROUP BY dimension ORDER BY dimension
+""")
+
+COUNTER_TOTALS_SQL = text("""
+    SELECT grain, sum(order_count), sum(order_revenue), sum(invoiced_amount), sum(collected_amount)
+    FROM sales_person_counters GROUP BY grain ORDER BY grain
+""")
+
+
+async def _totals():
+    async with engine.connect() as conn:
+        rollups = (await conn.execute(ROLLUP_TOTALS_SQL)).all()
+        counters = (await conn.execute(COUNTER_TOTALS_SQL)).all()
+    return rollups, counters
+
+
+async def _archive_then_rebuild():
+    before = await _totals()
+    moved = await archive_closed_orders(older_than_years=1, batch_size=500)
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await rebuild_rollups(session, date(2000, 1, 1), date(date.today().year + 1, 12, 31))
+            await rebuild_counters(session)
+    return moved, before, await _totals()
+
+
+def test_rebuild_after_archiving_keeps_totals(run):
+    moved, before, after = run(_archive_then_rebuild())
+
+    assert moved["sales_orders"] > 0 and moved["payments"] > 0
+    assert before[0] and before[1]
+    assert after == before
@@ -0,0 +1,43 @@
+from datetime import date
+from sqlalchemy import func, select
+from app.db import AsyncSessionLocal
+from app.models.invoices import Invoice, InvoiceStatus
+from app.routers.invoices import CreatePaymentRequest, create_payment
+from app.services.sync import encode_cursor, fetch_changes
+
+
+async def _pay(invoice_id: int, reference: str):
+    async with AsyncSessionLocal() as session:
+        request = CreatePaymentRequest(date=date.today().isoformat(), amount=0.01, method="cash", reference=reference)
+        return await create_payment(invoice_id, request, None, session)
+
+
+async def _payment_after_cursor():
+    async with AsyncSessionLocal() as session:
+        invoice = (await session.execute(
+            select(Invoice)
+            .where(Invoice.status == InvoiceStatus.unpaid, Invoice.date >= date(date.today().year, 1, 1))
+            .order_by(Invoice.id)
+            .limit(1)
+        )).scalar_one()
+        invoice_id, version = invoice.id, invoice.version
+
+    await _pay(invoice_id, "first")
+    async with AsyncSessionLocal() as session:
+        cursor = encode_cursor(await session.scalar(select(func.now())), -1, 0)
+    second = await _pay(invoice_id, "second")
+
+    async with AsyncSessionLocal() as session:
+        changes, _, _ = await fetch_changes(session, 2000, cursor)
+    return invoice_id, version, second, changes
+
+
+def test_payment_that_keeps_the_status_is_synced(run):
+    invoice_id, version, second, changes = run(_payment_after_cursor())
+
+    assert second.invoiceStatus == InvoiceStatus.partial.value
+    synced = [c for c in changes if c["entity"] == "invoice" and c["id"] == invoice_id]
+    assert len(synced) == 1
+    data = synced[0]["data"]
+    assert [p["reference"] for p in data["payments"]] == ["first", "second"]
+    assert data["version"] == version + 2